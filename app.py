@@ -1,18 +1,28 @@
 import os
 import logging
+import hashlib
 import io
+import itertools
 import json
 from dotenv import load_dotenv
 load_dotenv()
 import csv
-import sys
-import traceback
-from contextlib import redirect_stdout, redirect_stderr
-from flask import Flask, render_template, request, jsonify, Response
-from utils.scraper import fetch_webpage_content, parse_html
-from utils.ai_analyzer import analyze_page_structure
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from utils.scraper import fetch_page, parse_document, parse_html, resolve_parser
+from utils.http_client import get_connection_stats
+from utils.batch_analyzer import BATCH_MAX_URLS, DETECTION_FEATURES, detect_selectors, iter_batch_analysis
 from utils.script_generator import generate_scraping_script
-from utils.selector_validator import extract_sample_data, validate_selectors, improve_selectors
+from utils.extraction_engine import (
+    PRODUCT_FIELDS, add_timings, iter_scrape, round_timings, run_extraction, summarize_page
+)
+from utils.jobs import FINISHED_STATUSES, get_job_manager
+from utils.selector_cache import selector_cache_stats
+from utils.template_store import get_template_store, match_template, remember_template
+from utils.tracing import current_trace, render_metrics, trace_stream
+from utils.worker_pool import worker_pool_stats
+from utils.selector_validator import (
+    VALIDATION_FIELDS, extract_sample_data, validate_selectors, iter_field_validations, improve_selectors
+)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -22,6 +32,9 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 
+# Stop downloading a page for analysis once this many product containers were seen (0 = read it all)
+ANALYZE_MIN_CONTAINERS = int(os.environ.get("ANALYZE_MIN_CONTAINERS", 0))
+
 @app.route('/')
 def index():
     """Render the main application page."""
@@ -35,6 +48,11 @@ def analyze():
     
     Expects a URL and optional pagination details in the request.
     Returns a stream of validation results and final script.
+    
+    By default the stream is compact: sample data is sent in a 'sample_data'
+    event whenever it changes and validation events refer to it by 'sample_id',
+    and the final history lists only selector changes. Send "compact": false for
+    full sample data in every event and full history entries.
     """
     def generate_validation_stream():
         try:
@@ -44,6 +62,8 @@ def analyze():
             pagination_selector = data.get('pagination_selector', '')
             max_iterations = data.get('max_iterations', 3)
             user_selectors = data.get('selectors')
+            parser = data.get('parser')  # Optional parser backend, defaults to HTML_PARSER
+            compact = data.get('compact', True)  # Send sample data once by id and history as diffs
             
             if not url:
                 yield json.dumps({"error": "URL is required"}) + '\n'
@@ -52,20 +72,30 @@ def analyze():
             logger.debug(f"Analyzing URL: {url}")
             
             # Step 1: Fetch webpage content
-            html_content = fetch_webpage_content(url)
-            if not html_content:
+            page = fetch_page(url, min_containers=ANALYZE_MIN_CONTAINERS or None)
+            if not page or not page["html"]:
                 yield json.dumps({"error": "Failed to fetch the webpage"}) + '\n'
                 return
+            html_content = page["html"]
+            if page["truncated"]:
+                logger.warning(f"Analyzing truncated page ({page['bytes']} bytes) for {url}")
             
-            # Step 2: Parse HTML
-            parsed_data = parse_html(html_content, url)
+            # Step 2: Parse HTML once and share the document across all stages
+            document = parse_document(html_content, url, resolve_parser(parser) if parser else None)
             
             # Step 3: Get selectors
+            template_validations = None
             if user_selectors:
                 logger.debug(f"Using user-provided selectors: {user_selectors}")
                 selectors = user_selectors
+                selector_source = "user"
             else:
-                selectors = analyze_page_structure(parsed_data)
+                # Reuse the selectors of a known page template when they still pass basic validation
+                selectors, template_validations = match_template(document, url)
+                selector_source = "template"
+                if not selectors:
+                    # Try the local heuristic engine first and only ask the AI when it is unsure
+                    selectors, selector_source = detect_selectors(document, parse_html(document, url, DETECTION_FEATURES), url)
                 if not selectors:
                     yield json.dumps({"error": "Failed to analyze page structure"}) + '\n'
                     return
@@ -75,67 +105,117 @@ def analyze():
             field_validations = {}
             field_reasons = {}
             iterations = 0
-            fields_to_validate = ['title', 'url', 'image', 'price']
+            fields_to_validate = list(VALIDATION_FIELDS)
             
             # Initial sample data
-            sample_data = extract_sample_data(html_content, selectors, url)
+            sample_data = extract_sample_data(document, selectors, url)
             
             # Stream initial state
             yield json.dumps({
                 "type": "init",
                 "selectors": selectors,
+                "selector_source": selector_source,
+                "truncated": page["truncated"],
                 "fields": fields_to_validate
             }) + '\n'
             
-            # Validate each field
-            for field in fields_to_validate:
-                field_valid = False
-                field_iterations = 0
+            initial_selectors = selectors.copy()
+            sent_samples = set()
+            
+            def record_validation(field, current_validation, is_final, new_result=True):
+                """
+                Store a validation result in the history and build its stream event(s).
                 
-                while not field_valid and field_iterations < max_iterations:
-                    # Validate current field
-                    validation_results = validate_selectors(sample_data, selectors)
-                    current_validation = validation_results.get("field_validations", {}).get(field, {})
-                    
-                    # Store validation results
-                    validation_entry = {
+                With new_result False the last result of the field is only streamed
+                again, e.g. to mark it final, and not added to the history.
+                """
+                field_validations[field] = current_validation.get("valid", False)
+                field_reasons[field] = current_validation.get("reason", "")
+                sample_id = sample_data_id(sample_data)
+                if new_result:
+                    validation_history.append({
                         "iteration": iterations + 1,
                         "field": field,
                         "selectors": selectors.copy(),
                         "sample_data": sample_data,
+                        "sample_id": sample_id,
                         "validation": current_validation
-                    }
-                    validation_history.append(validation_entry)
+                    })
+                event = {
+                    "type": "validation",
+                    "field": field,
+                    "iteration": iterations + 1,
+                    "selector": selectors.get(f"product_{field}"),
+                    "validation": current_validation,
+                    "is_final": is_final
+                }
+                if not compact:
+                    event["sample_data"] = sample_data
+                    return json.dumps(event) + '\n'
+                
+                # Send each distinct sample once, later events refer to it by id
+                lines = ''
+                if sample_id not in sent_samples:
+                    sent_samples.add(sample_id)
+                    lines += json.dumps({"type": "sample_data", "id": sample_id, "sample_data": sample_data}) + '\n'
+                event["sample_id"] = sample_id
+                return lines + json.dumps(event) + '\n'
+            
+            # First pass: validate all fields concurrently, streaming each as it completes.
+            # Selectors of a matched template were already checked without the AI.
+            if template_validations:
+                first_pass_validations = (
+                    (field, {"valid": template_validations[field]["valid"], "reason": template_validations[field]["message"]})
+                    for field in fields_to_validate
+                )
+            else:
+                first_pass_validations = iter_field_validations(sample_data, fields_to_validate)
+            first_pass = {}
+            for field, current_validation in first_pass_validations:
+                first_pass[field] = current_validation
+                yield record_validation(
+                    field,
+                    current_validation,
+                    current_validation.get("valid", False) or max_iterations <= 1
+                )
+            
+            # Improve and re-validate each invalid field
+            for field in fields_to_validate:
+                current_validation = first_pass[field]
+                field_iterations = 1
+                rejected = []
+                
+                while not current_validation.get("valid", False) and field_iterations < max_iterations:
+                    # Try to improve selector, telling the AI which ones already failed
+                    logger.debug(f"Improving selector for {field}")
+                    current_selector = selectors.get(f"product_{field}")
+                    if current_selector not in rejected:
+                        rejected.append(current_selector)
+                    selectors = improve_selectors(document, selectors, {
+                        "field_validations": {field: current_validation}
+                    }, url, rejected_selectors={field: rejected})
                     
-                    # Stream validation result for this field
-                    yield json.dumps({
-                        "type": "validation",
-                        "field": field,
-                        "iteration": iterations + 1,
-                        "selector": selectors.get(f"product_{field}"),
-                        "sample_data": sample_data,
-                        "validation": current_validation,
-                        "is_final": field_valid or field_iterations == max_iterations - 1
-                    }) + '\n'
+                    if selectors.get(f"product_{field}") == current_selector:
+                        # No new selector: re-validating would only repeat the last verdict
+                        logger.debug(f"No new selector for {field}, keeping the last result")
+                        yield record_validation(field, current_validation, True, new_result=False)
+                        break
                     
-                    # Check if field is valid
-                    field_valid = current_validation.get("valid", False)
-                    field_validations[field] = field_valid
-                    field_reasons[field] = current_validation.get("reason", "")
+                    # Get new sample data
+                    sample_data = extract_sample_data(document, selectors, url)
+                    field_iterations += 1
+                    iterations += 1
                     
-                    if not field_valid and field_iterations < max_iterations - 1:
-                        # Try to improve selector
-                        logger.debug(f"Improving selector for {field}")
-                        selectors = improve_selectors(html_content, selectors, {
-                            "field_validations": {field: current_validation}
-                        }, url)
-                        
-                        # Get new sample data
-                        sample_data = extract_sample_data(html_content, selectors, url)
-                        field_iterations += 1
-                        iterations += 1
-                    else:
-                        break
+                    # Validate current field only
+                    validation_results = validate_selectors(sample_data, selectors, fields=[field])
+                    current_validation = validation_results.get("field_validations", {}).get(field, {})
+                    
+                    # Stream validation result for this field
+                    yield record_validation(
+                        field,
+                        current_validation,
+                        current_validation.get("valid", False) or field_iterations >= max_iterations
+                    )
             
             # All fields validated, generate final response
             all_valid = all(field_validations.values())
@@ -146,12 +226,17 @@ def analyze():
                 "all_fields_valid": all_valid
             }
             
+            # Remember fully validated selectors for other pages with the same template
+            if all_valid and selector_source != "template":
+                remember_template(document, url, selectors)
+            
             # Generate script
             script = generate_scraping_script(
                 selectors,
                 url,
                 pagination_enabled,
-                pagination_selector
+                pagination_selector,
+                parser
             )
             
             # Stream final result
@@ -159,7 +244,11 @@ def analyze():
                 "type": "complete",
                 "selectors": selectors,
                 "validation_summary": validation_summary,
-                "validation_history": validation_history,
+                "timings": current_trace().summary(),
+                "validation_history": (
+                    compact_validation_history(validation_history, initial_selectors) if compact
+                    else [{key: value for key, value in entry.items() if key != "sample_id"} for entry in validation_history]
+                ),
                 "script": script,
                 "message": (
                     "All selectors validated successfully" if all_valid
@@ -175,138 +264,392 @@ def analyze():
             }) + '\n'
     
     return Response(
-        generate_validation_stream(),
+        stream_with_context(trace_stream(generate_validation_stream())),
         mimetype='application/x-json-stream'
     )
 
-@app.route('/run-scraper', methods=['POST'])
-def run_scraper():
+@app.route('/analyze-batch', methods=['POST'])
+def analyze_batch():
     """
-    Endpoint to execute the generated scraping script.
+    Endpoint to analyze many pages at once, e.g. all category pages of a shop.
     
-    Expects a script and URL in the request.
-    Returns the scraped data and optionally provides a CSV download.
+    Expects a list of URLs and an optional parser. Pages are fetched concurrently
+    and grouped by template, selectors are detected once per template and reused
+    on every page of it where they validate. Streams an 'init' event with the
+    template groups, one 'result' event per URL and a 'complete' event.
     """
-    try:
-        data = request.json
-        script = data.get('script')
-        url = data.get('url')
-        format_type = data.get('format', 'json')  # 'json' or 'csv'
-        max_pages = data.get('max_pages', 3)  # Limit number of pages to scrape for safety
+    data = request.json or {}
+    urls = data.get('urls')
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "A list of URLs is required"}), 400
+    if not all(isinstance(url, str) for url in urls):
+        return jsonify({"error": "Every URL must be a string"}), 400
+    urls = list(dict.fromkeys(url for url in urls if url))
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({"error": f"At most {BATCH_MAX_URLS} URLs can be analyzed per batch"}), 400
+    parser = data.get('parser')
+    
+    def generate_batch_stream():
+        try:
+            for event in iter_batch_analysis(urls, resolve_parser(parser) if parser else None):
+                if event["type"] == "complete":
+                    event["timings"] = current_trace().summary()
+                yield json.dumps(event) + '\n'
+        except Exception as e:
+            logger.error(f"Error analyzing batch: {str(e)}")
+            yield json.dumps({
+                "type": "error",
+                "error": f"Error processing request: {str(e)}"
+            }) + '\n'
+    
+    return Response(
+        stream_with_context(trace_stream(generate_batch_stream())),
+        mimetype='application/x-json-stream'
+    )
+
+def sample_data_id(sample_data):
+    """
+    Identify sample data by its content, so unchanged samples are streamed only once.
+    
+    Args:
+        sample_data (list): Output of extract_sample_data
         
-        if not script or not url:
-            return jsonify({"error": "Script and URL are required"}), 400
+    Returns:
+        str: Short hash of the canonical JSON of the samples
+    """
+    payload = json.dumps(sample_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def compact_validation_history(validation_history, initial_selectors):
+    """
+    Convert a validation history into diffs for the compact stream protocol.
+    
+    Each entry keeps its iteration, field and validation, refers to its samples
+    by the id of an earlier 'sample_data' event and lists only the selectors that
+    changed since the previous entry (or since the 'init' event for the first one).
+    
+    Args:
+        validation_history (list): History entries recorded during analysis
+        initial_selectors (dict): Selectors sent in the 'init' event
         
-        logger.debug(f"Running scraper for URL: {url}")
+    Returns:
+        list: Compact history entries
+    """
+    compact = []
+    previous = initial_selectors
+    for entry in validation_history:
+        compact.append({
+            "iteration": entry["iteration"],
+            "field": entry["field"],
+            "selector_changes": {
+                key: value for key, value in entry["selectors"].items() if previous.get(key) != value
+            },
+            "sample_id": entry["sample_id"],
+            "validation": entry["validation"]
+        })
+        previous = entry["selectors"]
+    return compact
+
+def get_scrape_params(data):
+    """
+    Read the scrape settings shared by /run-scraper and /jobs from a request body.
+    
+    Args:
+        data (dict): JSON request body
         
-        # Add max_pages variable to limit pagination for safety
-        script_with_limit = f"max_pages_to_scrape = {max_pages}\n" + script
+    Returns:
+        dict: Keyword arguments for iter_scrape, or None if selectors or URL are missing
+    """
+    selectors = data.get('selectors')
+    url = data.get('url')
+    if not selectors or not selectors.get('product_container') or not url:
+        return None
+    
+    return {
+        "selectors": selectors,
+        "url": url,
+        "max_pages": int(data.get('max_pages', 3)),  # Limit number of pages to scrape for safety
+        "pagination_enabled": data.get('pagination_enabled', False),
+        "pagination_selector": data.get('pagination_selector', ''),
+        "crawl_mode": data.get('crawl_mode')  # 'concurrent' or 'sequential', defaults to CRAWL_MODE
+    }
+
+def csv_response(products):
+    """Build a CSV file download of scraped products."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=PRODUCT_FIELDS)
+    writer.writeheader()
+    writer.writerows(products)
+    
+    return Response(
+        output.getvalue(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment;filename=scraped_data.csv'}
+    )
+
+def generate_product_stream(pages):
+    """
+    Stream scraped pages as newline-delimited JSON.
+    
+    Yields a 'page' event with the products of each page as soon as it is scraped,
+    then a 'complete' event with the totals.
+    
+    Args:
+        pages (iterator): Page results from iter_scrape
+    """
+    count = 0
+    summaries = []
+    timings = {}
+    error = None
+    try:
+        for result in pages:
+            summary = summarize_page(result)
+            summaries.append(summary)
+            add_timings(timings, result["timings"])
+            error = error or result["error"]
+            count += len(result["products"])
+            yield json.dumps({
+                "type": "page",
+                **summary,
+                "products": result["products"]
+            }) + '\n'
         
-        # Add a limit to number of pages scraped
-        script_with_limit = script_with_limit.replace(
-            "while next_url:",
-            "page_count = 0\nwhile next_url and page_count < max_pages_to_scrape:"
-        )
-        script_with_limit = script_with_limit.replace(
-            "# Process the next page",
-            "page_count += 1\n    # Process the next page"
-        )
+        if not count:
+            yield json.dumps({"error": error or "No data was scraped"}) + '\n'
         
-        # Add CSV export capability
-        script_with_limit += """
-# Create a function to export data as CSV
-def export_as_csv(data):
-    if not data:
-        return ""
+        yield json.dumps({
+            "type": "complete",
+            "count": count,
+            "pages": summaries,
+            "timings": round_timings(timings)
+        }) + '\n'
+    
+    except Exception as e:
+        logger.error(f"Error streaming scraped data: {str(e)}")
+        yield json.dumps({"error": f"Error processing request: {str(e)}"}) + '\n'
+
+def generate_csv_stream(pages):
+    """
+    Stream scraped products as CSV, one chunk of rows per page.
     
-    # Get field names from the first item
-    fieldnames = list(data[0].keys())
+    CSV has no room for an error event, so a failure part way through aborts the
+    response instead: the connection is closed without the final chunk and clients
+    see an incomplete transfer rather than a CSV that looks complete.
     
-    # Write data to CSV string
+    Args:
+        pages (iterator): Page results from iter_scrape
+    """
     output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer = csv.DictWriter(output, fieldnames=PRODUCT_FIELDS)
     writer.writeheader()
-    writer.writerows(data)
+    try:
+        for result in pages:
+            writer.writerows(result["products"])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    except Exception as e:
+        logger.error(f"Error streaming CSV data, aborting the response: {str(e)}")
+        raise
+
+def first_pages_with_products(pages):
+    """
+    Read pages until one has products, so an empty scrape can still get a 400.
+    
+    Args:
+        pages (iterator): Page results from iter_scrape
+        
+    Returns:
+        tuple: (pages read so far, the remaining iterator), with the last page read
+            holding products unless the scrape found none
+    """
+    leading = []
+    for result in pages:
+        leading.append(result)
+        if result["products"]:
+            break
+    return leading, pages
+
+@app.route('/run-scraper', methods=['POST'])
+def run_scraper():
+    """
+    Endpoint to run the scraper for the current selectors.
+    
+    Expects selectors and a URL in the request, plus optional pagination settings.
+    Extraction runs in-process through the extraction engine, applying the same
+    logic as the generated script. Returns the scraped data with per-stage timings,
+    or a CSV download.
     
-    return output.getvalue()
-"""
+    With format 'ndjson' the products are streamed page by page, one JSON event per
+    line; with format 'csv' and stream set, CSV rows are streamed as pages finish,
+    once a page with products was found (a scrape without rows still gets a 400).
+    """
+    try:
+        data = request.json
+        format_type = data.get('format', 'json')  # 'json', 'ndjson' or 'csv'
+        params = get_scrape_params(data)
         
-        # Execute the script in a controlled environment
-        # Add all necessary modules that might be used in the script
-        local_vars = {
-            'io': io, 
-            'csv': csv, 
-            'products': None,
-            'requests': __import__('requests'),
-            'BeautifulSoup': __import__('bs4').BeautifulSoup,
-            'time': __import__('time'),
-            'os': os,
-            'json': json,
-            'sys': sys,
-            'urlparse': __import__('urllib.parse').urlparse,
-            'urljoin': __import__('urllib.parse').urljoin
-        }
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
+        if not params:
+            return jsonify({"error": "Selectors (including a product container) and URL are required"}), 400
         
-        try:
-            # Set a timeout for script execution (30 seconds)
-            try:
-                with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                    exec(script_with_limit, None, local_vars)
-                
-                # Get the products from script execution
-                scraped_data = local_vars.get('products', [])
-                
-                if not scraped_data:
-                    logger.warning("No data was scraped from the script execution")
+        logger.debug(f"Running scraper for URL: {params['url']}")
+        
+        # Streaming modes: send each page's products as soon as it is scraped
+        if format_type == 'ndjson' or (format_type == 'csv' and data.get('stream')):
+            pages = iter_scrape(**params)
+            if format_type == 'csv':
+                # Check for rows before committing to a 200 response
+                leading, pages = first_pages_with_products(pages)
+                if not leading or not leading[-1]["products"]:
+                    logger.warning("No data was scraped")
                     return jsonify({
-                        "error": "No data was scraped",
-                        "output": stdout_capture.getvalue(),
-                        "errors": stderr_capture.getvalue()
+                        "error": next((result["error"] for result in leading if result["error"]), None) or "No data was scraped",
+                        "pages": [summarize_page(result) for result in leading]
                     }), 400
-            except Exception as script_exception:
-                # Specific handling for script execution errors
-                logger.error(f"Error in script execution: {str(script_exception)}")
-                return jsonify({
-                    "error": f"Error executing script: {str(script_exception)}",
-                    "output": stdout_capture.getvalue(),
-                    "errors": stderr_capture.getvalue()
-                }), 400
-            
-            # Return data in the requested format
-            if format_type == 'csv':
-                # Generate CSV
-                csv_data = local_vars['export_as_csv'](scraped_data)
-                
-                # Create response with CSV file
-                response = Response(
-                    csv_data,
+                return Response(
+                    stream_with_context(generate_csv_stream(itertools.chain(leading, pages))),
                     mimetype='text/csv',
-                    headers={'Content-Disposition': f'attachment;filename=scraped_data.csv'}
+                    headers={'Content-Disposition': 'attachment;filename=scraped_data.csv'}
                 )
-                return response
-            else:
-                # Return JSON by default
-                return jsonify({
-                    "scraped_data": scraped_data,
-                    "count": len(scraped_data),
-                    "output": stdout_capture.getvalue()
-                })
-                
-        except Exception as script_error:
-            error_traceback = traceback.format_exc()
-            logger.error(f"Script execution error: {str(script_error)}\n{error_traceback}")
+            return Response(
+                stream_with_context(generate_product_stream(pages)),
+                mimetype='application/x-json-stream'
+            )
+        
+        result = run_extraction(**params)
+        scraped_data = result["products"]
+        logger.debug(f"Scraped {len(scraped_data)} products from {len(result['pages'])} pages in {result['timings']}")
+        
+        if not scraped_data:
+            logger.warning("No data was scraped")
             return jsonify({
-                "error": f"Error executing script: {str(script_error)}",
-                "traceback": error_traceback,
-                "output": stdout_capture.getvalue(),
-                "errors": stderr_capture.getvalue()
-            }), 500
+                "error": result["error"] or "No data was scraped",
+                "pages": result["pages"],
+                "timings": result["timings"]
+            }), 400
+        
+        # Return data in the requested format
+        if format_type == 'csv':
+            return csv_response(scraped_data)
+        
+        # Return JSON by default
+        return jsonify({
+            "scraped_data": scraped_data,
+            "count": len(scraped_data),
+            "pages": result["pages"],
+            "timings": result["timings"]
+        })
             
     except Exception as e:
         logger.error(f"Error running scraper: {str(e)}")
         return jsonify({"error": f"Error processing request: {str(e)}"}), 500
 
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Endpoint to queue a scrape in the background.
+    
+    Expects the same selectors, URL and pagination settings as /run-scraper.
+    Returns the job ID immediately; poll /jobs/<job_id> for progress.
+    """
+    try:
+        params = get_scrape_params(request.json or {})
+        if not params:
+            return jsonify({"error": "Selectors (including a product container) and URL are required"}), 400
+        
+        job = get_job_manager().submit(params)
+        return jsonify({"job_id": job["id"], "status": job["status"]}), 202
+        
+    except Exception as e:
+        logger.error(f"Error submitting job: {str(e)}")
+        return jsonify({"error": f"Error processing request: {str(e)}"}), 500
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Endpoint to list the most recent jobs, newest first."""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"jobs": get_job_manager().list(limit)})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Endpoint to get a job's status and progress.
+    
+    Returns the status (queued, running, completed, failed or cancelled), pages
+    done, rows extracted and timings so far.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Endpoint to cancel a queued or running job."""
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """
+    Endpoint to get the products scraped by a finished job.
+    
+    Returns JSON by default or a CSV download with ?format=csv. Cancelled jobs
+    return the rows scraped before they stopped.
+    """
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] not in FINISHED_STATUSES:
+        return jsonify({"error": f"Job is {job['status']}", "status": job["status"]}), 409
+    
+    scraped_data = manager.result(job_id) or []
+    if request.args.get('format') == 'csv':
+        return csv_response(scraped_data)
+    return jsonify({
+        "status": job["status"],
+        "scraped_data": scraped_data,
+        "count": len(scraped_data),
+        "error": job["error"]
+    })
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Endpoint to get runtime counters, e.g. selector compile cache hits and misses."""
+    return jsonify({
+        "selector_cache": selector_cache_stats(),
+        "template_store": get_template_store().stats() if get_template_store() else None
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Endpoint exposing metrics in the Prometheus text format.
+    
+    Includes the time spent per pipeline stage, LLM requests, tokens and cache
+    hits, page bytes fetched and parsed, and the selector cache, template store,
+    HTTP connection and worker pool counters.
+    """
+    values = {}
+    for name, value in selector_cache_stats().items():
+        values[f"selector_cache_{name}" + ("_total" if name in ("hits", "misses") else "")] = value
+    store = get_template_store()
+    if store:
+        for name, value in store.stats().items():
+            values[f"template_store_{name}_total"] = value
+    connections = get_connection_stats()
+    values["http_requests_total"] = connections["requests"]
+    values["http_connections_total"] = connections["connections"]
+    pool = worker_pool_stats()
+    if pool:
+        values["worker_pool_size"] = pool.pop("size")
+        for name, value in pool.items():
+            values[f"worker_pool_{name}_total"] = value
+    
+    return Response(render_metrics(values), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
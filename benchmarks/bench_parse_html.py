@@ -0,0 +1,106 @@
+"""
+Benchmark the product container scan in parse_html.
+
+Compares the single-pass find_product_elements against the previous
+implementation, which rescanned every candidate's subtree with find()/find_all()
+and was quadratic on deep DOMs.
+
+Usage:
+    python -m benchmarks.bench_parse_html [--repeat N]
+"""
+import argparse
+import json
+import time
+from bs4 import BeautifulSoup
+from benchmarks.fixtures import make_deeply_nested_page, make_listing_page, make_page_of_size
+from utils.scraper import DEFAULT_PARSER, find_product_elements, get_css_path
+
+def legacy_find_product_elements(soup):
+    """The per-ancestor scan parse_html used before the bottom-up pass."""
+    def price_text(t):
+        return '$' in t or '€' in t or '£' in t or 'price' in t.lower() if t else False
+
+    product_containers = []
+    product_class_keywords = ['product', 'item', 'card', 'listing', 'goods', 'merchandise']
+    for element in soup.find_all(['div', 'li', 'article', 'section'], class_=True):
+        classes = ' '.join(element.get('class', []))
+        if any(keyword in classes.lower() for keyword in product_class_keywords):
+            product_containers.append(element)
+
+    if not product_containers:
+        for container in soup.find_all(['div', 'li', 'article'], class_=True):
+            has_image = bool(container.find('img'))
+            has_price = bool(container.find(string=price_text))
+            has_title = bool(container.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']))
+            has_link = bool(container.find('a'))
+            if ((has_image and has_price) or (has_image and has_title) or
+                    (has_title and has_price) or (has_link and has_image)):
+                product_containers.append(container)
+
+    possible_product_elements = []
+    for container in product_containers:
+        path = get_css_path(container)
+        if path:
+            possible_product_elements.append({
+                "path": path,
+                "has_image": bool(container.find('img')),
+                "has_price": bool(container.find(string=price_text)),
+                "has_title": bool(container.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']) or container.find(
+                    class_=lambda c: c and ('title' in c.lower() or 'name' in c.lower()))),
+                "has_link": bool(container.find('a')),
+                "num_children": len(container.find_all()),
+                "element_type": container.name,
+                "class_names": container.get('class', [])
+            })
+    return possible_product_elements
+
+def _unclassed(html):
+    """Strip product keywords from class names so the fallback repeated-pattern scan runs."""
+    for old, new in [("'product-card'", "'tile'"), ("'product-", "'tile-"), ("'menu-item'", "'menu-entry'")]:
+        html = html.replace(old, new)
+    return html
+
+FIXTURES = {
+    'small': lambda: make_listing_page(products=24),
+    'large': lambda: make_page_of_size(2 * 1024 * 1024),
+    'nested': lambda: make_deeply_nested_page(depth=300, products=200),
+    'large-unclassed': lambda: _unclassed(make_page_of_size(1024 * 1024, nesting=8)),
+    'nested-unclassed': lambda: _unclassed(make_deeply_nested_page(depth=250, products=600)),
+}
+
+def _best_time(function, soup, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(soup)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation (best is reported)')
+    args = parser.parse_args()
+
+    results = {}
+    for name, build in FIXTURES.items():
+        html = build()
+        soup = BeautifulSoup(html, DEFAULT_PARSER)
+        nodes = sum(1 for _ in soup.descendants)
+        legacy_time, legacy_result = _best_time(legacy_find_product_elements, soup, args.repeat)
+        linear_time, linear_result = _best_time(find_product_elements, soup, args.repeat)
+        results[name] = {
+            "bytes": len(html),
+            "nodes": nodes,
+            "candidates": len(linear_result),
+            "legacy_seconds": round(legacy_time, 4),
+            "linear_seconds": round(linear_time, 4),
+            "speedup": round(legacy_time / linear_time, 1) if linear_time else None,
+            "same_result": legacy_result == linear_result
+        }
+        print(f"{name:>16}: {nodes:>7} nodes  legacy {legacy_time:8.3f}s  linear {linear_time:8.3f}s")
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark parse and select time per HTML parser backend.
+
+For each BeautifulSoup backend that is installed (lxml, html5lib, html.parser),
+parses large listing pages and runs the same selectors as generated scripts and
+the extraction engine, checking that every backend extracts the same products.
+If selectolax is installed, its parse + CSS select time is reported as well, as a
+reference for a non-BeautifulSoup fast path.
+
+Usage:
+    python -m benchmarks.bench_parsers [--repeat N]
+"""
+import argparse
+import json
+import time
+from bs4 import BeautifulSoup
+from benchmarks.fixtures import make_page_of_size
+from utils.extraction_engine import extract_products
+from utils.scraper import available_parsers
+
+SELECTORS = {
+    "product_container": ".product-card",
+    "product_title": ".product-title",
+    "product_url": "a.product-link",
+    "product_image": "img",
+    "product_price": ".price"
+}
+
+FIXTURES = {
+    '1mb': lambda: make_page_of_size(1024 * 1024),
+    '5mb': lambda: make_page_of_size(5 * 1024 * 1024),
+}
+
+BASE_URL = 'https://shop.example.com/category'
+
+def _best_time(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_backend(html, parser, repeat):
+    parse_time, soup = _best_time(lambda: BeautifulSoup(html, parser), repeat)
+    select_time, (products, _) = _best_time(lambda: extract_products(soup, SELECTORS, BASE_URL), repeat)
+    return parse_time, select_time, products
+
+def bench_selectolax(html, repeat):
+    """Parse + select with selectolax, or None if it is not installed."""
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        return None
+    parse_time, tree = _best_time(lambda: HTMLParser(html), repeat)
+    select_time, titles = _best_time(
+        lambda: [node.text(strip=True) for node in tree.css(f"{SELECTORS['product_container']} {SELECTORS['product_title']}")],
+        repeat
+    )
+    return parse_time, select_time, len(titles)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per backend (best is reported)')
+    args = parser.parse_args()
+
+    results = {}
+    for name, build in FIXTURES.items():
+        html = build()
+        results[name] = {"bytes": len(html), "backends": {}}
+        reference = None
+        for backend in available_parsers():
+            parse_time, select_time, products = bench_backend(html, backend, args.repeat)
+            reference = products if reference is None else reference
+            results[name]["backends"][backend] = {
+                "parse_seconds": round(parse_time, 4),
+                "select_seconds": round(select_time, 4),
+                "total_seconds": round(parse_time + select_time, 4),
+                "products": len(products),
+                "same_products": products == reference
+            }
+            print(f"{name:>4} {backend:>12}: parse {parse_time:7.3f}s  select {select_time:7.3f}s  products {len(products)}")
+
+        selectolax = bench_selectolax(html, args.repeat)
+        if selectolax:
+            parse_time, select_time, count = selectolax
+            results[name]["backends"]["selectolax"] = {
+                "parse_seconds": round(parse_time, 4),
+                "select_seconds": round(select_time, 4),
+                "total_seconds": round(parse_time + select_time, 4),
+                "products": count
+            }
+            print(f"{name:>4} {'selectolax':>12}: parse {parse_time:7.3f}s  select {select_time:7.3f}s  products {count}")
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Deterministic stand-in for the OpenAI client used by the benchmarks.
+
+Answers the three prompts the app sends (page analysis, field validation and
+selector improvement) with fixed JSON, after an optional simulated latency, and
+reports token usage estimated from the prompt length. Install it with install()
+to run /analyze without network access or API costs.
+"""
+import json
+import threading
+import time
+import types
+
+# Selectors matching the benchmark fixtures
+FIXTURE_SELECTORS = {
+    "product_container": ".product-card",
+    "product_title": ".product-title",
+    "product_url": "a.product-link",
+    "product_image": "img.product-image",
+    "product_price": ".price",
+    "pagination_next": ".pagination a.next"
+}
+
+class FakeCompletions:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, model=None, messages=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        system_prompt = messages[0]["content"] if messages else ""
+        if "selector generator" in system_prompt:
+            content = {"selector": FIXTURE_SELECTORS["product_title"]}
+        elif "validator" in system_prompt:
+            content = {"valid": True, "reason": "Matches the expected pattern"}
+        else:
+            content = FIXTURE_SELECTORS
+
+        prompt_tokens = sum(len(message.get("content", "")) for message in messages or []) // 4
+        content = json.dumps(content)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+            usage=types.SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=len(content) // 4,
+                total_tokens=prompt_tokens + len(content) // 4
+            )
+        )
+
+class FakeOpenAI:
+    """Client exposing chat.completions.create like openai.OpenAI."""
+
+    def __init__(self, latency=0.0):
+        self.chat = types.SimpleNamespace(completions=FakeCompletions(latency))
+
+def install(latency=0.0):
+    """
+    Replace the OpenAI clients of the analyzer and validator with a fake one.
+
+    Args:
+        latency (float): Seconds each fake completion takes
+
+    Returns:
+        FakeOpenAI: The installed client, whose chat.completions.calls counts requests
+    """
+    import utils.ai_analyzer
+    import utils.selector_validator
+    client = FakeOpenAI(latency)
+    utils.ai_analyzer.openai = client
+    utils.selector_validator.openai = client
+    return client
@@ -0,0 +1,143 @@
+"""
+Synthetic product listing pages used by the benchmarks.
+
+The pages mimic real shop category pages: a heavy <head>, navigation, a grid of
+product cards with nested wrappers, pagination and a footer. They are generated
+deterministically so results are comparable across commits.
+"""
+import os
+import random
+
+def make_listing_page(products=40, nesting=3, seed=0):
+    """
+    Build a product listing page.
+
+    Args:
+        products (int): Number of product cards in the grid
+        nesting (int): Extra wrapper elements around each card's contents
+        seed (int): Random seed for prices and titles
+
+    Returns:
+        str: HTML of the page
+    """
+    rng = random.Random(seed)
+    parts = [
+        "<!DOCTYPE html><html><head><title>Category - Example Shop</title>",
+        "<meta charset='utf-8'>",
+        "".join(f"<link rel='stylesheet' href='/static/css/bundle-{i}.css'>" for i in range(10)),
+        "<script>" + "window.__STATE__ = {};" * 400 + "</script>",
+        "<style>" + ".x{color:red}" * 300 + "</style>",
+        "</head><body>",
+        "<header class='site-header'><nav class='main-nav'><ul class='menu'>",
+        "".join(f"<li class='menu-item'><a href='/c/{i}'>Category {i}</a></li>" for i in range(30)),
+        "</ul></nav></header>",
+        "<main class='content'><div class='product-grid'>",
+    ]
+    for i in range(products):
+        open_wrappers = "".join(f"<div class='wrap-{depth}'>" for depth in range(nesting))
+        close_wrappers = "</div>" * nesting
+        price = rng.randint(5, 500) + rng.choice([0.99, 0.49, 0.0])
+        parts.append(
+            f"<div class='product-card' data-id='{i}'>{open_wrappers}"
+            f"<a class='product-link' href='/products/item-{i}'>"
+            f"<img class='product-image' src='/images/item-{i}.jpg' alt='Item {i}' width='300' height='300'></a>"
+            f"<h3 class='product-title'>Example product number {i} {rng.choice(['Blue', 'Red', 'Large', 'Small'])}</h3>"
+            f"<div class='product-meta'><span class='price'>${price:.2f}</span>"
+            f"<span class='rating'>{rng.randint(1, 5)} stars</span></div>"
+            f"<p class='description'>{'Lorem ipsum dolor sit amet. ' * 3}</p>"
+            f"{close_wrappers}</div>"
+        )
+    parts.extend([
+        "</div>",
+        "<div class='pagination'><a class='page' href='?page=1'>1</a><a class='page' href='?page=2'>2</a>",
+        "<a class='next' href='?page=2'>Next</a></div>",
+        "</main>",
+        "<footer class='site-footer'>",
+        "".join(f"<div class='footer-col'><a href='/info/{i}'>Info {i}</a></div>" for i in range(20)),
+        "</footer></body></html>",
+    ])
+    return "".join(parts)
+
+def make_page_of_size(target_bytes, nesting=3, seed=0):
+    """
+    Build a listing page of roughly the requested size.
+
+    Args:
+        target_bytes (int): Approximate size of the page in bytes
+        nesting (int): Extra wrapper elements around each card's contents
+        seed (int): Random seed
+
+    Returns:
+        str: HTML of the page
+    """
+    sample = make_listing_page(products=10, nesting=nesting, seed=seed)
+    base = make_listing_page(products=0, nesting=nesting, seed=seed)
+    per_product = max(1, (len(sample) - len(base)) // 10)
+    products = max(1, (target_bytes - len(base)) // per_product)
+    return make_listing_page(products=products, nesting=nesting, seed=seed)
+
+def make_deeply_nested_page(depth=200, products=40, seed=0):
+    """
+    Build a listing whose product grid sits deep inside nested wrappers.
+
+    Args:
+        depth (int): Number of wrapper elements around the product grid
+        products (int): Number of product cards
+        seed (int): Random seed
+
+    Returns:
+        str: HTML of the page
+    """
+    page = make_listing_page(products=products, nesting=5, seed=seed)
+    opening = "".join(f"<div class='layer layer-{i}'>" for i in range(depth))
+    closing = "</div>" * depth
+    return page.replace("<main class='content'>", f"<main class='content'>{opening}").replace(
+        "</main>", f"{closing}</main>"
+    )
+
+# Named corpus used by the benchmark suite
+CORPUS = {
+    'small': lambda: make_listing_page(products=24),
+    '1mb': lambda: make_page_of_size(1024 * 1024),
+    '10mb': lambda: make_page_of_size(10 * 1024 * 1024),
+    'nested': lambda: make_deeply_nested_page(),
+}
+
+def load_corpus(names=None, directory=None):
+    """
+    Load benchmark pages by name.
+
+    Pages saved as <name>.html in the directory are used as they are, so real
+    listing pages can be benchmarked; the others are generated.
+
+    Args:
+        names (list): Page names (defaults to every page of CORPUS)
+        directory (str): Directory of saved pages
+
+    Returns:
+        dict: Page name to HTML, in the requested order
+    """
+    pages = {}
+    for name in names or CORPUS:
+        path = os.path.join(directory, f"{name}.html") if directory else None
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages[name] = f.read()
+        elif name in CORPUS:
+            pages[name] = CORPUS[name]()
+        else:
+            raise ValueError(f"Unknown benchmark page: {name}")
+    return pages
+
+def save_corpus(directory, names=None):
+    """
+    Write the generated pages to a directory, e.g. to pin them across commits.
+
+    Args:
+        directory (str): Target directory
+        names (list): Page names (defaults to every page of CORPUS)
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in names or CORPUS:
+        with open(os.path.join(directory, f"{name}.html"), 'w', encoding='utf-8') as f:
+            f.write(CORPUS[name]())
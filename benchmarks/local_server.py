@@ -0,0 +1,63 @@
+"""
+Local HTTP server serving the benchmark corpus.
+
+Each page is served at /<name> (for example /small or /1mb), with any query
+string such as ?page=2 ignored, so fetching, pagination and the generated
+scripts can be measured without touching the network.
+"""
+import http.server
+import threading
+from urllib.parse import urlparse
+
+def _make_handler(pages):
+    class CorpusHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = pages.get(urlparse(self.path).path.strip('/'))
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The fetcher stops reading pages over its size cap
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return CorpusHandler
+
+class CorpusServer:
+    """
+    Serve pages from a background thread.
+
+    Args:
+        corpus (dict): Page name to HTML
+    """
+
+    def __init__(self, corpus):
+        pages = {name: html.encode('utf-8') for name, html in corpus.items()}
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(pages))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, name):
+        """URL of a corpus page."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{name}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
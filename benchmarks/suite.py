@@ -0,0 +1,327 @@
+"""
+Benchmark suite for the analysis and scraping pipeline, fully offline.
+
+Runs parse_html (with all outputs and with only those selector detection
+needs), get_css_path, extract_sample_data, perform_basic_validation,
+the generated scraper and the full /analyze loop against a corpus of listing
+pages (small, 1 MB, 10 MB and deeply nested) served by a local HTTP server, with
+a deterministic fake OpenAI client. Page, LLM and template caches are disabled
+so every run does the full work.
+
+Every case and page runs in its own subprocess, so the reported peak RSS is that
+of the case alone (including the interpreter and imports) rather than the high
+water mark of everything run before it.
+
+Reports latency percentiles, throughput and peak RSS per case and page as JSON,
+which can be saved and compared against a run from another commit.
+
+Full parse_html runs trafilatura, which takes minutes per run on the 10 MB page,
+so it is skipped on pages of LARGE_PAGE_BYTES or more unless --include-slow is
+given. The default run takes about five minutes; with --include-slow, expect well over
+twenty.
+
+Usage:
+    python -m benchmarks.suite [--repeat N] [--pages small 1mb ...] [--cases ...]
+                               [--corpus-dir DIR] [--llm-latency SECONDS]
+                               [--include-slow] [--in-process]
+                               [--output results.json] [--compare baseline.json]
+"""
+import os
+
+# Offline configuration, set before the app modules read it
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("TEMPLATE_STORE_ENABLED", "false")
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+from benchmarks import fake_openai
+from benchmarks.fixtures import CORPUS, load_corpus
+from benchmarks.local_server import CorpusServer
+from utils.batch_analyzer import DETECTION_FEATURES
+from utils.scraper import DEFAULT_PARSER, get_css_path, parse_document, parse_html
+from utils.script_generator import generate_scraping_script
+from utils.selector_validator import extract_sample_data, perform_basic_validation
+
+SELECTORS = {key: value for key, value in fake_openai.FIXTURE_SELECTORS.items() if key != "pagination_next"}
+
+# Runs per case on pages of this size or more, to keep the suite short
+LARGE_PAGE_BYTES = 5 * 1024 * 1024
+LARGE_PAGE_REPEAT = 2
+
+# Cases skipped on large pages unless --include-slow is given
+SLOW_ON_LARGE_PAGES = frozenset(['parse_html'])
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB; per case when run isolated."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(durations, items=1, size=0):
+    """
+    Summarize the run times of one case on one page.
+
+    Args:
+        durations (list): Seconds per run
+        items (int): Operations per run, e.g. elements processed
+        size (int): Bytes of input per run
+
+    Returns:
+        dict: Runs, latency percentiles in ms and throughput
+    """
+    ordered = sorted(durations)
+    total = sum(ordered)
+    stats = {
+        "runs": len(ordered),
+        "mean_ms": round(total / len(ordered) * 1000, 3),
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 3),
+        "p90_ms": round(percentile(ordered, 0.9) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "ops_per_second": round(items * len(ordered) / total, 2) if total else None
+    }
+    if size:
+        stats["mb_per_second"] = round(size * len(ordered) / total / (1024 * 1024), 2) if total else None
+    return stats
+
+def measure(function, repeat, warmup=1):
+    """Run a function warmup + repeat times and return the durations of the timed runs."""
+    for _ in range(warmup):
+        function()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+# Each case prepares its input once and returns (function to time, operations per run)
+
+def case_parse_html(html, url, context):
+    return (lambda: parse_html(html, url)), 1
+
+def case_parse_html_detection(html, url, context):
+    # Only the outputs selector detection reads, as /analyze computes them
+    return (lambda: parse_html(html, url, DETECTION_FEATURES)), 1
+
+def case_get_css_path(html, url, context):
+    soup = parse_document(html, url).soup
+    elements = soup.select(SELECTORS["product_container"]) + soup.select(SELECTORS["product_title"])
+    return (lambda: [get_css_path(element) for element in elements]), max(1, len(elements))
+
+def case_extract_sample_data(html, url, context):
+    document = parse_document(html, url)
+    return (lambda: extract_sample_data(document, SELECTORS, url)), 1
+
+def case_perform_basic_validation(html, url, context):
+    sample_data = extract_sample_data(parse_document(html, url), SELECTORS, url)
+    return (lambda: perform_basic_validation(sample_data, SELECTORS)), 1
+
+def case_generated_scraper(html, url, context):
+    namespace = {"__name__": "generated_scraper"}
+    exec(compile(generate_scraping_script(SELECTORS, url), "generated_scraper.py", "exec"), namespace)
+    scrape = namespace["scrape_product_data"]
+
+    def run():
+        # The generated script prints every product; keep that out of the timings' output
+        with contextlib.redirect_stdout(io.StringIO()):
+            scrape(url, max_pages=1)
+    return run, 1
+
+def case_analyze(html, url, context):
+    client = context["app"].test_client()
+
+    def run():
+        response = client.post('/analyze', json={"url": url})
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        if not events or events[-1].get("type") != "complete":
+            raise RuntimeError(f"/analyze did not complete: {events[-1] if events else 'no events'}")
+    return run, 1
+
+CASES = {
+    "parse_html": case_parse_html,
+    "parse_html_detection": case_parse_html_detection,
+    "get_css_path": case_get_css_path,
+    "extract_sample_data": case_extract_sample_data,
+    "perform_basic_validation": case_perform_basic_validation,
+    "generated_scraper": case_generated_scraper,
+    "analyze": case_analyze,
+}
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_case(case, name, html, repeat, llm_latency=0.0):
+    """
+    Run one case on one page in this process.
+
+    Args:
+        case (str): Case name from CASES
+        name (str): Corpus page name
+        html (str): HTML of the page
+        repeat (int): Timed runs
+        llm_latency (float): Seconds each fake OpenAI completion takes
+
+    Returns:
+        dict: Output of summarize plus page size and peak RSS
+    """
+    client = fake_openai.install(llm_latency)
+    import app
+    context = {"app": app.app}
+
+    size = len(html.encode('utf-8'))
+    runs = LARGE_PAGE_REPEAT if size >= LARGE_PAGE_BYTES and repeat > LARGE_PAGE_REPEAT else repeat
+    with CorpusServer({name: html}) as server:
+        calls_before = client.chat.completions.calls
+        function, items = CASES[case](html, server.url(name), context)
+        durations = measure(function, runs)
+
+    stats = summarize(durations, items, size)
+    stats["bytes"] = size
+    stats["peak_rss_mb"] = peak_rss_mb()
+    if case == "analyze":
+        stats["llm_calls_per_run"] = round((client.chat.completions.calls - calls_before) / (runs + 1), 2)
+    return stats
+
+def run_isolated(case, name, repeat, llm_latency=0.0, corpus_dir=None):
+    """Run one case on one page in a fresh Python process and return its stats."""
+    command = [
+        sys.executable, '-m', 'benchmarks.suite', '--worker',
+        '--cases', case, '--pages', name, '--repeat', str(repeat), '--llm-latency', str(llm_latency)
+    ]
+    if corpus_dir:
+        command += ['--corpus-dir', corpus_dir]
+    completed = subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(completed.stdout)
+
+def run_suite(pages, cases, repeat, llm_latency=0.0, corpus_dir=None, isolate=True, include_slow=False):
+    """
+    Run the selected cases on every page.
+
+    Args:
+        pages (dict): Page name to HTML
+        cases (list): Case names from CASES
+        repeat (int): Timed runs per case and page
+        llm_latency (float): Seconds each fake OpenAI completion takes
+        corpus_dir (str): Directory the pages were loaded from, passed to the subprocesses
+        isolate (bool): Run each case and page in its own process
+        include_slow (bool): Also run SLOW_ON_LARGE_PAGES cases on large pages
+
+    Returns:
+        dict: Results per case and page, plus run metadata
+    """
+    results = {}
+    for case in cases:
+        results[case] = {}
+        for name, html in pages.items():
+            size = len(html.encode('utf-8'))
+            if case in SLOW_ON_LARGE_PAGES and size >= LARGE_PAGE_BYTES and not include_slow:
+                results[case][name] = {"bytes": size, "skipped": "slow on large pages, see --include-slow"}
+                print(f"{case:>24} {name:>7}: skipped", file=sys.stderr)
+                continue
+
+            if isolate:
+                stats = run_isolated(case, name, repeat, llm_latency, corpus_dir)
+            else:
+                stats = run_case(case, name, html, repeat, llm_latency)
+            results[case][name] = stats
+            print(f"{case:>24} {name:>7}: p50 {stats['p50_ms']:10.2f} ms  p90 {stats['p90_ms']:10.2f} ms  "
+                  f"peak RSS {stats['peak_rss_mb']} MB", file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "parser": DEFAULT_PARSER,
+        "repeat": repeat,
+        "llm_latency": llm_latency,
+        "isolated": isolate,
+        "results": results
+    }
+
+def compare(current, baseline):
+    """
+    Print the p50 change of every case and page against a baseline run.
+
+    Args:
+        current (dict): Output of run_suite
+        baseline (dict): Output of run_suite from another commit
+    """
+    print(f"Comparing {current.get('commit')} against {baseline.get('commit')} (p50, negative is faster)", file=sys.stderr)
+    for case, pages in current["results"].items():
+        for name, stats in pages.items():
+            before = baseline.get("results", {}).get(case, {}).get(name)
+            if not before or not before.get("p50_ms") or "p50_ms" not in stats:
+                continue
+            change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            print(f"{case:>24} {name:>7}: {before['p50_ms']:10.2f} -> {stats['p50_ms']:10.2f} ms  {change:+6.1f}%", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case and page')
+    parser.add_argument('--pages', nargs='+', default=list(CORPUS), help='Corpus pages to run on')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES), help='Cases to run')
+    parser.add_argument('--corpus-dir', help='Directory of saved <page>.html files to use instead of generated ones')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Simulated seconds per OpenAI call')
+    parser.add_argument('--include-slow', action='store_true', help='Also run full parse_html on large pages (minutes per run)')
+    parser.add_argument('--in-process', action='store_true', help='Run every case in this process; peak RSS is then cumulative')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    # The app logs at DEBUG; keep the benchmark output readable
+    logging.disable(logging.WARNING)
+
+    pages = load_corpus(args.pages, args.corpus_dir)
+    if args.worker:
+        # Subprocess of run_isolated: one case on one page, stats as JSON on stdout
+        name, html = next(iter(pages.items()))
+        print(json.dumps(run_case(args.cases[0], name, html, args.repeat, args.llm_latency)))
+        return
+
+    report = run_suite(
+        pages, args.cases, args.repeat, args.llm_latency,
+        corpus_dir=args.corpus_dir, isolate=not args.in_process, include_slow=args.include_slow
+    )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == '__main__':
+    main()
@@ -126,6 +126,18 @@ document.addEventListener('DOMContentLoaded', function() {
     function analyzeWebpage(url, paginationEnabled, paginationSelectorValue) {
         loadingStatus.textContent = 'Fetching webpage content...';
         
+        // Badge to update for each streamed field validation
+        const fieldBadges = {
+            'title': titleValidation,
+            'url': urlValidation,
+            'image': imageValidation,
+            'price': priceValidation
+        };
+        let analysisComplete = false;
+        // Sample data sent once per change, referenced by id from later events
+        const samples = {};
+        let initialSelectors = {};
+        
         fetch('/analyze', {
             method: 'POST',
             headers: {
@@ -145,46 +157,47 @@ document.addEventListener('DOMContentLoaded', function() {
                     throw new Error(data.error || 'Error analyzing webpage');
                 });
             }
-            return response.json();
-        })
-        .then(data => {
-            console.log('Analysis response:', data);
-            
-            if (!data.selectors) {
-                throw new Error('Selectors data is missing from the response.');
-            }
-            
-            // Save current selectors
-            currentSelectors = data.selectors;
-            
-            // Update UI with selectors
-            updateSelectorsDisplay(data.selectors);
-            
-            // Update validation UI
-            updateValidationDisplay(data);
-            
-            // Update script code
-            scriptCode.textContent = data.script;
-            Prism.highlightElement(scriptCode);
             
-            // Set up validation details toggle
-            toggleValidationDetailsBtn.addEventListener('click', function() {
-                if (validationDetails.classList.contains('d-none')) {
-                    validationDetails.classList.remove('d-none');
-                    this.innerHTML = '<i class="fas fa-chevron-up me-1"></i> Hide Details';
-                } else {
-                    validationDetails.classList.add('d-none');
-                    this.innerHTML = '<i class="fas fa-chevron-down me-1"></i> Show Details';
+            // Render each event as it arrives instead of waiting for the whole analysis
+            return readNdjsonStream(response, event => {
+                if (event.error) {
+                    throw new Error(event.error);
+                }
+                
+                if (event.type === 'sample_data') {
+                    samples[event.id] = event.sample_data;
+                } else if (event.type === 'init') {
+                    // Show the detected selectors right away, with every field pending
+                    initialSelectors = Object.assign({}, event.selectors);
+                    currentSelectors = event.selectors;
+                    updateSelectorsDisplay(event.selectors);
+                    Object.values(fieldBadges).forEach(badge => {
+                        badge.className = 'badge rounded-pill text-bg-secondary';
+                        badge.textContent = 'Pending';
+                    });
+                    validationBadge.className = 'badge text-bg-warning me-2';
+                    validationBadge.textContent = 'Validation: In Progress';
+                    loadingStatus.textContent = 'Validating selectors...';
+                    resultsSection.classList.remove('d-none');
+                } else if (event.type === 'validation') {
+                    // Update the field's selector and badge as soon as it is validated
+                    currentSelectors[`product_${event.field}`] = event.selector;
+                    updateSelectorsDisplay(currentSelectors);
+                    if (fieldBadges[event.field]) {
+                        updateFieldValidationBadge(fieldBadges[event.field], event.validation);
+                    }
+                    loadingStatus.textContent = `Validated ${capitalizeField(event.field)} (iteration ${event.iteration})...`;
+                } else if (event.type === 'complete') {
+                    analysisComplete = true;
+                    event.validation_history = expandValidationHistory(event.validation_history, initialSelectors, samples);
+                    showAnalysisResult(event);
                 }
             });
-            
-            // Show results
-            loadingSection.classList.add('d-none');
-            scraperForm.classList.remove('d-none');
-            resultsSection.classList.remove('d-none');
-            validationSection.classList.remove('d-none');
-            scriptSection.classList.remove('d-none');
-            instructionsSection.classList.remove('d-none');
+        })
+        .then(() => {
+            if (!analysisComplete) {
+                throw new Error('The analysis ended before it was complete.');
+            }
         })
         .catch(error => {
             console.error('Error:', error);
@@ -194,6 +207,65 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Function to rebuild full history entries from the compact stream protocol
+    function expandValidationHistory(history, initialSelectors, samples) {
+        let selectors = initialSelectors;
+        return (history || []).map(entry => {
+            if (!('selector_changes' in entry)) {
+                return entry;  // Already a full entry
+            }
+            selectors = Object.assign({}, selectors, entry.selector_changes);
+            return {
+                iteration: entry.iteration,
+                field: entry.field,
+                selectors: selectors,
+                sample_data: samples[entry.sample_id] || [],
+                validation: entry.validation
+            };
+        });
+    }
+    
+    // Function to show the final result of an analysis
+    function showAnalysisResult(data) {
+        console.log('Analysis response:', data);
+        
+        if (!data.selectors) {
+            throw new Error('Selectors data is missing from the response.');
+        }
+        
+        // Save current selectors
+        currentSelectors = data.selectors;
+        
+        // Update UI with selectors
+        updateSelectorsDisplay(data.selectors);
+        
+        // Update validation UI
+        updateValidationDisplay(data);
+        
+        // Update script code
+        scriptCode.textContent = data.script;
+        Prism.highlightElement(scriptCode);
+        
+        // Set up validation details toggle
+        toggleValidationDetailsBtn.addEventListener('click', function() {
+            if (validationDetails.classList.contains('d-none')) {
+                validationDetails.classList.remove('d-none');
+                this.innerHTML = '<i class="fas fa-chevron-up me-1"></i> Hide Details';
+            } else {
+                validationDetails.classList.add('d-none');
+                this.innerHTML = '<i class="fas fa-chevron-down me-1"></i> Show Details';
+            }
+        });
+        
+        // Show results
+        loadingSection.classList.add('d-none');
+        scraperForm.classList.remove('d-none');
+        resultsSection.classList.remove('d-none');
+        validationSection.classList.remove('d-none');
+        scriptSection.classList.remove('d-none');
+        instructionsSection.classList.remove('d-none');
+    }
+    
     // Function to update the validation display
     function updateValidationDisplay(data) {
         const validationSummary = data.validation_summary;
@@ -508,6 +580,29 @@ document.addEventListener('DOMContentLoaded', function() {
         exportScrapedDataAsCSV();
     });
     
+    // Function to read a newline-delimited JSON stream, calling onEvent for each line as it arrives
+    function readNdjsonStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                const lines = buffer.split('\n');
+                buffer = done ? '' : lines.pop();
+                
+                lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+                
+                if (!done) {
+                    return pump();
+                }
+            });
+        }
+        
+        return pump();
+    }
+    
     // Function to run the scraper
     function runScraper() {
         // Reset and show scraped data section
@@ -519,6 +614,9 @@ document.addEventListener('DOMContentLoaded', function() {
         // Scroll to the data section
         scrapedDataSection.scrollIntoView({ behavior: 'smooth' });
         
+        // Reset scraped data; rows are added as each page arrives
+        scrapedData = [];
+        
         // Send request to server
         fetch('/run-scraper', {
             method: 'POST',
@@ -526,9 +624,11 @@ document.addEventListener('DOMContentLoaded', function() {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                script: scriptCode.textContent,
+                selectors: currentSelectors,
                 url: currentUrl,
-                format: 'json',
+                format: 'ndjson',
+                pagination_enabled: paginationToggle.checked,
+                pagination_selector: paginationSelector.value.trim(),
                 max_pages: 3  // Limit to 3 pages for safety
             }),
         })
@@ -538,29 +638,32 @@ document.addEventListener('DOMContentLoaded', function() {
                     throw new Error(data.error || 'Error running scraper');
                 });
             }
-            return response.json();
-        })
-        .then(data => {
-            console.log('Scraper response:', data);
-            
-            // Save scraped data
-            scrapedData = data.scraped_data || [];
             
-            // Update scraped count
-            scrapedCount.textContent = `${scrapedData.length} items`;
-            
-            // Clear and update the table
-            updateScrapedDataTable(scrapedData);
-            
-            // Hide loading, show content
-            scraperResultsLoading.classList.add('d-none');
-            scraperResultsContent.classList.remove('d-none');
+            return readNdjsonStream(response, event => {
+                if (event.error) {
+                    throw new Error(event.error);
+                }
+                
+                if (event.type === 'page') {
+                    // Save scraped data and show the rows of this page right away
+                    scrapedData = scrapedData.concat(event.products);
+                    scrapedCount.textContent = `${scrapedData.length} items`;
+                    updateScrapedDataTable(scrapedData);
+                    
+                    // Hide loading, show content
+                    scraperResultsLoading.classList.add('d-none');
+                    scraperResultsContent.classList.remove('d-none');
+                } else if (event.type === 'complete') {
+                    console.log('Scraper finished:', event);
+                }
+            });
         })
         .catch(error => {
             console.error('Error:', error);
             
             // Show error state
             scraperResultsLoading.classList.add('d-none');
+            scraperResultsContent.classList.add('d-none');
             scraperResultsError.classList.remove('d-none');
             
             // Update error message
@@ -641,9 +744,12 @@ document.addEventListener('DOMContentLoaded', function() {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    script: scriptCode.textContent,
+                    selectors: currentSelectors,
                     url: currentUrl,
                     format: 'csv',
+                    stream: true,
+                    pagination_enabled: paginationToggle.checked,
+                    pagination_selector: paginationSelector.value.trim(),
                     max_pages: 3  // Limit to 3 pages for safety
                 }),
             })
@@ -0,0 +1,95 @@
+"""
+Page cache tests against a local HTTP server standing in for a real site.
+"""
+import http.server
+import os
+import threading
+
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+
+import pytest
+
+from utils.page_cache import PageCache, get_page_cache, set_page_cache
+from utils.scraper import fetch_page
+
+PAGE = b"<html><body><div class='product-card'>Item</div></body></html>"
+ETAG = '"v1"'
+
+class ValidatingHandler(http.server.BaseHTTPRequestHandler):
+    """Serves PAGE with an ETag and answers matching If-None-Match with a 304."""
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == ETAG:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', ETAG)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    ValidatingHandler.statuses = []
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ValidatingHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def page_cache(tmp_path):
+    previous = get_page_cache()
+    cache = PageCache(str(tmp_path))
+    set_page_cache(cache)
+    yield cache
+    set_page_cache(previous)
+
+def test_stale_pages_are_revalidated_with_conditional_get(server, page_cache):
+    first = fetch_page(f"{server}/list")
+    second = fetch_page(f"{server}/list")
+
+    assert ValidatingHandler.statuses == [200, 304]
+    assert first["from_cache"] is False
+    assert second["from_cache"] is True
+    assert second["html"] == first["html"] == PAGE.decode()
+    assert page_cache.stats()["revalidated"] == 1
+
+def test_cache_evicts_least_recently_used_pages_over_size_limit(tmp_path):
+    headers = {'ETag': ETAG}
+    cache = PageCache(str(tmp_path), max_bytes=3 * 1000)
+    for index in range(3):
+        cache.store(f"http://example.com/{index}", headers, b"x" * 900, 'utf-8')
+        # Distinct mtimes so the least recently used order is well defined
+        meta_path = cache._paths(f"http://example.com/{index}")[0]
+        os.utime(meta_path, (index, index))
+    cache.get("http://example.com/0")
+
+    cache.store("http://example.com/3", headers, b"x" * 900, 'utf-8')
+
+    assert cache.get("http://example.com/1") is None
+    assert cache.get("http://example.com/0") is not None
+    assert cache.get("http://example.com/3") is not None
+    assert cache.stats()["evicted"] >= 1
+    assert cache.stats()["bytes"] <= 3 * 1000
+
+def test_storing_a_page_again_does_not_grow_the_cache_size(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10 * 1000)
+    for _ in range(20):
+        cache.store("http://example.com/page", {'ETag': ETAG}, b"x" * 900, 'utf-8')
+
+    assert cache.stats()["bytes"] == 900
+    assert cache.stats()["evicted"] == 0
@@ -0,0 +1,49 @@
+"""
+Page fetching tests against a local HTTP server.
+"""
+import http.server
+import os
+import threading
+
+os.environ.setdefault("PAGE_CACHE_ENABLED", "false")
+
+import pytest
+
+from utils.scraper import fetch_page
+
+PAGE = '<html><head><meta charset="iso-8859-1"></head><body><p class="price">Café 5€</p></body></html>'
+
+class CharsetHandler(http.server.BaseHTTPRequestHandler):
+    """Serves PAGE encoded as Latin-1 with the charset given by the path in Content-Type."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = PAGE.replace('€', 'EUR').encode('iso-8859-1')
+        self.send_response(200)
+        self.send_header('Content-Type', f'text/html; charset={self.path.strip("/")}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), CharsetHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_declared_charset_is_used(server):
+    page = fetch_page(f"{server}/iso-8859-1", use_cache=False)
+
+    assert 'Café 5EUR' in page["html"]
+
+def test_unknown_declared_charset_falls_back_to_sniffing(server):
+    page = fetch_page(f"{server}/bogus-xyz", use_cache=False)
+
+    assert page is not None
+    assert 'Café 5EUR' in page["html"]
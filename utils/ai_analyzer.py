@@ -2,6 +2,9 @@ import logging
 import os
 import json
 from openai import OpenAI
+from utils.html_condenser import condense_html
+from utils.llm_cache import cached_chat_completion
+from utils.tracing import traced
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -13,6 +16,35 @@ logger = logging.getLogger(__name__)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 openai = OpenAI(api_key=OPENAI_API_KEY)
 
+# Size of the condensed HTML sent for page analysis, in tokens
+ANALYSIS_HTML_TOKEN_BUDGET = int(os.environ.get("ANALYSIS_HTML_TOKEN_BUDGET", 4000))
+
+# Maximum number of candidate product/pagination elements listed in the prompt
+MAX_PROMPT_CANDIDATES = 20
+
+def summarize_product_elements(possible_product_elements, limit=MAX_PROMPT_CANDIDATES):
+    """
+    Collapse candidate product elements that share a CSS path into one entry.
+    
+    Args:
+        possible_product_elements (list): Candidates from parse_html
+        limit (int): Maximum number of entries to return
+        
+    Returns:
+        list: One entry per path with a repeat count, most repeated first
+    """
+    summary = {}
+    for element in possible_product_elements:
+        entry = summary.get(element.get('path'))
+        if entry is None:
+            entry = dict(element, count=0)
+            summary[element.get('path')] = entry
+        entry['count'] += 1
+        for flag in ['has_image', 'has_price', 'has_title', 'has_link']:
+            entry[flag] = entry[flag] or element.get(flag, False)
+    return sorted(summary.values(), key=lambda entry: entry['count'], reverse=True)[:limit]
+
+@traced("analyze_page_structure")
 def analyze_page_structure(parsed_data):
     """
     Analyze the parsed page data using OpenAI to identify CSS selectors for products.
@@ -80,8 +112,12 @@ def analyze_page_structure(parsed_data):
         """
         
         # Extract the most relevant information to send to the AI
-        # We'll limit the HTML content to avoid token limit issues
-        html_sample = parsed_data.get("raw_html", "")[:15000]  # First 15K characters should be enough for analysis
+        # Condense the page so the products, not the <head> and scripts, fit the token budget
+        html_sample = condense_html(
+            parsed_data.get("document") or parsed_data.get("raw_html", ""),
+            parsed_data.get("base_url"),
+            token_budget=ANALYSIS_HTML_TOKEN_BUDGET
+        )
         
         # Create user message
         user_message = f"""
@@ -89,12 +125,14 @@ def analyze_page_structure(parsed_data):
         URL: {parsed_data.get('base_url', 'No URL')}
         
         Possible Product Elements:
-        {json.dumps(parsed_data.get('possible_product_elements', []), indent=2)}
+        {json.dumps(summarize_product_elements(parsed_data.get('possible_product_elements', [])), indent=2)}
         
         Possible Pagination Elements:
-        {json.dumps(parsed_data.get('possible_pagination', []), indent=2)}
+        {json.dumps(list(dict.fromkeys(parsed_data.get('possible_pagination', [])))[:MAX_PROMPT_CANDIDATES], indent=2)}
         
-        HTML Sample (truncated for brevity):
+        Condensed HTML (scripts, styles and non-essential attributes removed; runs of
+        repeated sibling elements are shortened to a few examples followed by a
+        "<!-- N more ... like above -->" comment):
         ```html
         {html_sample}
         ```
@@ -134,7 +172,8 @@ def analyze_page_structure(parsed_data):
         """
         
         # Query OpenAI
-        response = openai.chat.completions.create(
+        content = cached_chat_completion(
+            openai,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -145,7 +184,7 @@ def analyze_page_structure(parsed_data):
         )
         
         # Parse the response
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(content)
         logger.debug(f"AI Analysis Result: {result}")
         
         return result
@@ -0,0 +1,230 @@
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.ai_analyzer import analyze_page_structure
+from utils.fingerprint import group_by_template
+from utils.rate_limiter import get_rate_limiter
+from utils.scraper import features_for, fetch_page, parse_document, parse_html
+from utils.selector_inference import HEURISTIC_CONFIDENCE_THRESHOLD, infer_selectors
+from utils.template_store import basic_field_validations, match_template, remember_template
+
+logger = logging.getLogger(__name__)
+
+# Batch analysis configuration
+BATCH_MAX_URLS = int(os.environ.get("BATCH_MAX_URLS", 50))  # URLs accepted per batch request
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", 8))  # Pages fetched and templates analyzed at the same time
+
+# Pages of a template tried before giving up on detecting its selectors
+TEMPLATE_LEAD_ATTEMPTS = 3
+
+# parse_html outputs read by detect_selectors
+DETECTION_FEATURES = features_for('infer_selectors', 'analyze_page_structure')
+
+def detect_selectors(document, parsed_data, url):
+    """
+    Find product selectors for a page: the local heuristics first, the AI only
+    when they are not confident enough.
+
+    Args:
+        document (ParsedDocument): The parsed page
+        parsed_data (dict): Output of parse_html for the same page, with at least
+            DETECTION_FEATURES
+        url (str): URL of the page
+
+    Returns:
+        tuple: (selectors dict or None, source 'heuristic' or 'ai')
+    """
+    selectors, confidence = infer_selectors(document, parsed_data, url)
+    if selectors and confidence >= HEURISTIC_CONFIDENCE_THRESHOLD:
+        return selectors, "heuristic"
+    logger.debug(f"Heuristic confidence {confidence:.2f} below threshold, using AI analysis")
+    return analyze_page_structure(parsed_data), "ai"
+
+def _fetch_document(url, parser):
+    """Fetch and parse one page of a batch, within the per-host rate limit."""
+    get_rate_limiter().acquire(url)
+    page = fetch_page(url)
+    if not page or not page["html"]:
+        return None, None
+    return page, parse_document(page["html"], url, parser)
+
+def fetch_documents(urls, parser=None, max_workers=None):
+    """
+    Fetch and parse pages concurrently over the shared keep-alive session.
+
+    Args:
+        urls (list): Page URLs
+        parser (str): Parser backend (defaults to DEFAULT_PARSER)
+        max_workers (int): Pages fetched at the same time (defaults to BATCH_MAX_WORKERS)
+
+    Returns:
+        list: (page dict, ParsedDocument) per URL, in order, with (None, None) for failed fetches
+    """
+    max_workers = max(1, min(max_workers or BATCH_MAX_WORKERS, len(urls) or 1))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _fetch_document, url, parser) for url in urls]
+        results = []
+        for url, future in zip(urls, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error fetching {url} for batch analysis: {str(e)}")
+                results.append((None, None))
+        return results
+
+def _field_validations(document, selectors, url):
+    """Check selectors against a page with the pattern-based validator (no AI calls)."""
+    return {
+        field: validation["valid"]
+        for field, validation in basic_field_validations(document, selectors, url).items()
+    }
+
+def _analyze_page(document, url):
+    """Find and validate selectors for a single page, from a stored template if one fits."""
+    selectors, validations = match_template(document, url)
+    if selectors:
+        return selectors, "template", {field: validation["valid"] for field, validation in validations.items()}
+    
+    selectors, source = detect_selectors(document, parse_html(document, url, DETECTION_FEATURES), url)
+    if not selectors:
+        return None, source, {}
+    validation = _field_validations(document, selectors, url)
+    if all(validation.values()):
+        remember_template(document, url, selectors)
+    return selectors, source, validation
+
+def _page_result(url, template, page, selectors=None, source=None, validation=None, reused_from=None, error=None):
+    return {
+        "type": "result",
+        "url": url,
+        "template": template,
+        "selectors": selectors,
+        "selector_source": source,
+        "reused_from": reused_from,
+        "validation": validation or {},
+        "truncated": page["truncated"] if page else False,
+        "error": error
+    }
+
+def analyze_template_group(template, members):
+    """
+    Analyze one group of same-template pages.
+
+    Pages are analyzed in order until selector detection succeeds on one of them
+    (at most TEMPLATE_LEAD_ATTEMPTS pages). Every other page gets the same
+    selectors if they pass basic validation on it for at least the fields that
+    passed on that page; otherwise it is analyzed on its own, unless detection
+    already failed on it.
+
+    Args:
+        template (int): Group number
+        members (list): (url, page dict, ParsedDocument) per page, first page first
+
+    Returns:
+        list: Per-URL result dicts
+    """
+    selectors, lead = None, None
+    for index, (url, page, document) in enumerate(members[:TEMPLATE_LEAD_ATTEMPTS]):
+        try:
+            selectors, source, validation = _analyze_page(document, url)
+        except Exception as e:
+            logger.error(f"Error analyzing {url}: {str(e)}")
+            selectors = None
+        if selectors:
+            lead = index
+            break
+        logger.debug(f"Could not analyze {url}, trying the next page of template {template}")
+    if not selectors:
+        error = "Failed to analyze page structure"
+        return [_page_result(member[0], template, member[1], error=error) for member in members]
+
+    url, page, _ = members[lead]
+    results = [_page_result(url, template, page, selectors, source, validation)]
+    required = [field for field, valid in validation.items() if valid]
+    for index, (member_url, member_page, member_document) in enumerate(members):
+        if index == lead:
+            continue
+        try:
+            member_validation = _field_validations(member_document, selectors, member_url)
+            if required and all(member_validation[field] for field in required):
+                results.append(_page_result(
+                    member_url, template, member_page, selectors, "reused", member_validation, reused_from=url
+                ))
+                continue
+
+            if index < lead:
+                # Detection already failed on this page
+                results.append(_page_result(member_url, template, member_page, error="Failed to analyze page structure"))
+                continue
+            logger.debug(f"Selectors of {url} do not fit {member_url}, analyzing it separately")
+            member_selectors, member_source, member_validation = _analyze_page(member_document, member_url)
+            if not member_selectors:
+                results.append(_page_result(member_url, template, member_page, error="Failed to analyze page structure"))
+                continue
+            results.append(_page_result(member_url, template, member_page, member_selectors, member_source, member_validation))
+        except Exception as e:
+            logger.error(f"Error analyzing {member_url}: {str(e)}")
+            results.append(_page_result(member_url, template, member_page, error=f"Error analyzing page: {str(e)}"))
+    return results
+
+def iter_batch_analysis(urls, parser=None, max_workers=None, threshold=None):
+    """
+    Analyze many pages, running selector detection once per page template.
+
+    Pages are fetched concurrently, grouped by DOM skeleton similarity, and each
+    group is analyzed with analyze_template_group, groups running concurrently.
+
+    Yields, in order: an 'init' event with the template groups, a 'result' event
+    per URL as soon as its group is done (failed fetches first), and a 'complete'
+    event with the totals.
+
+    Args:
+        urls (list): Page URLs
+        parser (str): Parser backend (defaults to DEFAULT_PARSER)
+        max_workers (int): Concurrency for fetching and analysis (defaults to BATCH_MAX_WORKERS)
+        threshold (float): Template similarity threshold (defaults to TEMPLATE_SIMILARITY_THRESHOLD)
+    """
+    start = time.monotonic()
+    max_workers = max_workers or BATCH_MAX_WORKERS
+    fetched = fetch_documents(urls, parser, max_workers)
+
+    pages = [(url, page, document) for url, (page, document) in zip(urls, fetched) if document is not None]
+    groups = group_by_template([document.fingerprint for _, _, document in pages], threshold)
+    groups = [[pages[index] for index in group] for group in groups]
+
+    yield {
+        "type": "init",
+        "urls": len(urls),
+        "templates": [[url for url, _, _ in group] for group in groups]
+    }
+
+    counts = {"template": 0, "heuristic": 0, "ai": 0, "reused": 0, "failed": 0}
+    for url, (_, document) in zip(urls, fetched):
+        if document is None:
+            counts["failed"] += 1
+            yield _page_result(url, None, None, error="Failed to fetch the webpage")
+
+    if groups:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, analyze_template_group, template, group)
+                for template, group in enumerate(groups)
+            ]
+            for future in as_completed(futures):
+                for result in future.result():
+                    counts[result["selector_source"] if not result["error"] else "failed"] += 1
+                    yield result
+
+    yield {
+        "type": "complete",
+        "count": len(urls),
+        "templates": len(groups),
+        "analyzed": counts["heuristic"] + counts["ai"],
+        "ai_analyses": counts["ai"],
+        "reused": counts["reused"],
+        "from_store": counts["template"],
+        "failed": counts["failed"],
+        "seconds": round(time.monotonic() - start, 3)
+    }
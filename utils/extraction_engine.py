@@ -0,0 +1,538 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode, urlunparse
+from utils.rate_limiter import get_rate_limiter
+from utils.scraper import fetch_page, parse_document
+from utils.selector_cache import compile_selector
+from utils.worker_pool import WorkerError, get_worker_pool
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Hard upper bound on pages, matching the default of generated scripts
+MAX_PAGES_LIMIT = 10
+
+# Containers per page on which every fallback selector is tried before the winner is reused
+SELECTOR_SAMPLE_SIZE = 3
+
+# 'concurrent' fans out predictable ?page=N URLs over a worker pool, 'sequential' follows links one by one
+CRAWL_MODE = os.environ.get("CRAWL_MODE", "concurrent")
+CRAWL_MAX_WORKERS = int(os.environ.get("CRAWL_MAX_WORKERS", 4))
+
+# 'process' scrapes each page in the sandboxed worker pool, 'thread' in the calling thread
+SCRAPE_ISOLATION = os.environ.get("SCRAPE_ISOLATION", "process")
+
+# Fields written for every product, in CSV column order
+PRODUCT_FIELDS = ['title', 'url', 'image_url', 'price']
+
+# Fallback selectors tried after the configured one, as in the generated script
+TITLE_FALLBACKS = [
+    ".product-title", ".product-name", ".title", ".name",
+    "h1.product-title", "h2.product-title", "h3.product-title",
+    "h1", "h2", "h3", "h4", "h5",
+    "a[title]"
+]
+URL_FALLBACKS = [
+    "a.product-link", "a.details", ".product-title a", ".title a", ".name a",
+    "a:not(.pagination-link):not(.nav-link)"
+]
+IMAGE_FALLBACKS = [
+    ".product-image", ".product-img", ".product-photo",
+    "a:first-child img", ".product-thumbnail img", ".image img",
+    "img.product", "img.thumbnail", "img"
+]
+PRICE_FALLBACKS = [
+    ".price", ".product-price", ".offer-price", ".sale-price",
+    "span.price", "div.price", "p.price",
+    ".cost", ".amount", ".value",
+    "*[itemprop='price']",
+    "*:-soup-contains('$')", "*:-soup-contains('€')", "*:-soup-contains('£')"
+]
+
+NAV_INDICATORS = ['nav', 'navigation', 'menu', 'footer', 'header', 'breadcrumb']
+NAV_TAGS = frozenset(['nav', 'header', 'footer', 'menu'])
+NAV_ATTRIBUTES = ('class', 'id', 'role')
+SKIP_URL_WORDS = ['login', 'cart', 'account', 'search']
+SKIP_IMAGE_INDICATORS = ['icon', 'logo', 'banner', 'button', 'pixel.gif', 'spacer.gif']
+IMAGE_SOURCE_ATTRIBUTES = ['src', 'data-src', 'data-original', 'data-lazy-src', 'data-srcset']
+PRICE_PATTERN = re.compile(r'\d+\.\d{2}')
+
+def _try_compile(selector):
+    """Compile a selector through the shared cache, or return None if it is invalid."""
+    try:
+        return compile_selector(selector)
+    except Exception as e:
+        logger.debug(f"Skipping invalid selector {selector!r}: {str(e)}")
+        return None
+
+def _compile_chain(primary, fallbacks):
+    """Compile the configured selector followed by its fallbacks, skipping invalid ones."""
+    chain = []
+    for selector in [primary, *fallbacks]:
+        if selector:
+            compiled = _try_compile(selector)
+            if compiled is not None:
+                chain.append((selector, compiled))
+    return chain
+
+def _is_navigation(container):
+    """
+    Check whether a container is probably navigation rather than a product.
+
+    Navigation has more than three links plus a navigation element or a nav-like
+    class, id or role. Only tag names and attributes are inspected, so the
+    container is never serialized.
+    """
+    if len(container.find_all('a', limit=4)) <= 3:
+        return False
+    for element in [container, *container.find_all(True)]:
+        if element.name in NAV_TAGS:
+            return True
+        for attribute in NAV_ATTRIBUTES:
+            value = element.get(attribute)
+            if not value:
+                continue
+            value = (' '.join(value) if isinstance(value, list) else value).lower()
+            if any(indicator in value for indicator in NAV_INDICATORS):
+                return True
+    return False
+
+def _find_title(container, chain):
+    for selector, compiled in chain:
+        element = compiled.select_one(container)
+        if element:
+            text = element.text.strip()
+            if 3 <= len(text) <= 200:
+                return text, selector
+    return None, None
+
+def _find_url(container, chain):
+    for selector, compiled in chain:
+        for link in compiled.iselect(container):
+            href = link.get('href')
+            if href is None:
+                continue
+            if href.startswith('javascript:') or href == '#':
+                continue
+            if any(word in href.lower() for word in SKIP_URL_WORDS):
+                continue
+            return href, selector
+    return None, None
+
+def _image_source(image):
+    for attribute in IMAGE_SOURCE_ATTRIBUTES:
+        src = image.get(attribute)
+        if src and not src.startswith('data:'):
+            if attribute == 'data-srcset':
+                src = src.split(',')[0].split(' ')[0]
+            return src
+    return None
+
+def _find_image(container, chain):
+    for selector, compiled in chain:
+        for image in compiled.iselect(container):
+            if not (image.has_attr('src') or image.has_attr('data-src')):
+                continue
+            width, height = image.get('width', ''), image.get('height', '')
+            if width and height and width.isdigit() and height.isdigit() and int(width) < 50 and int(height) < 50:
+                continue
+            src = image.get('src', image.get('data-src', ''))
+            if any(indicator in src.lower() for indicator in SKIP_IMAGE_INDICATORS):
+                continue
+            return _image_source(image), selector
+    return None, None
+
+def _find_price(container, chain):
+    for selector, compiled in chain:
+        for candidate in compiled.iselect(container):
+            text = candidate.text.strip()
+            if text and any(c in text for c in ['$', '€', '£', 'USD', 'EUR', 'GBP']) or PRICE_PATTERN.search(text):
+                return text, selector
+    return None, None
+
+# Field finders: each returns (raw value, selector that matched) for a container
+FIELD_FINDERS = {
+    'title': _find_title,
+    'url': _find_url,
+    'image': _find_image,
+    'price': _find_price
+}
+
+def build_field_chains(selectors):
+    """
+    Compile the selector chains used to extract each product field.
+
+    Args:
+        selectors (dict): Dictionary containing CSS selectors for product elements
+
+    Returns:
+        dict: Compiled (selector, pattern) chains for container, title, url, image and price
+    """
+    return {
+        'container': _compile_chain(selectors.get('product_container'), []),
+        'title': _compile_chain(selectors.get('product_title'), TITLE_FALLBACKS),
+        'url': _compile_chain(selectors.get('product_url'), URL_FALLBACKS),
+        'image': _compile_chain(selectors.get('product_image'), IMAGE_FALLBACKS),
+        'price': _compile_chain(selectors.get('product_price'), PRICE_FALLBACKS)
+    }
+
+def _match_fields(container, chains):
+    return {field: finder(container, chains[field]) for field, finder in FIELD_FINDERS.items()}
+
+def prefer_winning_selectors(chains, sample_matches):
+    """
+    Reorder each field's chain so the selector that matched most sampled containers is tried first.
+
+    The rest of the chain stays behind it in its original order, so containers
+    where the winner finds nothing still get every fallback.
+
+    Args:
+        chains (dict): Field chains from build_field_chains
+        sample_matches (list): _match_fields results for the sampled containers
+
+    Returns:
+        dict: Chains with each field's winning selector moved to the front
+    """
+    resolved = dict(chains)
+    for field in FIELD_FINDERS:
+        wins = Counter(matches[field][1] for matches in sample_matches if matches[field][1])
+        if not wins:
+            continue
+        winner = wins.most_common(1)[0][0]
+        chain = chains[field]
+        resolved[field] = [entry for entry in chain if entry[0] == winner] + [entry for entry in chain if entry[0] != winner]
+    return resolved
+
+def extract_products(soup, selectors, base_url):
+    """
+    Extract every product on a parsed page.
+
+    Applies the same container, navigation and fallback-selector logic as the
+    scripts produced by generate_scraping_script. The full fallback chains are
+    only walked for the first SELECTOR_SAMPLE_SIZE containers; the selector that
+    wins there is tried first for the rest of the page.
+
+    Args:
+        soup (BeautifulSoup): Parsed page
+        selectors (dict): Dictionary containing CSS selectors for product elements
+        base_url (str): URL of the page, used to resolve relative links
+
+    Returns:
+        tuple: (list of product dicts, number of containers found)
+    """
+    chains = build_field_chains(selectors)
+    if not chains['container']:
+        return [], 0
+
+    containers = chains['container'][0][1].select(soup)
+    candidates = [container for container in containers if not _is_navigation(container)]
+
+    matches = [_match_fields(container, chains) for container in candidates[:SELECTOR_SAMPLE_SIZE]]
+    chains = prefer_winning_selectors(chains, matches)
+    matches.extend(_match_fields(container, chains) for container in candidates[SELECTOR_SAMPLE_SIZE:])
+
+    products = []
+    for match in matches:
+        title, href, image, price = (match[field][0] for field in ('title', 'url', 'image', 'price'))
+        products.append({
+            'title': title or "N/A",
+            'url': urljoin(base_url, href) if href else "N/A",
+            'image_url': urljoin(base_url, image) if image else "N/A",
+            'price': price or "N/A"
+        })
+
+    return products, len(containers)
+
+def _with_page_param(parsed_url, query_params):
+    return urlunparse((
+        parsed_url.scheme, parsed_url.netloc, parsed_url.path,
+        parsed_url.params, urlencode(query_params, doseq=True), parsed_url.fragment
+    ))
+
+def find_next_page_url(soup, current_url, pagination_selector=None):
+    """
+    Work out the URL of the next page, trying the same methods as generated scripts.
+
+    1. The pagination selector's link, if it matches a real (non-JavaScript) link
+    2. A ?page=N query parameter, incremented or added
+    3. A /page/N path segment, incremented
+
+    Args:
+        soup (BeautifulSoup): Parsed current page
+        current_url (str): URL of the current page
+        pagination_selector (str): CSS selector for the next page link
+
+    Returns:
+        str: Next page URL, or None if there is no way to paginate
+    """
+    # Method 1: CSS Selector-based pagination
+    if pagination_selector:
+        compiled = _try_compile(pagination_selector)
+        next_page = compiled.select_one(soup) if compiled is not None else None
+        if next_page and next_page.has_attr('href'):
+            href = next_page['href']
+            if href.startswith('javascript:') or href == '#':
+                logger.debug(f"Skipping JavaScript pagination link: {href}")
+                return None
+            return urljoin(current_url, href)
+
+    # Method 2: URL Parameter-based pagination (?page=X)
+    parsed_url = urlparse(current_url)
+    query_params = parse_qs(parsed_url.query)
+    if 'page' in query_params:
+        try:
+            query_params['page'] = [str(int(query_params['page'][0]) + 1)]
+            return _with_page_param(parsed_url, query_params)
+        except (ValueError, IndexError):
+            pass
+    else:
+        query_params['page'] = ['2']
+        return _with_page_param(parsed_url, query_params)
+
+    # Method 3: Simple path-based pagination (/page/X)
+    page_pattern = re.search(r'/page/(\d+)', parsed_url.path)
+    if page_pattern:
+        page_num = int(page_pattern.group(1))
+        new_path = re.sub(r'/page/\d+', f'/page/{page_num + 1}', parsed_url.path)
+        return urlunparse((
+            parsed_url.scheme, parsed_url.netloc, new_path,
+            parsed_url.params, parsed_url.query, parsed_url.fragment
+        ))
+
+    return None
+
+def predict_page_urls(current_url, next_url, count):
+    """
+    List the URLs of the following pages when they only differ by a ?page=N parameter.
+
+    Args:
+        current_url (str): URL of the page just scraped
+        next_url (str): URL of the page after it
+        count (int): Number of page URLs to return, starting with next_url
+
+    Returns:
+        list: Page URLs, or an empty list if the page numbers are not predictable
+    """
+    current, following = urlparse(current_url), urlparse(next_url)
+    if (current.scheme, current.netloc, current.path) != (following.scheme, following.netloc, following.path):
+        return []
+
+    current_params, next_params = parse_qs(current.query), parse_qs(following.query)
+    try:
+        current_number = int(current_params.get('page', ['1'])[0])
+        next_number = int(next_params.get('page', [''])[0])
+    except ValueError:
+        return []
+    if next_number != current_number + 1:
+        return []
+    current_params.pop('page', None)
+    next_params.pop('page', None)
+    if current_params != next_params:
+        return []
+
+    urls = []
+    for number in range(next_number, next_number + count):
+        next_params['page'] = [str(number)]
+        urls.append(_with_page_param(following, next_params))
+    return urls
+
+def _empty_result(url):
+    return {"url": url, "products": [], "containers": 0, "next_url": None, "error": None, "timings": {}}
+
+def scrape_page(url, selectors, pagination_enabled=False, pagination_selector=None):
+    """
+    Fetch, parse and extract a single page.
+
+    Args:
+        url (str): Page URL
+        selectors (dict): Dictionary containing CSS selectors for product elements
+        pagination_enabled (bool): Whether to look for the next page
+        pagination_selector (str): CSS selector for the next page link
+
+    Returns:
+        dict: 'url', 'products', 'containers', 'next_url', 'error' and per-stage 'timings'
+    """
+    result = _empty_result(url)
+    timings = result["timings"]
+
+    start = time.perf_counter()
+    page = fetch_page(url)
+    timings['fetch'] = time.perf_counter() - start
+    if not page:
+        result["error"] = f"Failed to fetch {url}"
+        return result
+
+    start = time.perf_counter()
+    soup = parse_document(page["html"], url).soup
+    timings['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result["products"], result["containers"] = extract_products(soup, selectors, url)
+    timings['extract'] = time.perf_counter() - start
+
+    if pagination_enabled and result["containers"]:
+        start = time.perf_counter()
+        result["next_url"] = find_next_page_url(soup, url, pagination_selector)
+        timings['paginate'] = time.perf_counter() - start
+
+    return result
+
+def run_page(url, selectors, pagination_enabled=False, pagination_selector=None):
+    """
+    Scrape one page under the shared per-host rate limit.
+
+    With SCRAPE_ISOLATION set to 'process' the page is scraped in the worker pool,
+    so a page that hangs, loops or exhausts memory only costs its own worker and
+    comes back as an error result.
+
+    Args:
+        url (str): Page URL
+        selectors (dict): Dictionary containing CSS selectors for product elements
+        pagination_enabled (bool): Whether to look for the next page
+        pagination_selector (str): CSS selector for the next page link
+
+    Returns:
+        dict: scrape_page result, with the time spent waiting on the rate limiter
+    """
+    throttle = get_rate_limiter().acquire(url)
+    if SCRAPE_ISOLATION == 'process':
+        try:
+            result = get_worker_pool().run(scrape_page, (url, selectors, pagination_enabled, pagination_selector))
+        except WorkerError as e:
+            logger.error(f"Error scraping {url}: {str(e)}")
+            result = _empty_result(url)
+            result["error"] = f"Error scraping {url}: {str(e)}"
+    else:
+        result = scrape_page(url, selectors, pagination_enabled, pagination_selector)
+
+    result["timings"] = {"throttle": throttle, **result["timings"]}
+    return result
+
+def _scrape_concurrently(urls, selectors, first_page_number, max_workers):
+    """
+    Scrape pages over a worker pool, yielding results in page order.
+
+    Stops at the first page that failed or had no product containers, like the
+    sequential crawl would, and cancels the pages after it that have not started.
+    Pages that have not started are also cancelled when the consumer stops early.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_page, page_url, selectors) for page_url in urls]
+        try:
+            for offset, future in enumerate(futures):
+                result = future.result()
+                result["page"] = first_page_number + offset
+                yield result
+                if result["error"] or not result["containers"]:
+                    return
+        finally:
+            for pending in futures:
+                pending.cancel()
+
+def iter_scrape(selectors, url, max_pages=1, pagination_enabled=False, pagination_selector=None, crawl_mode=None):
+    """
+    Scrape a listing page by page.
+
+    When the second page is reached through a ?page=N parameter, the remaining page
+    URLs are predictable and, in 'concurrent' crawl mode, are fetched in parallel.
+    Requests are throttled per host by the shared rate limiter either way.
+
+    Args:
+        selectors (dict): Dictionary containing CSS selectors for product elements
+        url (str): Starting URL
+        max_pages (int): Maximum number of pages to scrape
+        pagination_enabled (bool): Whether to follow pagination
+        pagination_selector (str): CSS selector for the next page link (defaults
+            to selectors['pagination_next'])
+        crawl_mode (str): 'concurrent' or 'sequential' (defaults to CRAWL_MODE)
+
+    Yields:
+        dict: run_page result for each page, with its 1-based 'page' number
+    """
+    if pagination_enabled and not pagination_selector:
+        pagination_selector = selectors.get('pagination_next')
+    max_pages = max(1, min(max_pages, MAX_PAGES_LIMIT if pagination_enabled else 1))
+    crawl_mode = crawl_mode or CRAWL_MODE
+
+    current_url = url
+    page_number = 1
+    while page_number <= max_pages:
+        result = run_page(current_url, selectors, pagination_enabled and page_number < max_pages, pagination_selector)
+        result["page"] = page_number
+        yield result
+
+        if result["error"] or not result["containers"] or not result["next_url"]:
+            break
+
+        remaining = max_pages - page_number
+        if crawl_mode == 'concurrent' and remaining > 1:
+            page_urls = predict_page_urls(current_url, result["next_url"], remaining)
+            if page_urls:
+                logger.debug(f"Fetching {len(page_urls)} pages concurrently from {page_urls[0]}")
+                yield from _scrape_concurrently(page_urls, selectors, page_number + 1, CRAWL_MAX_WORKERS)
+                break
+
+        current_url = result["next_url"]
+        page_number += 1
+
+def round_timings(timings):
+    """Round stage durations for reporting."""
+    return {stage: round(seconds, 4) for stage, seconds in timings.items()}
+
+def add_timings(totals, timings):
+    """Accumulate one page's stage durations into running totals."""
+    for stage, seconds in timings.items():
+        totals[stage] = totals.get(stage, 0.0) + seconds
+
+def summarize_page(result):
+    """
+    Describe a scraped page without its products.
+
+    Args:
+        result (dict): scrape_page result yielded by iter_scrape
+
+    Returns:
+        dict: Page number, URL, product count and rounded timings
+    """
+    return {
+        "page": result["page"],
+        "url": result["url"],
+        "count": len(result["products"]),
+        "timings": round_timings(result["timings"])
+    }
+
+def run_extraction(selectors, url, max_pages=1, pagination_enabled=False, pagination_selector=None, crawl_mode=None):
+    """
+    Scrape all pages and collect the products with per-stage timings.
+
+    Args:
+        selectors (dict): Dictionary containing CSS selectors for product elements
+        url (str): Starting URL
+        max_pages (int): Maximum number of pages to scrape
+        pagination_enabled (bool): Whether to follow pagination
+        pagination_selector (str): CSS selector for the next page link
+        crawl_mode (str): 'concurrent' or 'sequential' (defaults to CRAWL_MODE)
+
+    Returns:
+        dict: 'products', per-page summaries, summed 'timings' and the first 'error'
+    """
+    products, pages = [], []
+    timings = {}
+    error = None
+    for result in iter_scrape(selectors, url, max_pages, pagination_enabled, pagination_selector, crawl_mode):
+        products.extend(result["products"])
+        pages.append(summarize_page(result))
+        add_timings(timings, result["timings"])
+        error = error or result["error"]
+
+    return {
+        "products": products,
+        "pages": pages,
+        "timings": round_timings(timings),
+        "error": error
+    }
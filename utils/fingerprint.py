@@ -0,0 +1,105 @@
+import logging
+import os
+import re
+import zlib
+from bs4 import Tag
+
+logger = logging.getLogger(__name__)
+
+# Pages at least this similar (Jaccard of their skeleton shingles) share a template
+TEMPLATE_SIMILARITY_THRESHOLD = float(os.environ.get("TEMPLATE_SIMILARITY_THRESHOLD", 0.8))
+
+# Consecutive skeleton tokens per shingle
+SHINGLE_SIZE = 4
+
+# Elements whose subtrees say nothing about the page layout
+IGNORED_TAGS = frozenset(['script', 'style', 'noscript', 'template', 'svg', 'iframe', 'head'])
+
+# Classes that carry ids or state rather than structure, e.g. product-123 or is-active
+VOLATILE_CLASS_PATTERN = re.compile(r'\d|^(is|has)-|active|selected|current|hidden')
+
+def _element_token(element, depth):
+    classes = sorted(c for c in element.get('class', []) if not VOLATILE_CLASS_PATTERN.search(c))
+    return f"{depth}:{element.name}" + ''.join(f".{c}" for c in classes)
+
+def dom_skeleton(soup):
+    """
+    Reduce a page to its layout: one token per element in document order.
+
+    Each token is the element's depth, tag name and stable classes, so text,
+    attributes, product ids and the number of repeated items do not matter, only
+    which kinds of elements are nested where.
+
+    Args:
+        soup (BeautifulSoup): Parsed page
+
+    Returns:
+        list: Skeleton tokens
+    """
+    tokens = []
+    stack = [(child, 0) for child in reversed(soup.contents) if isinstance(child, Tag)]
+    while stack:
+        element, depth = stack.pop()
+        if element.name in IGNORED_TAGS:
+            continue
+        tokens.append(_element_token(element, depth))
+        stack.extend((child, depth + 1) for child in reversed(element.contents) if isinstance(child, Tag))
+    return tokens
+
+def dom_fingerprint(soup, shingle_size=SHINGLE_SIZE):
+    """
+    Fingerprint a page's DOM skeleton as a set of hashed token shingles.
+
+    Repeated structures such as product cards collapse into the same shingles,
+    so listing pages built from one template get near-identical fingerprints
+    whatever their number of products.
+
+    Args:
+        soup (BeautifulSoup): Parsed page
+        shingle_size (int): Consecutive skeleton tokens per shingle
+
+    Returns:
+        frozenset: Shingle hashes
+    """
+    tokens = dom_skeleton(soup)
+    if len(tokens) < shingle_size:
+        return frozenset([zlib.crc32('\n'.join(tokens).encode())]) if tokens else frozenset()
+    return frozenset(
+        zlib.crc32('\n'.join(tokens[i:i + shingle_size]).encode())
+        for i in range(len(tokens) - shingle_size + 1)
+    )
+
+def jaccard(a, b):
+    """Jaccard similarity of two fingerprints, between 0 and 1."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def group_by_template(fingerprints, threshold=None):
+    """
+    Group pages whose fingerprints are similar enough to share a template.
+
+    Each page joins the most similar existing group, compared against the group's
+    first page, or starts a new group if none reaches the threshold.
+
+    Args:
+        fingerprints (list): Fingerprints from dom_fingerprint
+        threshold (float): Minimum similarity (defaults to TEMPLATE_SIMILARITY_THRESHOLD)
+
+    Returns:
+        list: Groups as lists of indexes into fingerprints, in first-seen order
+    """
+    threshold = TEMPLATE_SIMILARITY_THRESHOLD if threshold is None else threshold
+    groups = []
+    for index, fingerprint in enumerate(fingerprints):
+        best_group, best_similarity = None, threshold
+        for group in groups:
+            similarity = jaccard(fingerprint, fingerprints[group[0]])
+            if similarity >= best_similarity:
+                best_group, best_similarity = group, similarity
+        if best_group is None:
+            groups.append([index])
+        else:
+            best_group.append(index)
+            logger.debug(f"Page {index} matches the template of page {best_group[0]} ({best_similarity:.2f})")
+    return groups
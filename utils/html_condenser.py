@@ -0,0 +1,172 @@
+import logging
+import re
+from bs4 import Comment, NavigableString, Tag
+from utils.scraper import parse_document
+
+logger = logging.getLogger(__name__)
+
+# Rough size of one token in characters, used to turn token budgets into lengths
+CHARS_PER_TOKEN = 4
+
+# Elements that never help identify product selectors
+DROP_TAGS = frozenset([
+    'script', 'style', 'svg', 'noscript', 'iframe', 'template', 'canvas',
+    'link', 'meta', 'head', 'object', 'embed', 'video', 'audio', 'source'
+])
+
+# Elements without a closing tag
+VOID_TAGS = frozenset(['img', 'br', 'hr', 'input', 'area', 'col', 'wbr'])
+
+# Attributes worth keeping for selector generation
+KEEP_ATTRIBUTES = ('id', 'class', 'href', 'src', 'data-src', 'alt', 'itemprop', 'itemtype', 'role', 'aria-label', 'title')
+
+# Progressively more aggressive settings: (exemplars per repeated run, max text length)
+CONDENSE_LEVELS = [(2, 80), (1, 40), (1, 20)]
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def _trim(text, limit):
+    """Collapse whitespace and shorten text to the given length."""
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
+    if len(text) > limit:
+        return text[:limit].rstrip() + '…'
+    return text
+
+def _signature(element):
+    """Identify sibling elements that share the same structure."""
+    return element.name, tuple(element.get('class', []))
+
+def _class_names(classes, limit):
+    """
+    Keep whole class names, dropping the ones past the length limit.
+
+    Class names are never shortened, since a cut name would not exist on the page
+    and selectors built from it would match nothing. The first class is always kept.
+    """
+    kept = []
+    length = 0
+    for name in classes:
+        if kept and length + 1 + len(name) > limit:
+            break
+        kept.append(name)
+        length += len(name) + (1 if length else 0)
+    return ' '.join(kept)
+
+def _open_tag(element, text_limit):
+    """Render an element's opening tag with only the useful attributes."""
+    parts = [element.name]
+    for attribute in KEEP_ATTRIBUTES:
+        value = element.get(attribute)
+        if not value:
+            continue
+        if attribute == 'class':
+            value = _class_names(value if isinstance(value, list) else value.split(), text_limit)
+        elif isinstance(value, list):
+            value = ' '.join(value)
+        if attribute not in ('class', 'id'):
+            # IDs and class names are used in selectors as is, so only other values are trimmed
+            value = _trim(value, text_limit)
+        value = value.replace('"', '&quot;')
+        parts.append(f'{attribute}="{value}"')
+    return '<' + ' '.join(parts) + '>'
+
+def _collapse_children(element):
+    """
+    Group an element's children into runs of structurally identical siblings.
+
+    Returns:
+        list: (child, run_length) pairs; run_length is set on the first child of a run
+    """
+    children = []
+    run_start = None
+    for child in element.children:
+        if isinstance(child, Tag):
+            if child.name in DROP_TAGS:
+                continue
+            if run_start is not None and _signature(children[run_start][0]) == _signature(child):
+                children[run_start][1] += 1
+                children.append([child, 0])
+                continue
+            run_start = len(children)
+            children.append([child, 1])
+        elif isinstance(child, NavigableString) and not isinstance(child, Comment):
+            if child.strip():
+                children.append([child, None])
+    return children
+
+def _render(root, exemplars, text_limit):
+    """
+    Serialize a condensed copy of the tree without modifying it.
+
+    Uses an explicit stack so very deep documents do not hit the recursion limit.
+    """
+    output = []
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str) and not isinstance(item, NavigableString):
+            # Closing tag or collapse marker queued earlier
+            output.append(item)
+            continue
+        if isinstance(item, NavigableString):
+            output.append(_trim(str(item), text_limit))
+            continue
+
+        if item.name != '[document]':
+            output.append(_open_tag(item, text_limit))
+            if item.name not in VOID_TAGS:
+                stack.append(f'</{item.name}>')
+
+        pending = []
+        kept = run_total = 0
+        for child, run_length in _collapse_children(item):
+            if run_length is None:
+                pending.append(child)
+                continue
+            if run_length:
+                kept, run_total = 0, run_length
+            if kept < exemplars:
+                pending.append(child)
+                kept += 1
+                if kept == exemplars and run_total > exemplars:
+                    repeated = _open_tag(child, text_limit)
+                    pending.append(f'<!-- {run_total - exemplars} more {repeated} like above -->')
+        stack.extend(reversed(pending))
+    return ''.join(output)
+
+def condense_html(html_content, base_url=None, token_budget=4000):
+    """
+    Condense a page into a compact HTML skeleton for the AI.
+
+    Strips scripts, styles, SVG, comments and the <head>, keeps only
+    selector-relevant attributes, collapses runs of repeated sibling elements to a
+    few exemplars with a repeat count and trims long text. Stronger condensing is
+    applied until the skeleton fits the token budget.
+
+    Args:
+        html_content (str or ParsedDocument): The HTML content of the webpage, or
+            a document already parsed with parse_document
+        base_url (str): Base URL of the webpage
+        token_budget (int): Approximate maximum size of the result in tokens
+
+    Returns:
+        str: Condensed HTML
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    try:
+        soup = parse_document(html_content, base_url).soup
+        root = soup.body or soup
+
+        condensed = ''
+        for exemplars, text_limit in CONDENSE_LEVELS:
+            condensed = _render(root, exemplars, text_limit)
+            if len(condensed) <= max_chars:
+                return condensed
+
+        logger.debug(f"Condensed HTML still {len(condensed)} chars, truncating to {max_chars}")
+        return condensed[:max_chars]
+
+    except Exception as e:
+        logger.error(f"Error condensing HTML: {str(e)}")
+        raw_html = getattr(html_content, 'html', html_content) or ''
+        return raw_html[:max_chars]
@@ -0,0 +1,193 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError
+from urllib3.util import Retry, make_headers
+
+logger = logging.getLogger(__name__)
+
+# Connection pool configuration
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 10))  # Hosts with a cached pool
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 10))  # Connections kept per host
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.5))
+HTTP_MAX_RETRY_AFTER = float(os.environ.get("HTTP_MAX_RETRY_AFTER", 30))  # Longest Retry-After wait in seconds
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # Advertises gzip/deflate, plus brotli and zstd when their decoders are installed
+    'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding']
+}
+
+class ConnectionStats:
+    """
+    Thread-safe counters of requests made and connections opened per host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._connections = defaultdict(int)
+
+    def record_request(self, host):
+        with self._lock:
+            self._requests[host] += 1
+
+    def record_connection(self, host):
+        with self._lock:
+            self._connections[host] += 1
+
+    def snapshot(self):
+        """
+        Get the current counters.
+
+        Returns:
+            dict: Totals, connection reuse ratio and per-host counters
+        """
+        with self._lock:
+            hosts = sorted(set(self._requests) | set(self._connections))
+            per_host = {
+                host: {"requests": self._requests[host], "connections": self._connections[host]}
+                for host in hosts
+            }
+        total_requests = sum(counts["requests"] for counts in per_host.values())
+        total_connections = sum(counts["connections"] for counts in per_host.values())
+        reused = max(0, total_requests - total_connections)
+        return {
+            "requests": total_requests,
+            "connections": total_connections,
+            "reused": reused,
+            "reuse_ratio": round(reused / total_requests, 3) if total_requests else 0.0,
+            "hosts": per_host
+        }
+
+stats = ConnectionStats()
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        stats.record_connection(self.host)
+        return super()._new_conn()
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        stats.record_connection(self.host)
+        return super()._new_conn()
+
+class CappedRetry(Retry):
+    """
+    Retry policy that honours Retry-After only up to HTTP_MAX_RETRY_AFTER seconds.
+
+    A response asking for a longer wait is returned as is instead of being retried,
+    so a server answering with e.g. Retry-After: 86400 cannot block a worker thread.
+    """
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, HTTP_MAX_RETRY_AFTER)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and self.respect_retry_after_header:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                wait = self.parse_retry_after(retry_after) if retry_after else None
+            except Exception:
+                wait = None
+            if wait is not None and wait > HTTP_MAX_RETRY_AFTER:
+                logger.warning(f"Not retrying {url}: server asked to wait {wait:.0f}s (limit {HTTP_MAX_RETRY_AFTER:.0f}s)")
+                raise MaxRetryError(_pool, url, f"Retry-After of {wait:.0f}s exceeds HTTP_MAX_RETRY_AFTER")
+        return super().increment(method, url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace)
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter whose connection pools count the connections they open.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool
+        }
+
+def _count_request(response, *args, **kwargs):
+    """Response hook recording each completed request against its host."""
+    stats.record_request(urlparse(response.url).hostname)
+
+def create_session(pool_connections=None, pool_maxsize=None, max_retries=None, backoff_factor=None):
+    """
+    Create a keep-alive session with per-host connection pools and retries.
+
+    Args:
+        pool_connections (int): Number of hosts to keep a connection pool for
+        pool_maxsize (int): Maximum connections kept open per host
+        max_retries (int): Retries on connection errors and 429/5xx responses; a
+            Retry-After longer than HTTP_MAX_RETRY_AFTER is not waited for
+        backoff_factor (float): Exponential backoff factor between retries
+
+    Returns:
+        requests.Session: Configured session
+    """
+    retry = CappedRetry(
+        total=HTTP_MAX_RETRIES if max_retries is None else max_retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = PooledHTTPAdapter(
+        pool_connections=pool_connections or HTTP_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize or HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.hooks['response'].append(_count_request)
+    return session
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Get the shared module-level session, creating it on first use.
+
+    Returns:
+        requests.Session: Session reused across requests so connections stay open
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+def reset_session():
+    """Close the shared session so the next get_session() starts fresh."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+def get_connection_stats():
+    """
+    Get connection reuse metrics for the shared session.
+
+    Returns:
+        dict: Request and connection counters, see ConnectionStats.snapshot
+    """
+    return stats.snapshot()
@@ -0,0 +1,418 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from utils.extraction_engine import add_timings, iter_scrape, round_timings
+
+logger = logging.getLogger(__name__)
+
+# Job queue configuration
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", 2))  # Scrapes running at the same time
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", os.path.join(".cache", "jobs.sqlite3"))  # Empty keeps jobs in memory
+JOB_HISTORY_SIZE = int(os.environ.get("JOB_HISTORY_SIZE", 200))  # Finished jobs kept before the oldest are dropped
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+UNFINISHED_STATUSES = (QUEUED, RUNNING)
+
+_instance = (None, None)
+
+def process_owner():
+    """
+    Identify the current process as the owner of the jobs it runs.
+
+    The instance ID is regenerated after a fork, and tells this process apart from
+    an earlier one that had the same PID.
+
+    Returns:
+        dict: Host name, PID and instance ID
+    """
+    global _instance
+    pid = os.getpid()
+    if _instance[0] != pid:
+        _instance = (pid, uuid.uuid4().hex)
+    return {"host": socket.gethostname(), "pid": pid, "instance": _instance[1]}
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def owner_is_gone(owner):
+    """
+    Check whether the process that owns a job has exited.
+
+    Only owners on this host can be checked; jobs of other hosts are assumed alive.
+
+    Args:
+        owner (dict): Owner recorded by process_owner
+
+    Returns:
+        bool: True if the owning process no longer exists
+    """
+    if not owner or owner.get("host") != socket.gethostname():
+        return False
+    current = process_owner()
+    if owner.get("pid") == current["pid"]:
+        return owner.get("instance") != current["instance"]
+    return not _pid_alive(owner.get("pid"))
+
+def new_job(params):
+    """
+    Build the record of a newly submitted job.
+
+    Args:
+        params (dict): Scrape parameters, see JobManager.submit
+
+    Returns:
+        dict: Job record in the queued state
+    """
+    return {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "params": params,
+        "pages_done": 0,
+        "rows": 0,
+        "timings": {},
+        "error": None,
+        "cancel_requested": False,
+        "owner": process_owner(),
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None
+    }
+
+class MemoryJobStore:
+    """
+    In-process job store. Jobs are lost when the process exits.
+    """
+
+    def __init__(self, max_finished=JOB_HISTORY_SIZE):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            self._evict()
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, limit=50):
+        with self._lock:
+            return [dict(job) for job in reversed(list(self._jobs.values())[-limit:])]
+
+    def unfinished(self):
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if job["status"] in UNFINISHED_STATUSES]
+
+    def save_result(self, job_id, products):
+        with self._lock:
+            self._results[job_id] = products
+
+    def get_result(self, job_id):
+        with self._lock:
+            return self._results.get(job_id)
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond the history size."""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            self._results.pop(job_id, None)
+
+class SQLiteJobStore:
+    """
+    Job store backed by SQLite, so job status survives restarts and is visible to
+    every worker process sharing the database file. Updates take a write lock
+    before reading the record, so a cancel request from one process is not lost
+    to a progress update from another.
+    """
+
+    def __init__(self, path=JOB_STORE_PATH, max_finished=JOB_HISTORY_SIZE):
+        self.path = path
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, data TEXT NOT NULL, "
+                "result TEXT, created_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def create(self, job):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, data, created_at) VALUES (?, ?, ?, ?)",
+                (job["id"], job["status"], json.dumps(job), job["created_at"])
+            )
+            self._evict(conn)
+
+    def update(self, job_id, **fields):
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            job = json.loads(row[0])
+            job.update(fields)
+            conn.execute(
+                "UPDATE jobs SET status = ?, data = ? WHERE id = ?",
+                (job["status"], json.dumps(job), job_id)
+            )
+
+    def get(self, job_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def list(self, limit=50):
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("SELECT data FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+            return [json.loads(row[0]) for row in rows]
+
+    def unfinished(self):
+        placeholders = ', '.join('?' for _ in UNFINISHED_STATUSES)
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(f"SELECT data FROM jobs WHERE status IN ({placeholders})", UNFINISHED_STATUSES).fetchall()
+            return [json.loads(row[0]) for row in rows]
+
+    def save_result(self, job_id, products):
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET result = ? WHERE id = ?", (json.dumps(products), job_id))
+
+    def get_result(self, job_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return json.loads(row[0]) if row and row[0] is not None else None
+
+    def _evict(self, conn):
+        placeholders = ', '.join('?' for _ in FINISHED_STATUSES)
+        conn.execute(
+            "DELETE FROM jobs WHERE id IN ("
+            f"SELECT id FROM jobs WHERE status IN ({placeholders}) "
+            "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (*FINISHED_STATUSES, self.max_finished)
+        )
+
+class JobManager:
+    """
+    Runs scrapes in a bounded background thread pool and tracks their progress.
+
+    Each job walks the pages yielded by iter_scrape, recording pages done, rows
+    extracted and timings in the store after every page. Cancellation is requested
+    through the store, so any process sharing it can cancel a job, and is checked
+    between pages; the rows of pages already scraped are kept.
+
+    On start, jobs left queued or running by a process that has exited are marked
+    as failed.
+    """
+
+    def __init__(self, store, max_workers=JOB_MAX_WORKERS):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape-job")
+        self._cancel_events = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.recover_orphaned_jobs()
+
+    def recover_orphaned_jobs(self):
+        """
+        Mark jobs whose owning process has exited as failed.
+
+        Returns:
+            int: Number of jobs marked as failed
+        """
+        recovered = 0
+        try:
+            for job in self.store.unfinished():
+                if owner_is_gone(job.get("owner")):
+                    self.store.update(
+                        job["id"], status=FAILED, finished_at=time.time(),
+                        error="The process running this job exited before it finished"
+                    )
+                    recovered += 1
+        except Exception as e:
+            logger.error(f"Error recovering orphaned jobs: {str(e)}")
+        if recovered:
+            logger.warning(f"Marked {recovered} orphaned scrape jobs as failed")
+        return recovered
+
+    def submit(self, params):
+        """
+        Queue a scrape.
+
+        Args:
+            params (dict): Keyword arguments for iter_scrape: selectors, url,
+                max_pages, pagination_enabled, pagination_selector, crawl_mode
+
+        Returns:
+            dict: The queued job record
+        """
+        job = new_job(params)
+        self.store.create(job)
+        with self._lock:
+            self._cancel_events[job["id"]] = threading.Event()
+            self._futures[job["id"]] = self._executor.submit(self._run, job["id"], params)
+        logger.debug(f"Queued scrape job {job['id']} for {params.get('url')}")
+        return job
+
+    def cancel(self, job_id):
+        """
+        Ask a job to stop.
+
+        The request is recorded in the store. A queued job of this process is
+        cancelled immediately; other jobs stop before their next page, whichever
+        process runs them.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            dict: Updated job record, or None if the job is unknown
+        """
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+
+        self.store.update(job_id, cancel_requested=True)
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+            future = self._futures.get(job_id)
+        if event is not None:
+            event.set()
+        if future is not None and future.cancel():
+            self._finish(job_id, CANCELLED)
+        return self.store.get(job_id)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def list(self, limit=50):
+        return self.store.list(limit)
+
+    def result(self, job_id):
+        return self.store.get_result(job_id)
+
+    def _cancel_requested(self, job_id, event):
+        if event.is_set():
+            return True
+        job = self.store.get(job_id)
+        return bool(job and job.get("cancel_requested"))
+
+    def _finish(self, job_id, status, **fields):
+        self.store.update(job_id, status=status, finished_at=time.time(), **fields)
+        with self._lock:
+            self._cancel_events.pop(job_id, None)
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id, params):
+        with self._lock:
+            cancelled = self._cancel_events.get(job_id)
+        if cancelled is None or self._cancel_requested(job_id, cancelled):
+            self._finish(job_id, CANCELLED)
+            return
+
+        self.store.update(job_id, status=RUNNING, started_at=time.time())
+        products = []
+        timings = {}
+        pages_done = 0
+        error = None
+        try:
+            for result in iter_scrape(**params):
+                products.extend(result["products"])
+                add_timings(timings, result["timings"])
+                pages_done += 1
+                error = error or result["error"]
+                self.store.update(job_id, pages_done=pages_done, rows=len(products), timings=round_timings(timings))
+                if self._cancel_requested(job_id, cancelled):
+                    cancelled.set()
+                    break
+
+            self.store.save_result(job_id, products)
+            if cancelled.is_set():
+                self._finish(job_id, CANCELLED)
+            elif not products:
+                self._finish(job_id, FAILED, error=error or "No data was scraped")
+            else:
+                self._finish(job_id, COMPLETED)
+
+        except Exception as e:
+            logger.error(f"Error running scrape job {job_id}: {str(e)}")
+            self.store.save_result(job_id, products)
+            self._finish(job_id, FAILED, error=str(e))
+
+def create_default_store():
+    """
+    Build the job store described by the JOB_* environment variables.
+
+    Returns:
+        SQLiteJobStore or MemoryJobStore: SQLite store if JOB_STORE_PATH is set
+            and usable, in-memory store otherwise
+    """
+    if JOB_STORE_PATH:
+        try:
+            return SQLiteJobStore()
+        except Exception as e:
+            logger.error(f"Error opening job store at {JOB_STORE_PATH}: {str(e)}")
+    return MemoryJobStore()
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """
+    Get the shared job manager, creating it on first use.
+
+    Returns:
+        JobManager: Manager using the default store
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager(create_default_store())
+    return _manager
+
+def set_job_manager(manager):
+    """
+    Replace the shared job manager.
+
+    Args:
+        manager (JobManager): New manager
+    """
+    global _manager
+    _manager = manager
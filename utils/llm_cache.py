@@ -0,0 +1,266 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from utils.tracing import count, record_token_usage, span
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", 256))  # Entries kept in memory
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 24 * 60 * 60))  # Seconds
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3"))
+LLM_CACHE_DISK_SIZE = int(os.environ.get("LLM_CACHE_DISK_SIZE", 10000))  # Entries kept on disk
+
+def make_cache_key(model, messages, response_format=None, **params):
+    """
+    Build a content-addressed cache key for a chat completion request.
+
+    Args:
+        model (str): Model name
+        messages (list): Chat messages sent to the model
+        response_format (dict): Requested response format
+        **params: Any other request parameters that affect the response
+
+    Returns:
+        str: SHA-256 hex digest of the canonical request
+    """
+    payload = json.dumps({
+        "model": model,
+        "messages": messages,
+        "response_format": response_format,
+        "params": params
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class MemoryCache:
+    """
+    In-memory LRU cache tier with a time-to-live per entry.
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+class SQLiteCache:
+    """
+    On-disk cache tier backed by SQLite, with TTL and size-based eviction.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_DISK_SIZE, ttl=LLM_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently used ones over the size limit."""
+        if self.ttl:
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def __len__(self):
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+class LLMCache:
+    """
+    Tiered cache for LLM responses.
+
+    Tiers are checked in order and a hit in a slower tier is copied into the faster
+    ones. Any object with get(key) and set(key, value) methods can be used as a tier.
+    """
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tier_hits = [0] * len(self.tiers)
+
+    def get(self, key):
+        for index, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(key)
+            except Exception as e:
+                logger.error(f"Error reading LLM cache tier {type(tier).__name__}: {str(e)}")
+                continue
+            if value is not None:
+                for faster_tier in self.tiers[:index]:
+                    try:
+                        faster_tier.set(key, value)
+                    except Exception as e:
+                        logger.error(f"Error writing LLM cache tier {type(faster_tier).__name__}: {str(e)}")
+                with self._lock:
+                    self.hits += 1
+                    self.tier_hits[index] += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        for tier in self.tiers:
+            try:
+                tier.set(key, value)
+            except Exception as e:
+                logger.error(f"Error writing LLM cache tier {type(tier).__name__}: {str(e)}")
+
+    def stats(self):
+        """
+        Get hit/miss counters for the cache.
+
+        Returns:
+            dict: Overall hits and misses plus hits per tier
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tiers": {
+                    type(tier).__name__: hits
+                    for tier, hits in zip(self.tiers, self.tier_hits)
+                }
+            }
+
+def create_default_cache():
+    """
+    Build the cache described by the LLM_CACHE_* environment variables.
+
+    Returns:
+        LLMCache: Cache with a memory tier and, if LLM_CACHE_PATH is set, a SQLite tier
+    """
+    tiers = [MemoryCache()]
+    if LLM_CACHE_PATH:
+        try:
+            tiers.append(SQLiteCache())
+        except Exception as e:
+            logger.error(f"Error opening LLM cache at {LLM_CACHE_PATH}: {str(e)}")
+    return LLMCache(tiers)
+
+_cache = create_default_cache() if LLM_CACHE_ENABLED else None
+
+def get_llm_cache():
+    """Return the active LLM cache, or None if caching is disabled."""
+    return _cache
+
+def set_llm_cache(cache):
+    """
+    Replace the active LLM cache.
+
+    Args:
+        cache (LLMCache): New cache, or None to disable caching
+    """
+    global _cache
+    _cache = cache
+
+def cached_chat_completion(client, **request):
+    """
+    Run a chat completion, serving identical requests from the cache.
+
+    Args:
+        client (OpenAI): OpenAI client used on a cache miss
+        **request: Arguments for client.chat.completions.create
+
+    Returns:
+        str: Content of the first choice of the response
+    """
+    cache = _cache
+    key = make_cache_key(**request) if cache is not None else None
+
+    if key is not None:
+        content = cache.get(key)
+        if content is not None:
+            logger.debug(f"LLM cache hit for {request.get('model')} request {key[:12]}")
+            count("llm_cache_hits")
+            return content
+        count("llm_cache_misses")
+
+    with span("llm_request"):
+        response = client.chat.completions.create(**request)
+    count("llm_requests")
+    record_token_usage(getattr(response, "usage", None))
+    content = response.choices[0].message.content
+
+    if key is not None and content:
+        # Only keep responses that honour the requested JSON format
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            try:
+                json.loads(content)
+            except ValueError:
+                return content
+        cache.set(key, content)
+
+    return content
@@ -0,0 +1,363 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", os.path.join(".cache", "pages"))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 500 * 1024 * 1024))  # Total size on disk; 0 for no limit
+
+# Share of PAGE_CACHE_MAX_BYTES kept after an eviction sweep, so sweeps do not run on every store
+PAGE_CACHE_SWEEP_TARGET = 0.9
+
+def parse_cache_control(value):
+    """
+    Parse a Cache-Control header into its directives.
+
+    Args:
+        value (str): Header value, e.g. 'public, max-age=300'
+
+    Returns:
+        dict: Lower-cased directive names mapped to their value (or True)
+    """
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+    return directives
+
+def _parse_http_date(value):
+    """Convert an HTTP date header to a timestamp, or None if missing or invalid."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def freshness_deadline(headers, now=None):
+    """
+    Work out until when a response may be reused without revalidation.
+
+    Args:
+        headers (Mapping): Response headers
+        now (float): Time the response was received (defaults to now)
+
+    Returns:
+        float: Timestamp after which the response is stale
+    """
+    now = time.time() if now is None else now
+    cache_control = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-cache' in cache_control:
+        return now
+
+    max_age = cache_control.get('max-age')
+    if max_age not in (None, True):
+        try:
+            age = int(headers.get('Age') or 0)
+            return now + max(0, int(max_age) - age)
+        except ValueError:
+            return now
+
+    expires = _parse_http_date(headers.get('Expires'))
+    if expires is not None:
+        date = _parse_http_date(headers.get('Date')) or now
+        return now + max(0.0, expires - date)
+
+    # No explicit freshness: always revalidate with the stored validators
+    return now
+
+class CachedPage:
+    """
+    A stored response body with the validators needed to revalidate it.
+    """
+
+    def __init__(self, url, body, encoding, etag=None, last_modified=None, fresh_until=0.0, stored_at=None):
+        self.url = url
+        self.body = body
+        self.encoding = encoding or 'utf-8'
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh_until = fresh_until
+        self.stored_at = stored_at or time.time()
+
+    @property
+    def text(self):
+        return self.body.decode(self.encoding, errors='replace')
+
+    def is_fresh(self, now=None):
+        return (time.time() if now is None else now) < self.fresh_until
+
+    def conditional_headers(self):
+        """
+        Build the request headers that revalidate this entry.
+
+        Returns:
+            dict: If-None-Match and/or If-Modified-Since headers
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class PageCache:
+    """
+    On-disk HTTP cache for fetched pages, keyed by URL.
+
+    Each entry is a body file plus a JSON metadata file holding the validators
+    (ETag, Last-Modified) and the freshness deadline derived from Cache-Control
+    or Expires. Files are replaced atomically so concurrent readers never see a
+    partial entry.
+
+    The total size on disk is kept under max_bytes: once it is exceeded, the
+    least recently used entries (by metadata file mtime, updated on every read)
+    are deleted until the cache is back under PAGE_CACHE_SWEEP_TARGET of the limit.
+    """
+
+    def __init__(self, directory=PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evicted = 0
+        self._size = self._disk_usage()[0]
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{key}.json"), os.path.join(self.directory, f"{key}.body")
+
+    def _write_atomic(self, path, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _disk_usage(self):
+        """
+        Measure the entries on disk.
+
+        Returns:
+            tuple: (total bytes, list of (last used, key, bytes) per entry)
+        """
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            if extension not in ('.json', '.body'):
+                continue
+            try:
+                info = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            used, size = entries.get(key, (0.0, 0))
+            if extension == '.json':
+                used = info.st_mtime
+            entries[key] = (used, size + info.st_size)
+        total = sum(size for _, size in entries.values())
+        return total, [(used, key, size) for key, (used, size) in entries.items()]
+
+    def _remove(self, key):
+        for extension in ('.json', '.body'):
+            try:
+                os.remove(os.path.join(self.directory, key + extension))
+            except FileNotFoundError:
+                pass
+
+    def sweep(self):
+        """
+        Evict least recently used entries while the cache is over its size limit.
+
+        Returns:
+            int: Number of entries removed
+        """
+        if not self.max_bytes:
+            return 0
+        total, entries = self._disk_usage()
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * PAGE_CACHE_SWEEP_TARGET
+            for _, key, size in sorted(entries):
+                if total <= target:
+                    break
+                self._remove(key)
+                total -= size
+                removed += 1
+            logger.debug(f"Evicted {removed} pages from the page cache, {total} bytes left")
+        with self._lock:
+            self._size = total
+            self.evicted += removed
+        return removed
+
+    def _grow(self, size):
+        """Account for bytes written and sweep once the size limit is passed."""
+        with self._lock:
+            self._size += size
+            over = self.max_bytes and self._size > self.max_bytes
+        if over:
+            self.sweep()
+
+    def record(self, outcome):
+        """
+        Count the outcome of a cache lookup.
+
+        Args:
+            outcome (str): 'hits', 'revalidated' or 'misses'
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def get(self, url):
+        """
+        Load the cached entry for a URL.
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            CachedPage: Stored entry, or None if the URL is not cached
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as handle:
+                meta = json.load(handle)
+            with open(body_path, 'rb') as handle:
+                body = handle.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url:
+            return None
+        try:
+            # Mark the entry as recently used for eviction
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return CachedPage(
+            url, body, meta.get('encoding'),
+            etag=meta.get('etag'),
+            last_modified=meta.get('last_modified'),
+            fresh_until=meta.get('fresh_until', 0.0),
+            stored_at=meta.get('stored_at')
+        )
+
+    def store(self, url, headers, body, encoding):
+        """
+        Store a successful response if its Cache-Control allows it.
+
+        Args:
+            url (str): Page URL
+            headers (Mapping): Response headers
+            body (bytes): Raw response body
+            encoding (str): Character encoding of the body
+
+        Returns:
+            CachedPage: Stored entry, or None if the response may not be stored
+        """
+        if 'no-store' in parse_cache_control(headers.get('Cache-Control')):
+            return None
+
+        entry = CachedPage(
+            url, body, encoding,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            fresh_until=freshness_deadline(headers)
+        )
+        if not entry.etag and not entry.last_modified and not entry.is_fresh():
+            # Nothing to revalidate with and not fresh: storing would never pay off
+            return None
+
+        body_path = self._paths(url)[1]
+        try:
+            old_size = os.path.getsize(body_path)
+        except OSError:
+            old_size = 0
+        # Body first, so the metadata never points at a body that is not written yet
+        self._write_atomic(body_path, body)
+        self._write_metadata(entry)
+        self._grow(len(body) - old_size)
+        return entry
+
+    def refresh(self, entry, headers):
+        """
+        Update an entry after a 304 Not Modified response.
+
+        Args:
+            entry (CachedPage): Entry that was revalidated
+            headers (Mapping): Headers of the 304 response
+
+        Returns:
+            CachedPage: The updated entry
+        """
+        entry.etag = headers.get('ETag') or entry.etag
+        entry.last_modified = headers.get('Last-Modified') or entry.last_modified
+        entry.fresh_until = freshness_deadline(headers)
+        self._write_metadata(entry)
+        return entry
+
+    def _write_metadata(self, entry):
+        meta = {
+            "url": entry.url,
+            "encoding": entry.encoding,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fresh_until": entry.fresh_until,
+            "stored_at": entry.stored_at
+        }
+        self._write_atomic(self._paths(entry.url)[0], json.dumps(meta).encode('utf-8'))
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Fresh hits, successful revalidations (304), misses, entries
+                evicted and approximate size on disk
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "bytes": self._size
+            }
+
+def create_default_cache():
+    """Build the page cache described by the PAGE_CACHE_* environment variables."""
+    try:
+        return PageCache()
+    except OSError as e:
+        logger.error(f"Error opening page cache at {PAGE_CACHE_DIR}: {str(e)}")
+        return None
+
+_cache = create_default_cache() if PAGE_CACHE_ENABLED else None
+
+def get_page_cache():
+    """Return the active page cache, or None if caching is disabled."""
+    return _cache
+
+def set_page_cache(cache):
+    """
+    Replace the active page cache.
+
+    Args:
+        cache (PageCache): New cache, or None to disable caching
+    """
+    global _cache
+    _cache = cache
@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Rate limiting configuration, applied per host
+CRAWL_REQUESTS_PER_SECOND = float(os.environ.get("CRAWL_REQUESTS_PER_SECOND", 2.0))
+CRAWL_BURST = int(os.environ.get("CRAWL_BURST", 2))  # Requests allowed back to back before throttling
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts of up to `capacity` requests, then
+    throttles callers to `rate` requests per second.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token if one is available, else return how long to wait for one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """
+        Block until a token is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            delay = self._reserve()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+class HostRateLimiter:
+    """
+    One token bucket per host, so crawling one site never slows down another.
+    """
+
+    def __init__(self, rate=None, capacity=None):
+        self.rate = CRAWL_REQUESTS_PER_SECOND if rate is None else rate
+        self.capacity = CRAWL_BURST if capacity is None else capacity
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        """
+        Wait for permission to send a request to the URL's host.
+
+        Args:
+            url (str): URL about to be fetched
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = self.bucket(urlparse(url).hostname).acquire()
+        if waited:
+            logger.debug(f"Rate limited {urlparse(url).hostname} for {waited:.2f}s")
+        return waited
+
+_limiter = HostRateLimiter()
+
+def get_rate_limiter():
+    """Return the shared per-host rate limiter."""
+    return _limiter
+
+def set_rate_limiter(limiter):
+    """
+    Replace the shared rate limiter.
+
+    Args:
+        limiter (HostRateLimiter): New limiter
+    """
+    global _limiter
+    _limiter = limiter
@@ -1,34 +1,315 @@
+import codecs
 import logging
+import os
 import requests
 import re
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 import trafilatura
+from utils.fingerprint import dom_fingerprint
+from utils.http_client import get_session
+from utils.page_cache import get_page_cache
+from utils.tracing import count, span, traced
 
 logger = logging.getLogger(__name__)
 
-def fetch_webpage_content(url):
+# BeautifulSoup tree builders from fastest to slowest, with the module each one needs
+PARSER_BACKENDS = {
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+    'html.parser': None
+}
+
+# Parser backend to use; empty picks the fastest one installed
+HTML_PARSER = os.environ.get("HTML_PARSER", "")
+
+def available_parsers():
     """
-    Fetch HTML content from the provided URL.
+    List the parser backends that can be used in this environment.
+    
+    Returns:
+        list: Backend names from PARSER_BACKENDS whose module is installed, fastest first
+    """
+    available = []
+    for name, module in PARSER_BACKENDS.items():
+        if module is None:
+            available.append(name)
+            continue
+        try:
+            __import__(module)
+            available.append(name)
+        except ImportError:
+            pass
+    return available
+
+def resolve_parser(name=None):
+    """
+    Pick the BeautifulSoup tree builder to use.
+    
+    Args:
+        name (str): Requested backend ('lxml', 'html5lib' or 'html.parser'), or
+            None/empty for the fastest one installed
+        
+    Returns:
+        str: The requested backend if it is installed, otherwise the fastest available one
+    """
+    available = available_parsers()
+    if name and name in available:
+        return name
+    if name:
+        logger.warning(f"HTML parser '{name}' is not available, using '{available[0]}'")
+    return available[0]
+
+# Backend used when no parser is given explicitly
+DEFAULT_PARSER = resolve_parser(HTML_PARSER)
+
+class ParsedDocument:
+    """
+    A webpage parsed once and shared by every stage of an analysis.
+    
+    Holds the raw HTML together with its BeautifulSoup tree so that parse_html,
+    extract_sample_data and improve_selectors all work from the same parse
+    instead of re-tokenizing the page on every call.
+    """
+    
+    def __init__(self, html_content, base_url, parser=None):
+        self.html = html_content
+        self.base_url = base_url
+        self.parser = parser or DEFAULT_PARSER
+        with span("parse"):
+            self.soup = BeautifulSoup(html_content, self.parser)
+        count("parsed_html_chars", len(html_content or ""))
+        self._readable_content = None
+        self._fingerprint = None
+    
+    @property
+    def readable_content(self):
+        """Readable text extracted by trafilatura, computed at most once."""
+        if self._readable_content is None:
+            self._readable_content = get_readable_content(self.html) or ""
+        return self._readable_content
+    
+    @property
+    def fingerprint(self):
+        """DOM skeleton fingerprint used to recognise the page template, computed at most once."""
+        if self._fingerprint is None:
+            self._fingerprint = dom_fingerprint(self.soup)
+        return self._fingerprint
+
+def parse_document(html_content, base_url, parser=None):
+    """
+    Parse HTML content into a ParsedDocument, reusing it if already parsed.
+    
+    Args:
+        html_content (str or ParsedDocument): Raw HTML or an existing document
+        base_url (str): Base URL of the page
+        parser (str): BeautifulSoup parser to use (defaults to DEFAULT_PARSER)
+        
+    Returns:
+        ParsedDocument: The parsed document
+    """
+    if isinstance(html_content, ParsedDocument):
+        return html_content
+    return ParsedDocument(html_content, base_url, parser)
+
+# Largest page body read from the network; anything beyond is cut off
+MAX_PAGE_BYTES = int(os.environ.get("MAX_PAGE_BYTES", 5 * 1024 * 1024))
+
+# Size of the chunks read while streaming a page
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bytes inspected for a BOM or <meta charset> before decoding starts
+ENCODING_SNIFF_BYTES = 4096
+
+CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?\s*([a-zA-Z0-9_-]+)', re.IGNORECASE)
+CONTAINER_TAG_PATTERN = re.compile(
+    r'<(?:div|li|article|section)\b[^>]*\bclass=["\'][^"\']*(?:product|item|card|listing|goods|merchandise)',
+    re.IGNORECASE
+)
+
+def _declared_encoding(response):
+    """Get the charset declared in the Content-Type header, if any and known to Python."""
+    content_type = response.headers.get('Content-Type', '')
+    if 'charset=' in content_type.lower():
+        try:
+            return codecs.lookup(requests.utils.get_encoding_from_headers(response.headers)).name
+        except (LookupError, TypeError):
+            # Unknown charset: sniff the body instead
+            return None
+    return None
+
+def _sniff_encoding(head):
+    """
+    Detect the encoding of a page from its first bytes.
+    
+    Args:
+        head (bytes): Beginning of the body
+        
+    Returns:
+        str: Encoding from a byte order mark or <meta charset>, defaulting to UTF-8
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    match = CHARSET_PATTERN.search(head)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode('ascii')).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+def read_response_stream(response, max_bytes=None, min_containers=None):
+    """
+    Read a streamed response body in chunks with a size cap.
+    
+    The body is decoded incrementally once its encoding is known (from the
+    Content-Type header, or sniffed from the first bytes). Reading stops when
+    max_bytes is reached or, if min_containers is set, as soon as that many
+    product-like container tags have been seen.
+    
+    Args:
+        response (requests.Response): Response opened with stream=True
+        max_bytes (int): Maximum body size to read (defaults to MAX_PAGE_BYTES)
+        min_containers (int): Stop once this many product containers were seen
+        
+    Returns:
+        dict: 'body' (bytes), 'html' (str), 'encoding' and 'truncated' flag
+    """
+    max_bytes = max_bytes or MAX_PAGE_BYTES
+    encoding = _declared_encoding(response)
+    decoder = None
+    pending = b''
+    chunks, text_parts = [], []
+    total_bytes = 0
+    containers_seen = 0
+    tail = ''
+    truncated = False
+    
+    for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+        if total_bytes + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - total_bytes]
+            truncated = True
+        chunks.append(chunk)
+        total_bytes += len(chunk)
+        
+        if decoder is None:
+            # Wait for enough bytes to sniff the encoding from the document itself
+            pending += chunk
+            if len(pending) < ENCODING_SNIFF_BYTES and not truncated:
+                continue
+            encoding = encoding or _sniff_encoding(pending)
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            chunk, pending = pending, b''
+        
+        piece = decoder.decode(chunk)
+        text_parts.append(piece)
+        
+        if min_containers:
+            # Count container tags, including ones split across chunk boundaries
+            window = tail + piece
+            containers_seen += sum(
+                1 for match in CONTAINER_TAG_PATTERN.finditer(window) if match.start() >= len(tail)
+            )
+            tail = window[-512:]
+            if containers_seen >= min_containers:
+                logger.debug(f"Stopping after {containers_seen} product containers ({total_bytes} bytes)")
+                truncated = True
+        
+        if truncated:
+            break
+    
+    if decoder is None:
+        encoding = encoding or _sniff_encoding(pending)
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        text_parts.append(decoder.decode(pending))
+    text_parts.append(decoder.decode(b'', final=True))
+    
+    if truncated and total_bytes >= max_bytes:
+        logger.warning(f"Page body cut off at {max_bytes} bytes")
+    
+    return {
+        "body": b''.join(chunks),
+        "html": ''.join(text_parts),
+        "encoding": encoding,
+        "truncated": truncated
+    }
+
+@traced("fetch")
+def fetch_page(url, use_cache=True, max_bytes=None, min_containers=None):
+    """
+    Fetch a page by streaming its body, with caching and a size cap.
+    
+    Uses the shared keep-alive session so repeated requests to the same host
+    reuse open connections. Pages are kept in the on-disk page cache: fresh
+    entries are served without a request and stale ones are revalidated with
+    If-None-Match / If-Modified-Since, so unchanged pages come back as 304s.
+    Truncated bodies are never cached.
     
     Args:
         url (str): The URL to fetch content from
+        use_cache (bool): Whether to use the page cache
+        max_bytes (int): Maximum body size to read (defaults to MAX_PAGE_BYTES)
+        min_containers (int): Stop reading once this many product containers were seen
         
     Returns:
-        str: HTML content of the page or None if failed
+        dict: 'html', 'truncated', 'from_cache' and 'bytes', or None if failed
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        cache = get_page_cache() if use_cache else None
+        entry = cache.get(url) if cache else None
+        
+        if entry and entry.is_fresh():
+            cache.record('hits')
+            count("page_cache_hits")
+            return {"html": entry.text, "truncated": False, "from_cache": True, "bytes": len(entry.body)}
+        
+        headers = entry.conditional_headers() if entry else {}
+        with get_session().get(url, headers=headers, timeout=30, stream=True) as response:
+            if entry and response.status_code == 304:
+                cache.record('revalidated')
+                cache.refresh(entry, response.headers)
+                count("page_cache_revalidated")
+                return {"html": entry.text, "truncated": False, "from_cache": True, "bytes": len(entry.body)}
+            
+            response.raise_for_status()
+            page = read_response_stream(response, max_bytes, min_containers)
+            
+            if cache:
+                cache.record('misses')
+                if not page["truncated"]:
+                    try:
+                        cache.store(url, response.headers, page["body"], page["encoding"])
+                    except OSError as e:
+                        logger.error(f"Error caching {url}: {str(e)}")
         
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
+        count("fetched_bytes", len(page["body"]))
+        return {
+            "html": page["html"],
+            "truncated": page["truncated"],
+            "from_cache": False,
+            "bytes": len(page["body"])
+        }
     except requests.RequestException as e:
         logger.error(f"Error fetching URL {url}: {str(e)}")
         return None
 
+def fetch_webpage_content(url, use_cache=True):
+    """
+    Fetch HTML content from the provided URL.
+    
+    Args:
+        url (str): The URL to fetch content from
+        use_cache (bool): Whether to use the page cache
+        
+    Returns:
+        str: HTML content of the page (at most MAX_PAGE_BYTES) or None if failed
+    """
+    page = fetch_page(url, use_cache=use_cache)
+    return page["html"] if page else None
+
+@traced("trafilatura")
 def get_readable_content(html_content):
     """
     Extract readable text content from HTML using trafilatura.
@@ -45,191 +326,313 @@ def get_readable_content(html_content):
         logger.error(f"Error extracting readable content: {str(e)}")
         return ""
 
-def parse_html(html_content, base_url):
+HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+
+class SubtreeFeatures:
     """
-    Parse HTML content to extract relevant information for analysis.
+    Counts of product-like features among the descendants of one element.
+    """
+    __slots__ = ('images', 'prices', 'headings', 'titles', 'links', 'descendants')
+    
+    def __init__(self):
+        self.images = 0
+        self.prices = 0
+        self.headings = 0
+        self.titles = 0
+        self.links = 0
+        self.descendants = 0
+
+def is_price_text(text):
+    """Check whether a text node looks like it holds a price."""
+    return bool(text) and ('$' in text or '€' in text or '£' in text or 'price' in text.lower())
+
+def compute_subtree_features(soup):
+    """
+    Aggregate feature counts for every element's subtree in one bottom-up pass.
+    
+    Walking the document in reverse order visits every child before its parent,
+    so each element's counts are built from its direct children only. This keeps
+    candidate scoring linear in the size of the DOM instead of rescanning nested
+    elements once per ancestor.
     
     Args:
-        html_content (str): HTML content of the page
-        base_url (str): Base URL of the page
+        soup (BeautifulSoup): Parsed document
         
     Returns:
-        dict: Parsed data including raw HTML, readable content, and metadata
+        dict: SubtreeFeatures keyed by id() of each element (and of the soup itself)
     """
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Extract title
-        title = soup.title.string if soup.title else "No title"
-        
-        # Get readable content
-        readable_content = get_readable_content(html_content)
-        
-        # Find all links
-        links = []
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            # Convert relative URLs to absolute
-            if not bool(urlparse(href).netloc):
-                href = urljoin(base_url, href)
-            links.append(href)
-        
-        # Find all images
-        images = []
-        for img_tag in soup.find_all('img', src=True):
-            src = img_tag['src']
-            if not bool(urlparse(src).netloc):
-                src = urljoin(base_url, src)
-            alt = img_tag.get('alt', '')
-            images.append({"src": src, "alt": alt})
+    features = {}
+    for element in reversed([soup, *soup.descendants]):
+        if not isinstance(element, Tag):
+            continue
+        counts = SubtreeFeatures()
+        for child in element.children:
+            if isinstance(child, Tag):
+                child_counts = features[id(child)]
+                counts.images += child_counts.images + (child.name == 'img')
+                counts.prices += child_counts.prices
+                counts.headings += child_counts.headings + (child.name in HEADING_TAGS)
+                counts.links += child_counts.links + (child.name == 'a')
+                counts.descendants += child_counts.descendants + 1
+                class_names = ' '.join(child.get('class', [])).lower()
+                counts.titles += child_counts.titles + ('title' in class_names or 'name' in class_names)
+            elif isinstance(child, NavigableString) and is_price_text(child):
+                counts.prices += 1
+        features[id(element)] = counts
+    return features
+
+def find_product_elements(soup):
+    """
+    Find elements that look like product containers and describe their contents.
+    
+    Args:
+        soup (BeautifulSoup): Parsed document
         
-        # Check if it looks like a product listing page
-        possible_product_elements = []
-        
-        # Look for possible product containers - focus on more specific product identifiers
-        product_containers = []
-        
-        # First, try to find containers with common product class names
-        product_class_keywords = ['product', 'item', 'card', 'listing', 'goods', 'merchandise']
-        for element in soup.find_all(['div', 'li', 'article', 'section'], class_=True):
-            classes = ' '.join(element.get('class', []))
-            if any(keyword in classes.lower() for keyword in product_class_keywords):
-                product_containers.append(element)
-        
-        # If no product-specific classes found, look for repeating patterns
-        if not product_containers:
-            # Look for divs/elements that might contain product information
-            candidates = soup.find_all(['div', 'li', 'article'], class_=True)
-            for container in candidates:
-                # Check if it has typical product elements
-                has_image = bool(container.find('img'))
-                has_price = bool(container.find(text=lambda t: '$' in t or '€' in t or '£' in t or 'price' in t.lower() if t else False))
-                has_title = bool(container.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']))
-                has_link = bool(container.find('a'))
-                
-                if ((has_image and has_price) or 
-                    (has_image and has_title) or 
-                    (has_title and has_price) or
-                    (has_link and has_image)):
-                    product_containers.append(container)
-        
-        # Process the identified containers
-        for container in product_containers:
-            # Check what product elements it has
-            has_image = bool(container.find('img'))
-            has_price = bool(container.find(text=lambda t: '$' in t or '€' in t or '£' in t or 'price' in t.lower() if t else False))
-            has_title = bool(container.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']) or container.find(class_=lambda c: c and ('title' in c.lower() or 'name' in c.lower())))
-            has_link = bool(container.find('a'))
+    Returns:
+        list: Candidate containers with their CSS path and product feature flags
+    """
+    possible_product_elements = []
+    
+    # Look for possible product containers - focus on more specific product identifiers
+    product_containers = []
+    
+    # First, try to find containers with common product class names
+    product_class_keywords = ['product', 'item', 'card', 'listing', 'goods', 'merchandise']
+    for element in soup.find_all(['div', 'li', 'article', 'section'], class_=True):
+        classes = ' '.join(element.get('class', []))
+        if any(keyword in classes.lower() for keyword in product_class_keywords):
+            product_containers.append(element)
+    
+    # Count product features for every subtree in a single pass
+    features = compute_subtree_features(soup)
+    
+    # If no product-specific classes found, look for repeating patterns
+    if not product_containers:
+        # Look for divs/elements that might contain product information
+        candidates = soup.find_all(['div', 'li', 'article'], class_=True)
+        for container in candidates:
+            # Check if it has typical product elements
+            counts = features[id(container)]
+            has_image = counts.images > 0
+            has_price = counts.prices > 0
+            has_title = counts.headings > 0
+            has_link = counts.links > 0
             
-            # Get CSS path
-            path = get_css_path(container)
-            if path:
-                possible_product_elements.append({
-                    "path": path,
-                    "has_image": has_image,
-                    "has_price": has_price,
-                    "has_title": has_title,
-                    "has_link": has_link,
-                    "num_children": len(container.find_all()),
-                    "element_type": container.name,
-                    "class_names": container.get('class', [])
-                })
+            if ((has_image and has_price) or 
+                (has_image and has_title) or 
+                (has_title and has_price) or
+                (has_link and has_image)):
+                product_containers.append(container)
+    
+    # Process the identified containers
+    for container in product_containers:
+        # Check what product elements it has
+        counts = features[id(container)]
+        has_image = counts.images > 0
+        has_price = counts.prices > 0
+        has_title = counts.headings > 0 or counts.titles > 0
+        has_link = counts.links > 0
         
-        # Identify possible pagination elements
-        possible_pagination = []
+        # Get CSS path
+        path = get_css_path(container)
+        if path:
+            possible_product_elements.append({
+                "path": path,
+                "has_image": has_image,
+                "has_price": has_price,
+                "has_title": has_title,
+                "has_link": has_link,
+                "num_children": counts.descendants,
+                "element_type": container.name,
+                "class_names": container.get('class', [])
+            })
+    
+    return possible_product_elements
+
+# Outputs parse_html can compute; 'title' is always included
+PARSE_FEATURES = frozenset(['readable_content', 'links', 'images', 'product_elements', 'pagination'])
+
+# parse_html outputs each pipeline stage reads, so callers compute only those
+STAGE_FEATURES = {
+    'infer_selectors': frozenset(['product_elements', 'pagination']),
+    'analyze_page_structure': frozenset(['product_elements', 'pagination']),
+}
+
+def features_for(*stages):
+    """
+    Get the parse_html features needed by a set of pipeline stages.
+    
+    Args:
+        *stages (str): Stage names from STAGE_FEATURES
         
-        # Look for standard pagination containers
-        pagination_candidates = soup.find_all(['div', 'nav', 'ul', 'ol'], class_=True)
+    Returns:
+        frozenset: Union of the features the stages read
+    """
+    return frozenset().union(*(STAGE_FEATURES[stage] for stage in stages))
+
+def _absolute_url(url, base_url):
+    return url if urlparse(url).netloc else urljoin(base_url, url)
+
+def find_links(soup, base_url):
+    """List the absolute URLs of all links on the page."""
+    return [_absolute_url(a_tag['href'], base_url) for a_tag in soup.find_all('a', href=True)]
+
+def find_images(soup, base_url):
+    """List the absolute source and alt text of all images on the page."""
+    return [
+        {"src": _absolute_url(img_tag['src'], base_url), "alt": img_tag.get('alt', '')}
+        for img_tag in soup.find_all('img', src=True)
+    ]
+
+def find_pagination_elements(soup):
+    """
+    Find CSS paths of likely pagination elements: the next-page link of each
+    pagination container (or the container itself), then standalone next links.
+    
+    Args:
+        soup (BeautifulSoup): Parsed page
         
-        for candidate in pagination_candidates:
-            # Check if it has page numbers or pagination links
-            links = candidate.find_all('a')
-            
-            # Look for various pagination indicators
-            pagination_indicators = [
-                'page', 'pag', 'next', 'weiter', 'siguiente', 'suivant', 
-                'arrow', 'chevron', '»', '>', '›', 'forward'
-            ]
+    Returns:
+        list: CSS paths
+    """
+    possible_pagination = []
+    
+    # Look for standard pagination containers
+    pagination_candidates = soup.find_all(['div', 'nav', 'ul', 'ol'], class_=True)
+    
+    for candidate in pagination_candidates:
+        # Check if it has page numbers or pagination links
+        candidate_links = candidate.find_all('a')
+        
+        # Look for various pagination indicators
+        pagination_indicators = [
+            'page', 'pag', 'next', 'weiter', 'siguiente', 'suivant', 
+            'arrow', 'chevron', '»', '>', '›', 'forward'
+        ]
+        
+        # Check links for pagination indicators
+        has_pagination_indicator = False
+        for link in candidate_links:
+            # Check href attribute
+            href = link.get('href', '')
+            if any(indicator in href.lower() for indicator in pagination_indicators):
+                has_pagination_indicator = True
+                break
+                
+            # Check text content
+            text = link.get_text(strip=True)
+            if any(indicator in text.lower() for indicator in pagination_indicators):
+                has_pagination_indicator = True
+                break
+                
+            # Check for common pagination classes
+            classes = link.get('class', [])
+            class_str = ' '.join(classes).lower()
+            if any(indicator in class_str for indicator in pagination_indicators):
+                has_pagination_indicator = True
+                break
+                
+            # Check for page numbers pattern (multiple sequential numbers)
+            if text.isdigit() and len(candidate_links) > 2 and any(l.get_text(strip=True).isdigit() for l in candidate_links if l != link):
+                has_pagination_indicator = True
+                break
+        
+        if has_pagination_indicator:
+            # Try to find the next page link specifically
+            next_link = None
             
-            # Check links for pagination indicators
-            has_pagination_indicator = False
-            for link in links:
-                # Check href attribute
+            # Look for "next", "»", ">" text or class indicators
+            for link in candidate_links:
+                text = link.get_text(strip=True).lower()
+                classes = ' '.join(link.get('class', [])).lower()
                 href = link.get('href', '')
-                if any(indicator in href.lower() for indicator in pagination_indicators):
-                    has_pagination_indicator = True
-                    break
-                    
-                # Check text content
-                text = link.get_text(strip=True)
-                if any(indicator in text.lower() for indicator in pagination_indicators):
-                    has_pagination_indicator = True
-                    break
-                    
-                # Check for common pagination classes
-                classes = link.get('class', [])
-                class_str = ' '.join(classes).lower()
-                if any(indicator in class_str for indicator in pagination_indicators):
-                    has_pagination_indicator = True
-                    break
-                    
-                # Check for page numbers pattern (multiple sequential numbers)
-                if text.isdigit() and len(links) > 2 and any(l.get_text(strip=True).isdigit() for l in links if l != link):
-                    has_pagination_indicator = True
+                
+                # Check for next page indicators
+                if (text in ['next', 'siguiente', 'suivant', 'weiter', '»', '>', '›']) or \
+                   any(n in classes for n in ['next', 'arrow-right', 'forward', 'chevron-right']) or \
+                   re.search(r'page=(\d+)', href):
+                    next_link = link
                     break
             
-            if has_pagination_indicator:
-                # Try to find the next page link specifically
-                next_link = None
-                
-                # Look for "next", "»", ">" text or class indicators
-                for link in links:
-                    text = link.get_text(strip=True).lower()
-                    classes = ' '.join(link.get('class', [])).lower()
-                    href = link.get('href', '')
+            # If found a specific next link, add its CSS path
+            if next_link:
+                path = get_css_path(next_link)
+                if path:
+                    possible_pagination.append(path)
+            else:
+                # Otherwise add the container's CSS path
+                path = get_css_path(candidate)
+                if path:
+                    possible_pagination.append(path)
                     
-                    # Check for next page indicators
-                    if (text in ['next', 'siguiente', 'suivant', 'weiter', '»', '>', '›']) or \
-                       any(n in classes for n in ['next', 'arrow-right', 'forward', 'chevron-right']) or \
-                       re.search(r'page=(\d+)', href):
-                        next_link = link
-                        break
-                
-                # If found a specific next link, add its CSS path
-                if next_link:
-                    path = get_css_path(next_link)
-                    if path:
-                        possible_pagination.append(path)
-                else:
-                    # Otherwise add the container's CSS path
-                    path = get_css_path(candidate)
-                    if path:
-                        possible_pagination.append(path)
-                        
-        # Also check for standalone next links (not in obvious pagination containers)
-        standalone_next_links = soup.find_all('a', string=re.compile(r'next|more|load more|show more|›|»|>', re.IGNORECASE))
-        for link in standalone_next_links:
-            path = get_css_path(link)
-            if path and path not in possible_pagination:
-                possible_pagination.append(path)
+    # Also check for standalone next links (not in obvious pagination containers)
+    standalone_next_links = soup.find_all('a', string=re.compile(r'next|more|load more|show more|›|»|>', re.IGNORECASE))
+    for link in standalone_next_links:
+        path = get_css_path(link)
+        if path and path not in possible_pagination:
+            possible_pagination.append(path)
+    
+    return possible_pagination
+
+@traced("parse_html")
+def parse_html(html_content, base_url, features=None):
+    """
+    Parse HTML content to extract relevant information for analysis.
+    
+    Only the requested features are computed; trafilatura extraction in
+    particular is expensive on large pages and most stages do not read it.
+    
+    Args:
+        html_content (str or ParsedDocument): HTML content of the page, or a
+            document already parsed with parse_document
+        base_url (str): Base URL of the page
+        features (iterable): Outputs to compute, from PARSE_FEATURES (defaults to
+            all of them); see features_for for the ones each stage needs
         
-        return {
-            "title": title,
+    Returns:
+        dict: Title, base URL, raw HTML and the parsed document, plus the requested
+            outputs: readable_content, links, images, possible_product_elements
+            and possible_pagination. The "document" entry is a ParsedDocument kept
+            so later stages do not parse the page again; it is not JSON-serializable,
+            so drop it before serializing the result.
+    """
+    features = PARSE_FEATURES if features is None else frozenset(features)
+    raw_html = html_content.html if isinstance(html_content, ParsedDocument) else html_content
+    try:
+        document = parse_document(html_content, base_url)
+        soup = document.soup
+        
+        parsed_data = {
+            "title": soup.title.string if soup.title else "No title",
             "base_url": base_url,
-            "raw_html": html_content,
-            "readable_content": readable_content,
-            "links": links,
-            "images": images,
-            "possible_product_elements": possible_product_elements,
-            "possible_pagination": possible_pagination
+            "raw_html": raw_html,
+            "document": document
         }
         
+        # Readable content is computed once per document, and only on request
+        if 'readable_content' in features:
+            parsed_data["readable_content"] = document.readable_content
+        if 'links' in features:
+            parsed_data["links"] = find_links(soup, base_url)
+        if 'images' in features:
+            parsed_data["images"] = find_images(soup, base_url)
+        
+        # Check if it looks like a product listing page
+        if 'product_elements' in features:
+            parsed_data["possible_product_elements"] = find_product_elements(soup)
+        
+        # Identify possible pagination elements
+        if 'pagination' in features:
+            parsed_data["possible_pagination"] = find_pagination_elements(soup)
+        
+        return parsed_data
+        
     except Exception as e:
         logger.error(f"Error parsing HTML: {str(e)}")
         return {
             "title": "Error parsing page",
             "base_url": base_url,
-            "raw_html": html_content,
+            "raw_html": raw_html,
             "readable_content": "",
             "links": [],
             "images": [],
@@ -1,10 +1,13 @@
 import logging
+from utils.scraper import PARSER_BACKENDS
+from utils.tracing import traced
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def generate_scraping_script(selectors, base_url, pagination_enabled=False, pagination_selector=""):
+@traced("generate_script")
+def generate_scraping_script(selectors, base_url, pagination_enabled=False, pagination_selector="", parser=None):
     """
     Generate a Python script for web scraping based on the identified selectors.
     
@@ -13,6 +16,8 @@ def generate_scraping_script(selectors, base_url, pagination_enabled=False, pagi
         base_url (str): Base URL of the target website
         pagination_enabled (bool): Whether pagination should be included in the script
         pagination_selector (str): CSS selector for pagination (if provided by user)
+        parser (str): BeautifulSoup parser backend for the script ('lxml', 'html5lib' or
+            'html.parser'); by default the script uses lxml when it is installed
         
     Returns:
         str: Generated Python script as a string
@@ -31,15 +36,136 @@ import requests
 from bs4 import BeautifulSoup
 import csv
 import time
-import random
 import re
+import threading
+import soupsieve
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse, parse_qs, urlencode, urlunparse
 """
 
+        # Parser backend: a fixed one if requested, otherwise lxml (much faster) with a fallback
+        if parser and parser not in PARSER_BACKENDS:
+            logger.warning(f"Unknown HTML parser '{parser}', generating script with the default")
+            parser = None
+        if parser:
+            script_parser = f"""
+# HTML parser used by BeautifulSoup
+PARSER = "{parser}"
+"""
+        else:
+            script_parser = """
+# HTML parser used by BeautifulSoup: lxml is several times faster than the built-in html.parser
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+"""
+
+        # Crawl helpers: a token bucket instead of fixed sleeps, and parallel fetches of predictable pages
+        script_crawl_helpers = """
+# Crawl settings: requests per second and burst allowed against the site, pages fetched in parallel
+REQUESTS_PER_SECOND = 2.0
+BURST = 2
+MAX_WORKERS = 4
+
+class TokenBucket:
+    '''
+    Allow bursts of up to `capacity` requests, then at most `rate` requests per second.
+    '''
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+def build_page_urls(parsed_url, query_params, first_page, count):
+    '''
+    Build the URLs of `count` pages starting at `first_page` by setting the page parameter.
+    '''
+    urls = []
+    for page_num in range(first_page, first_page + count):
+        params = dict(query_params, page=[str(page_num)])
+        urls.append(urlunparse(
+            (parsed_url.scheme, parsed_url.netloc, parsed_url.path,
+             parsed_url.params, urlencode(params, doseq=True), parsed_url.fragment)
+        ))
+    return urls
+
+def fetch_pages_concurrently(urls, headers, rate_limiter, max_workers=MAX_WORKERS):
+    '''
+    Fetch several pages in parallel, throttled by the rate limiter.
+
+    Returns:
+        dict: URL mapped to the page HTML, or None if fetching it failed
+    '''
+    def fetch(page_url):
+        rate_limiter.acquire()
+        try:
+            response = requests.get(page_url, headers=headers)
+            response.raise_for_status()
+            return response.text
+        except Exception as e:
+            print(f"Error fetching page {page_url}: {e}")
+            return None
+
+    print(f"Fetching {len(urls)} pages in parallel...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(urls, executor.map(fetch, urls)))
+"""
+
         # Function definition and docstring
         max_pages = 10 if pagination_enabled else 1
         max_pages_str = "10 if pagination enabled" if pagination_enabled else "1"
         
+        if pagination_enabled:
+            crawl_state = """
+    rate_limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+    prefetched = {}  # Pages already fetched in parallel, by URL
+    """
+            fetch_step = """
+        # Fetch the page, unless it was already fetched in parallel
+        if current_url in prefetched:
+            html = prefetched.pop(current_url)
+            if html is None:
+                break
+        else:
+            rate_limiter.acquire()
+            try:
+                response = requests.get(current_url, headers=headers)
+                response.raise_for_status()
+                html = response.text
+            except Exception as e:
+                print(f"Error fetching page: {e}")
+                break
+            """
+        else:
+            crawl_state = ""
+            fetch_step = """
+        # Fetch the page
+        try:
+            response = requests.get(current_url, headers=headers)
+            response.raise_for_status()
+            html = response.text
+        except Exception as e:
+            print(f"Error fetching page: {e}")
+            break
+            """
+
         script_function_header = f"""
 def scrape_product_data(url, max_pages={max_pages}):
     '''
@@ -59,200 +185,224 @@ def scrape_product_data(url, max_pages={max_pages}):
     headers = {{
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }}
-    
+    {crawl_state}
     while current_page <= max_pages:
         print(f"Scraping page {{current_page}}: {{current_url}}")
-        
-        # Fetch the page
-        try:
-            response = requests.get(current_url, headers=headers)
-            response.raise_for_status()
-        except Exception as e:
-            print(f"Error fetching page: {{e}}")
-            break
-            
+        {fetch_step}
         # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(html, PARSER)
 """
 
         # Product extraction part
-        product_container = selectors.get('product_container', '')
-        product_title = selectors.get('product_title', '')
-        product_url = selectors.get('product_url', '')  
-        product_image = selectors.get('product_image', '')
-        product_price = selectors.get('product_price', '')
+        product_container = selectors.get('product_container') or ''
+        product_title = selectors.get('product_title') or ''
+        product_url = selectors.get('product_url') or ''  
+        product_image = selectors.get('product_image') or ''
+        product_price = selectors.get('product_price') or ''
         
+        # Extraction helpers: selectors are compiled once, navigation is detected from
+        # tag names and attributes, and fallback selectors are resolved once per page
+        script_extraction_helpers = f"""
+# Containers per page on which every fallback selector is tried before the winner is reused
+SELECTOR_SAMPLE_SIZE = 3
+
+@lru_cache(maxsize=256)
+def compile_selector(selector):
+    '''
+    Compile a CSS selector; repeated selectors are served from the cache.
+    '''
+    return soupsieve.compile(selector)
+
+def compile_selectors(selectors):
+    '''
+    Compile CSS selectors once so they can be reused for every container and page.
+
+    Returns:
+        list: (selector, compiled selector) pairs, skipping empty or invalid selectors
+    '''
+    compiled = []
+    for selector in selectors:
+        if not selector:
+            continue
+        try:
+            compiled.append((selector, compile_selector(selector)))
+        except Exception:
+            print(f"Skipping invalid selector: {{selector}}")
+    return compiled
+
+CONTAINER_SELECTOR = compile_selector({product_container!r})
+
+FIELD_SELECTORS = {{
+    'title': compile_selectors([
+        {product_title!r},  # AI-detected selector
+        ".product-title", ".product-name", ".title", ".name",  # Classes with name/title keywords
+        "h1.product-title", "h2.product-title", "h3.product-title",  # Specific heading classes
+        "h1", "h2", "h3", "h4", "h5",  # Generic headings (last resort)
+        "a[title]"  # Link with title attribute
+    ]),
+    'url': compile_selectors([
+        {product_url!r},  # AI-detected selector
+        "a.product-link", "a.details", ".product-title a", ".title a", ".name a",  # Specific link patterns
+        "a:not(.pagination-link):not(.nav-link)"  # Any link that's not pagination/navigation
+    ]),
+    'image': compile_selectors([
+        {product_image!r},  # AI-detected selector
+        ".product-image", ".product-img", ".product-photo",  # Specific image classes
+        "a:first-child img", ".product-thumbnail img", ".image img",  # Common containers
+        "img.product", "img.thumbnail", "img"  # Last resort - any image
+    ]),
+    'price': compile_selectors([
+        {product_price!r},  # AI-detected selector
+        ".price", ".product-price", ".offer-price", ".sale-price",  # Price classes
+        "span.price", "div.price", "p.price",  # Container with price class
+        ".cost", ".amount", ".value",  # Other price indicators
+        "*[itemprop='price']",  # Schema.org markup
+        "*:-soup-contains('$')", "*:-soup-contains('€')", "*:-soup-contains('£')"  # Currency symbol
+    ])
+}}
+
+NAV_INDICATORS = ['nav', 'navigation', 'menu', 'footer', 'header', 'breadcrumb']
+NAV_TAGS = {{'nav', 'header', 'footer', 'menu'}}
+PRICE_PATTERN = re.compile(r'\\d+\\.\\d{{2}}')
+
+def is_navigation(container):
+    '''
+    Check whether a container is probably navigation rather than a product: more
+    than three links plus a navigation element or a nav-like class, id or role.
+    '''
+    if len(container.find_all('a', limit=4)) <= 3:
+        return False
+    for element in [container] + container.find_all(True):
+        if element.name in NAV_TAGS:
+            return True
+        for attribute in ('class', 'id', 'role'):
+            value = element.get(attribute)
+            if not value:
+                continue
+            value = (' '.join(value) if isinstance(value, list) else value).lower()
+            if any(indicator in value for indicator in NAV_INDICATORS):
+                return True
+    return False
+
+def find_title(container, chain):
+    for selector, compiled in chain:
+        element = compiled.select_one(container)
+        if element:
+            # Check if text is too short or too long
+            text = element.text.strip()
+            if 3 <= len(text) <= 200:  # Reasonable product title length
+                return text, selector
+    return None, None
+
+def find_url(container, chain):
+    for selector, compiled in chain:
+        for link in compiled.iselect(container):
+            href = link.get('href')
+            if href is None:
+                continue
+            # Skip JavaScript links and anchors
+            if href.startswith('javascript:') or href == '#':
+                continue
+            # Skip navigation/utility links
+            if any(word in href.lower() for word in ['login', 'cart', 'account', 'search']):
+                continue
+            return href, selector
+    return None, None
+
+def find_image(container, chain):
+    for selector, compiled in chain:
+        for img in compiled.iselect(container):
+            # Check if this is a real product image (skip icons, tiny images, etc.)
+            if not (img.has_attr('src') or img.has_attr('data-src')):
+                continue
+            # Skip very small images that are likely icons
+            width, height = img.get('width', ''), img.get('height', '')
+            if width.isdigit() and height.isdigit() and int(width) < 50 and int(height) < 50:
+                continue
+            # Skip common non-product images
+            src = img.get('src', img.get('data-src', ''))
+            if any(indicator in src.lower() for indicator in ['icon', 'logo', 'banner', 'button', 'pixel.gif', 'spacer.gif']):
+                continue
+            # Check various image source attributes
+            for attr in ['src', 'data-src', 'data-original', 'data-lazy-src', 'data-srcset']:
+                src = img.get(attr)
+                if src and not src.startswith('data:'):  # Skip data URIs
+                    # For srcset, extract first URL
+                    if attr == 'data-srcset':
+                        src = src.split(',')[0].split(' ')[0]
+                    return src, selector
+            return None, selector
+    return None, None
+
+def find_price(container, chain):
+    for selector, compiled in chain:
+        for candidate in compiled.iselect(container):
+            text = candidate.text.strip()
+            # Simple price validation
+            if text and any(c in text for c in ['$', '€', '£', 'USD', 'EUR', 'GBP']) or PRICE_PATTERN.search(text):
+                return text, selector
+    return None, None
+
+FIELD_FINDERS = {{'title': find_title, 'url': find_url, 'image': find_image, 'price': find_price}}
+
+def match_fields(container, field_selectors):
+    return {{field: finder(container, field_selectors[field]) for field, finder in FIELD_FINDERS.items()}}
+
+def prefer_winning_selectors(sample_matches):
+    '''
+    Move the selector that matched most of the sampled containers to the front of
+    each field's fallback chain, so the rest of the page tries it first.
+    '''
+    field_selectors = {{}}
+    for field, chain in FIELD_SELECTORS.items():
+        wins = {{}}
+        for matches in sample_matches:
+            selector = matches[field][1]
+            if selector:
+                wins[selector] = wins.get(selector, 0) + 1
+        if not wins:
+            field_selectors[field] = chain
+            continue
+        winner = max(wins, key=wins.get)
+        field_selectors[field] = [entry for entry in chain if entry[0] == winner] + [entry for entry in chain if entry[0] != winner]
+    return field_selectors
+"""
+
         script_product_extraction = f"""
         # Find all product containers
-        product_containers = soup.select("{product_container}")
-        
+        product_containers = CONTAINER_SELECTOR.select(soup)
+
         if not product_containers:
             print("No products found on this page.")
             break
-            
-        # Extract product information
+
+        # Skip elements that are just for navigation
+        candidates = []
         for container in product_containers:
-            product = {{}}
-            
-            # First, verify if this container looks like a product before processing
-            # Skip elements that are just for navigation
-            probable_nav_element = False
-            container_html = str(container).lower()
-            nav_indicators = ['nav', 'navigation', 'menu', 'footer', 'header', 'breadcrumb']
-            if any(indicator in container_html for indicator in nav_indicators) and container.select('a') and len(container.select('a')) > 3:
-                probable_nav_element = True
-            
-            if probable_nav_element:
-                print(f"Skipping probable navigation element: {container.name}.{' '.join(container.get('class', []))}")
+            if is_navigation(container):
+                print(f"Skipping probable navigation element: {{container.name}}.{{' '.join(container.get('class', []))}}")
                 continue
-                
-            # Try multiple approaches to find product title with better prioritization
-            title_selectors = [
-                "{product_title}",  # AI-detected selector
-                ".product-title", ".product-name", ".title", ".name",  # Classes with name/title keywords
-                "h1.product-title", "h2.product-title", "h3.product-title",  # Specific heading classes
-                "h1", "h2", "h3", "h4", "h5",  # Generic headings (last resort)
-                "a[title]"  # Link with title attribute
-            ]
-            
-            title_element = None
-            used_title_selector = None
-            for selector in title_selectors:
-                if not selector:
-                    continue
-                try:
-                    title_element = container.select_one(selector)
-                    if title_element and title_element.text.strip():
-                        # Check if text is too short or too long
-                        text = title_element.text.strip()
-                        if 3 <= len(text) <= 200:  # Reasonable product title length
-                            used_title_selector = selector
-                            break
-                except Exception:
-                    continue
-                    
-            product['title'] = title_element.text.strip() if title_element else "N/A"
-            
-            # Try multiple approaches to find product URL - with link verification
-            url_selectors = [
-                "{product_url}",  # AI-detected selector
-                "a.product-link", "a.details", ".product-title a", ".title a", ".name a",  # Specific link patterns
-                "a:not(.pagination-link):not(.nav-link)"  # Any link that's not pagination/navigation
-            ]
-            
-            url_element = None
-            used_url_selector = None
-            for selector in url_selectors:
-                if not selector:
-                    continue
-                try:
-                    links = container.select(selector)
-                    for link in links:
-                        if link and link.has_attr('href'):
-                            href = link['href']
-                            # Skip JavaScript links and anchors
-                            if href.startswith('javascript:') or href == '#':
-                                continue
-                            # Skip navigation/utility links
-                            if any(word in href.lower() for word in ['login', 'cart', 'account', 'search']):
-                                continue
-                            url_element = link
-                            used_url_selector = selector
-                            break
-                    if url_element:
-                        break
-                except Exception:
-                    continue
-                    
-            product['url'] = urljoin(url, url_element['href']) if url_element and url_element.has_attr('href') else "N/A"
-            
-            # Try multiple approaches to find product image - with image verification
-            image_selectors = [
-                "{product_image}",  # AI-detected selector
-                ".product-image", ".product-img", ".product-photo",  # Specific image classes
-                "a:first-child img", ".product-thumbnail img", ".image img",  # Common containers
-                "img.product", "img.thumbnail", "img"  # Last resort - any image
-            ]
-            
-            image_element = None
-            used_image_selector = None
-            for selector in image_selectors:
-                if not selector:
-                    continue
-                try:
-                    images = container.select(selector)
-                    for img in images:
-                        # Check if this is a real product image (skip icons, tiny images, etc.)
-                        if img.has_attr('src') or img.has_attr('data-src'):
-                            # Try to get image dimensions if available
-                            width = img.get('width', '')
-                            height = img.get('height', '')
-                            
-                            # Skip very small images that are likely icons
-                            if width and height and int(width) < 50 and int(height) < 50:
-                                continue
-                                
-                            # Skip common non-product images
-                            src = img.get('src', img.get('data-src', ''))
-                            skip_indicators = ['icon', 'logo', 'banner', 'button', 'pixel.gif', 'spacer.gif']
-                            if any(indicator in src.lower() for indicator in skip_indicators):
-                                continue
-                                
-                            image_element = img
-                            used_image_selector = selector
-                            break
-                    if image_element:
-                        break
-                except Exception:
-                    continue
-            
-            # Process image source, handling different image source attributes
-            img_src = None
-            if image_element:
-                # Check various image source attributes
-                for attr in ['src', 'data-src', 'data-original', 'data-lazy-src', 'data-srcset']:
-                    if image_element.has_attr(attr):
-                        src = image_element[attr]
-                        if src and not src.startswith('data:'):  # Skip data URIs
-                            # For srcset, extract first URL
-                            if attr == 'data-srcset':
-                                src = src.split(',')[0].split(' ')[0]
-                            img_src = src
-                            break
-                            
-            product['image_url'] = urljoin(url, img_src) if img_src else "N/A"
-            
-            # Try multiple approaches to find product price
-            price_selectors = [
-                "{product_price}",  # AI-detected selector
-                ".price", ".product-price", ".offer-price", ".sale-price",  # Price classes
-                "span.price", "div.price", "p.price",  # Container with price class
-                ".cost", ".amount", ".value",  # Other price indicators
-                "*[itemprop='price']",  # Schema.org markup
-                "*:contains('$')", "*:contains('€')", "*:contains('£')"  # Currency symbol
-            ]
-            
-            price_element = None
-            used_price_selector = None
-            for selector in price_selectors:
-                if not selector:
-                    continue
-                try:
-                    price_candidates = container.select(selector)
-                    for candidate in price_candidates:
-                        text = candidate.text.strip()
-                        # Simple price validation
-                        if text and any(c in text for c in ['$', '€', '£', 'USD', 'EUR', 'GBP']) or re.search(r'\d+\.\d{2}', text):
-                            price_element = candidate
-                            used_price_selector = selector
-                            break
-                    if price_element:
-                        break
-                except Exception:
-                    continue
-                    
-            product['price'] = price_element.text.strip() if price_element else "N/A"
-            
+            candidates.append(container)
+
+        # Try every fallback selector on the first containers, then try the winners first for the rest
+        matches = [match_fields(container, FIELD_SELECTORS) for container in candidates[:SELECTOR_SAMPLE_SIZE]]
+        field_selectors = prefer_winning_selectors(matches)
+        matches.extend(match_fields(container, field_selectors) for container in candidates[SELECTOR_SAMPLE_SIZE:])
+
+        # Extract product information
+        for container, match in zip(candidates, matches):
+            title, used_title_selector = match['title']
+            href, used_url_selector = match['url']
+            img_src, used_image_selector = match['image']
+            price, used_price_selector = match['price']
+
+            product = {{
+                'title': title or "N/A",
+                'url': urljoin(current_url, href) if href else "N/A",
+                'image_url': urljoin(current_url, img_src) if img_src else "N/A",
+                'price': price or "N/A"
+            }}
+
             # Print debugging info for this product
             print(f"Debug - Product {{len(products) + 1}} info:")
             print(f"  Container: {{container.name}}.{{' '.join(container.get('class', []))}}")
@@ -261,10 +411,10 @@ def scrape_product_data(url, max_pages={max_pages}):
             print(f"  Image URL: {{product['image_url']}}")
             print(f"  Price: {{product['price']}}")
             print(f"  Used selectors: title={{used_title_selector}}, url={{used_url_selector}}, image={{used_image_selector}}, price={{used_price_selector}}")
-            
+
             # Add product to list
             products.append(product)
-        
+
         print(f"Found {{len(product_containers)}} products on page {{current_page}}.")
 """
 
@@ -281,9 +431,9 @@ def scrape_product_data(url, max_pages={max_pages}):
             # Try different pagination methods
             
             # Method 1: CSS Selector-based pagination
-            pagination_selector = "{pagination_selector}"
+            pagination_selector = {(pagination_selector or "")!r}
             if pagination_selector:
-                next_page = soup.select_one(pagination_selector)
+                next_page = compile_selector(pagination_selector).select_one(soup)
                 if next_page and next_page.has_attr('href'):
                     href = next_page['href']
                     
@@ -294,45 +444,29 @@ def scrape_product_data(url, max_pages={max_pages}):
                         
                     current_url = urljoin(current_url, href)
                     current_page += 1
-                    
-                    # Add a small delay to avoid overloading the server
-                    time.sleep(random.uniform(1, 3))
                     continue
             
             # Method 2: URL Parameter-based pagination (?page=X)
             parsed_url = urlparse(current_url)
             query_params = parse_qs(parsed_url.query)
             
-            # Check if 'page' parameter exists
+            # Increment the 'page' parameter if it exists, otherwise try adding it
+            next_page_num = None
             if 'page' in query_params:
-                # Increment page number
                 try:
-                    current_page_num = int(query_params['page'][0])
-                    query_params['page'] = [str(current_page_num + 1)]
-                    
-                    # Rebuild URL with new page number
-                    new_query = urlencode(query_params, doseq=True)
-                    new_url = urlunparse(
-                        (parsed_url.scheme, parsed_url.netloc, parsed_url.path, 
-                         parsed_url.params, new_query, parsed_url.fragment)
-                    )
-                    current_url = new_url
-                    current_page += 1
-                    time.sleep(random.uniform(1, 3))
-                    continue
+                    next_page_num = int(query_params['page'][0]) + 1
                 except (ValueError, IndexError):
                     pass
             else:
-                # Try adding page parameter if it doesn't exist
-                query_params['page'] = ['2']  # Start with page 2
-                new_query = urlencode(query_params, doseq=True)
-                new_url = urlunparse(
-                    (parsed_url.scheme, parsed_url.netloc, parsed_url.path, 
-                     parsed_url.params, new_query, parsed_url.fragment)
-                )
-                current_url = new_url
+                next_page_num = 2  # Start with page 2
+                
+            if next_page_num is not None:
+                # Page URLs are predictable: fetch all remaining pages in parallel, once
+                upcoming_urls = build_page_urls(parsed_url, query_params, next_page_num, max_pages - current_page)
+                if upcoming_urls[0] not in prefetched:
+                    prefetched.update(fetch_pages_concurrently(upcoming_urls, headers, rate_limiter))
+                current_url = upcoming_urls[0]
                 current_page += 1
-                time.sleep(random.uniform(1, 3))
                 continue
                 
             # Method 3: Simple path-based pagination (/page/X)
@@ -346,7 +480,6 @@ def scrape_product_data(url, max_pages={max_pages}):
                 )
                 current_url = new_url
                 current_page += 1
-                time.sleep(random.uniform(1, 3))
                 continue
                 
             # If we got here, we couldn't find a way to paginate
@@ -388,17 +521,24 @@ def save_to_csv(products, filename="products.csv"):
         script_main = f"""
 if __name__ == "__main__":
     # URL to scrape
-    target_url = "{base_url}"
+    target_url = {base_url!r}
     
     # Scrape product data
     products = scrape_product_data(target_url)
     
     # Save data to CSV
     save_to_csv(products)
+    
+    # Selector compilation cache usage
+    cache_info = compile_selector.cache_info()
+    print(f"Selector cache: {{cache_info.hits}} hits, {{cache_info.misses}} misses")
 """
 
         # Combine all script parts
-        script = script_imports + script_function_header + script_product_extraction
+        script = script_imports + script_parser + script_extraction_helpers
+        if pagination_enabled:
+            script += script_crawl_helpers
+        script += script_function_header + script_product_extraction
         
         # Add the appropriate pagination code
         if pagination_enabled:
@@ -0,0 +1,53 @@
+import logging
+import os
+from functools import lru_cache
+import soupsieve
+
+logger = logging.getLogger(__name__)
+
+# Compiled selectors kept in memory
+SELECTOR_CACHE_SIZE = int(os.environ.get("SELECTOR_CACHE_SIZE", 1024))
+
+@lru_cache(maxsize=SELECTOR_CACHE_SIZE)
+def _compile(selector, namespaces, flags):
+    return soupsieve.compile(selector, namespaces=dict(namespaces) if namespaces else None, flags=flags)
+
+def compile_selector(selector, namespaces=None, flags=0):
+    """
+    Compile a CSS selector, reusing the compiled pattern for repeated selectors.
+
+    Args:
+        selector (str): CSS selector
+        namespaces (dict): Namespace prefixes used by the selector
+        flags (int): soupsieve flags
+
+    Returns:
+        SoupSieve: Compiled selector with select, select_one, iselect and match methods
+
+    Raises:
+        soupsieve.SelectorSyntaxError: If the selector is invalid (invalid selectors are not cached)
+    """
+    key = tuple(sorted(namespaces.items())) if namespaces else None
+    return _compile(selector, key, flags)
+
+def select(tag, selector, namespaces=None):
+    """Cached equivalent of tag.select(selector)."""
+    return compile_selector(selector, namespaces).select(tag)
+
+def select_one(tag, selector, namespaces=None):
+    """Cached equivalent of tag.select_one(selector)."""
+    return compile_selector(selector, namespaces).select_one(tag)
+
+def selector_cache_stats():
+    """
+    Get selector cache counters.
+
+    Returns:
+        dict: Compile hits and misses, current size and capacity
+    """
+    info = _compile.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+def clear_selector_cache():
+    """Drop all compiled selectors and reset the counters."""
+    _compile.cache_clear()
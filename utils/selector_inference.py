@@ -0,0 +1,205 @@
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from utils.scraper import parse_document
+from utils.selector_cache import select
+from utils.selector_validator import extract_sample_data, perform_basic_validation
+from utils.tracing import traced
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Minimum confidence for heuristic selectors to be used without asking the AI
+HEURISTIC_CONFIDENCE_THRESHOLD = float(os.environ.get("HEURISTIC_CONFIDENCE_THRESHOLD", 0.8))
+
+# Number of candidate containers that are fully verified
+MAX_CANDIDATES = 5
+
+# Containers inspected when choosing field selectors
+SAMPLE_CONTAINERS = 5
+
+# A listing usually shows at least this many products
+MIN_REPEATS = 3
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+CURRENCY_PATTERN = re.compile(r'[$€£¥₹₽]|\d+[.,]\d{2}\b')
+SAFE_CLASS_PATTERN = re.compile(r'^-?[A-Za-z_][\w-]*$')
+
+def _relative_selector(element):
+    """
+    Build a selector for an element relative to its product container.
+
+    Args:
+        element (BeautifulSoup tag): Element inside a container
+
+    Returns:
+        str: 'tag.class' using the first class that is safe in a CSS selector,
+            or just the tag name
+    """
+    for class_name in element.get('class', []):
+        if SAFE_CLASS_PATTERN.match(class_name):
+            return f"{element.name}.{class_name}"
+    return element.name
+
+def _title_element(container):
+    """Find the element most likely to hold the product title."""
+    heading = container.find(HEADING_TAGS)
+    if heading and heading.get_text(strip=True):
+        return heading
+    for element in container.find_all(class_=True):
+        classes = ' '.join(element.get('class', [])).lower()
+        if ('title' in classes or 'name' in classes) and element.get_text(strip=True):
+            return element
+    return None
+
+def _url_element(container):
+    """Find the link most likely to point to the product page."""
+    for link in container.find_all('a', href=True):
+        href = link['href']
+        if href.startswith('javascript:') or href == '#':
+            continue
+        return link
+    return None
+
+def _image_element(container):
+    """Find the main product image."""
+    for image in container.find_all('img'):
+        if any(image.has_attr(attr) for attr in ['src', 'data-src', 'data-original', 'data-lazy-src']):
+            return image
+    return None
+
+def _price_element(container):
+    """Find the element holding the product price."""
+    for element in container.find_all(class_=True):
+        classes = ' '.join(element.get('class', [])).lower()
+        if 'price' in classes and CURRENCY_PATTERN.search(element.get_text()):
+            return element
+    for text in container.find_all(string=CURRENCY_PATTERN):
+        if text.parent is not None and text.parent is not container:
+            return text.parent
+    return None
+
+FIELD_FINDERS = {
+    'product_title': _title_element,
+    'product_url': _url_element,
+    'product_image': _image_element,
+    'product_price': _price_element
+}
+
+def _common_field_selector(containers, finder):
+    """
+    Pick the relative selector that most sample containers agree on for a field.
+
+    Args:
+        containers (list): Sample product containers
+        finder (callable): Function returning the field element within a container
+
+    Returns:
+        str: Most common relative selector, or None if no container has the field
+    """
+    votes = Counter()
+    for container in containers:
+        element = finder(container)
+        if element is not None:
+            votes[_relative_selector(element)] += 1
+    if not votes:
+        return None
+    return votes.most_common(1)[0][0]
+
+def _rank_container_candidates(parsed_data):
+    """
+    Score the repeated structures found by parse_html as product container candidates.
+
+    Args:
+        parsed_data (dict): Output of parse_html
+
+    Returns:
+        list: (score, path, repeats) tuples, best first
+    """
+    groups = defaultdict(list)
+    for element in parsed_data.get('possible_product_elements', []):
+        path = element.get('path') or ''
+        # Only class-based paths can describe a repeated structure
+        if '.' not in path or ':' in path:
+            continue
+        groups[path].append(element)
+
+    candidates = []
+    for path, elements in groups.items():
+        repeats = len(elements)
+        if repeats < MIN_REPEATS:
+            continue
+        feature_score = sum(
+            element['has_image'] + element['has_price'] + element['has_title'] + element['has_link']
+            for element in elements
+        ) / (4 * repeats)
+        candidates.append((feature_score, path, repeats))
+
+    candidates.sort(key=lambda candidate: (candidate[0], candidate[2]), reverse=True)
+    return candidates
+
+def _pagination_selector(parsed_data):
+    """Pick a pagination selector from parse_html's candidates, if one is specific enough."""
+    for path in parsed_data.get('possible_pagination', []):
+        if path and ('.' in path or path.startswith('#')):
+            return path
+    return None
+
+@traced("infer_selectors")
+def infer_selectors(html_content, parsed_data, base_url):
+    """
+    Infer product selectors from the page structure without calling the AI.
+
+    Scores the repeated sibling structures found by parse_html, proposes field
+    selectors shared by the first few containers of each candidate and verifies
+    them with perform_basic_validation.
+
+    Args:
+        html_content (str or ParsedDocument): The HTML content of the webpage, or
+            a document already parsed with parse_document
+        parsed_data (dict): Output of parse_html for the same page
+        base_url (str): Base URL of the webpage
+
+    Returns:
+        tuple: (selectors dict or None, confidence between 0 and 1)
+    """
+    try:
+        document = parse_document(html_content, base_url)
+        soup = document.soup
+        best_selectors, best_confidence = None, 0.0
+
+        for feature_score, path, repeats in _rank_container_candidates(parsed_data)[:MAX_CANDIDATES]:
+            try:
+                containers = select(soup, path)
+            except Exception:
+                continue
+            if len(containers) < MIN_REPEATS:
+                continue
+
+            selectors = {'product_container': path}
+            for key, finder in FIELD_FINDERS.items():
+                selectors[key] = _common_field_selector(containers[:SAMPLE_CONTAINERS], finder)
+            selectors['pagination_next'] = _pagination_selector(parsed_data)
+
+            sample_data = extract_sample_data(document, selectors, base_url)
+            validation = perform_basic_validation(sample_data, selectors)
+            field_validations = validation.get('field_validations', {})
+            valid_fields = sum(
+                1 for field in ['title', 'url', 'image', 'price']
+                if field_validations.get(field, {}).get('valid')
+            )
+
+            # Confidence combines verified fields, container features and how often it repeats
+            confidence = (valid_fields / 4) * (0.5 + 0.5 * feature_score) * min(1.0, len(containers) / 6)
+            logger.debug(f"Heuristic candidate {path}: {valid_fields}/4 fields valid, confidence {confidence:.2f}")
+
+            if confidence > best_confidence:
+                best_selectors, best_confidence = selectors, confidence
+
+        return best_selectors, best_confidence
+
+    except Exception as e:
+        logger.error(f"Error inferring selectors: {str(e)}")
+        return None, 0.0
@@ -1,9 +1,15 @@
 import logging
 import json
+import contextvars
 import os
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urljoin
 from openai import OpenAI
+from utils.html_condenser import condense_html
+from utils.llm_cache import cached_chat_completion
+from utils.scraper import parse_document
+from utils.selector_cache import select, select_one
+from utils.tracing import traced
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -15,20 +21,30 @@ logger = logging.getLogger(__name__)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 openai = OpenAI(api_key=OPENAI_API_KEY)
 
-def extract_sample_data(html_content, selectors, base_url):
+# Maximum number of field validations sent to OpenAI at the same time
+VALIDATION_MAX_WORKERS = int(os.environ.get("VALIDATION_MAX_WORKERS", 4))
+
+# Size of the condensed HTML sent when improving a selector, in tokens
+IMPROVE_HTML_TOKEN_BUDGET = int(os.environ.get("IMPROVE_HTML_TOKEN_BUDGET", 2500))
+
+@traced("extract_sample_data")
+def extract_sample_data(html_content, selectors, base_url, parser=None):
     """
     Extract sample data and HTML elements from the webpage using the provided selectors.
     
     Args:
-        html_content (str): The HTML content of the webpage
+        html_content (str or ParsedDocument): The HTML content of the webpage, or
+            a document already parsed with parse_document
         selectors (dict): Dictionary containing CSS selectors for product elements
         base_url (str): Base URL of the webpage
+        parser (str): Parser backend used when html_content is raw HTML (defaults
+            to DEFAULT_PARSER)
         
     Returns:
         list: List of sample product data with HTML elements and selectors used
     """
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_document(html_content, base_url, parser).soup
         container_selector = selectors.get('product_container', '')
         
         if not container_selector:
@@ -36,7 +52,7 @@ def extract_sample_data(html_content, selectors, base_url):
             return []
             
         # Find product containers
-        containers = soup.select(container_selector)
+        containers = select(soup, container_selector)
         if not containers:
             logger.error(f"No elements found with selector: {container_selector}")
             return []
@@ -49,7 +65,7 @@ def extract_sample_data(html_content, selectors, base_url):
             # Extract title with element info
             title_selector = selectors.get('product_title', '')
             if title_selector:
-                title_element = container.select_one(title_selector)
+                title_element = select_one(container, title_selector)
                 if title_element:
                     product_data['title'] = title_element.text.strip()
                     product_data['elements']['title'] = {
@@ -71,7 +87,7 @@ def extract_sample_data(html_content, selectors, base_url):
             # Extract URL with element info
             url_selector = selectors.get('product_url', '')
             if url_selector:
-                url_element = container.select_one(url_selector)
+                url_element = select_one(container, url_selector)
                 if url_element and url_element.has_attr('href'):
                     url_value = urljoin(base_url, url_element['href'])
                     product_data['url'] = url_value
@@ -94,7 +110,7 @@ def extract_sample_data(html_content, selectors, base_url):
             # Extract image URL with element info
             image_selector = selectors.get('product_image', '')
             if image_selector:
-                image_element = container.select_one(image_selector)
+                image_element = select_one(container, image_selector)
                 if image_element:
                     # Check various image source attributes
                     image_url = None
@@ -131,7 +147,7 @@ def extract_sample_data(html_content, selectors, base_url):
             # Extract price with element info
             price_selector = selectors.get('product_price', '')
             if price_selector:
-                price_element = container.select_one(price_selector)
+                price_element = select_one(container, price_selector)
                 if price_element:
                     price_value = price_element.text.strip()
                     product_data['price'] = price_value
@@ -163,7 +179,132 @@ def extract_sample_data(html_content, selectors, base_url):
         logger.error(f"Error extracting sample data: {str(e)}")
         return []
 
-def validate_selectors(sample_data, selectors):
+# Fields checked by the AI validator, with the guidance given to the model
+VALIDATION_FIELDS = {
+    'title': {
+        'name': 'Product Title',
+        'guidelines': 'Should be descriptive product name, 3-100 chars'
+    },
+    'url': {
+        'name': 'Product URL',
+        'guidelines': 'Should be valid product page URL'
+    },
+    'image': {
+        'name': 'Product Image',
+        'guidelines': 'Should be valid image file URL'
+    },
+    'price': {
+        'name': 'Product Price',
+        'guidelines': 'Should have currency symbol or decimal number'
+    }
+}
+
+@traced("validate_field")
+def validate_field(field, sample_data):
+    """
+    Validate a single field of the extracted sample data using AI.
+    
+    Args:
+        field (str): Field to validate ('title', 'url', 'image' or 'price')
+        sample_data (list): List of sample product data with HTML elements
+        
+    Returns:
+        dict: Validation result with 'valid' (bool) and 'reason' (str)
+    """
+    field_info = VALIDATION_FIELDS[field]
+    
+    # Get element info for the field from sample data
+    field_elements = [item['elements'].get(field, {}) for item in sample_data]
+    
+    # Prepare message for OpenAI with detailed element information
+    system_prompt = f"""
+    You are a web scraper validator. Your task is to check if the {field_info['name']} is correctly identified.
+    You will receive:
+    1. The CSS selector used
+    2. The HTML element found
+    3. The value extracted
+    
+    Guidelines for {field_info['name']}: {field_info['guidelines']}
+    
+    Respond with a JSON object:
+    {{
+        "valid": true/false,
+        "reason": "Brief explanation of why the element is valid or invalid"
+    }}
+    """
+
+    user_message = f"""
+    Field: {field_info['name']}
+    
+    Sample Elements:
+    {json.dumps([{
+        'selector': elem.get('selector'),
+        'html': elem.get('html'),
+        'extracted_value': elem.get('value')
+    } for elem in field_elements if elem], indent=2)}
+
+    Is this field correctly identified? Consider both the selector and the extracted content.
+    """
+
+    try:
+        content = cached_chat_completion(
+            openai,
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            response_format={"type": "json_object"},
+            max_tokens=50  # Very small token limit since we only need true/false
+        )
+
+        result = json.loads(content)
+        return {
+            "valid": bool(result.get("valid", False)),
+            "reason": result.get("reason", "")
+        }
+            
+    except Exception as api_error:
+        logger.error(f"OpenAI API error validating {field}: {str(api_error)}")
+        return {
+            "valid": False,
+            "reason": f"Validation failed: {str(api_error)}"
+        }
+
+def iter_field_validations(sample_data, fields=None, max_workers=None):
+    """
+    Validate fields concurrently, yielding each result as soon as it completes.
+    
+    The fields are independent, so their OpenAI calls are dispatched together on a
+    bounded thread pool rather than one after another.
+    
+    Args:
+        sample_data (list): List of sample product data with HTML elements
+        fields (list): Fields to validate (defaults to all of VALIDATION_FIELDS)
+        max_workers (int): Maximum concurrent calls (defaults to VALIDATION_MAX_WORKERS)
+        
+    Yields:
+        tuple: (field, validation result) in order of completion
+    """
+    fields = list(fields or VALIDATION_FIELDS)
+    if not sample_data:
+        for field in fields:
+            yield field, {"valid": False, "reason": "No sample data available to validate"}
+        return
+    
+    max_workers = max(1, min(max_workers or VALIDATION_MAX_WORKERS, len(fields)))
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            # Each call runs in a copy of the request context so it is traced with the request
+            executor.submit(contextvars.copy_context().run, validate_field, field, sample_data): field
+            for field in fields
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+@traced("validate_selectors")
+def validate_selectors(sample_data, selectors, fields=None):
     """
     Validate the extracted sample data using AI to check if each field is correct.
     Provides detailed validation including HTML element, selector, and extracted value.
@@ -171,9 +312,11 @@ def validate_selectors(sample_data, selectors):
     Args:
         sample_data (list): List of sample product data with HTML elements
         selectors (dict): Dictionary containing CSS selectors for product elements
+        fields (list): Fields to validate (defaults to all of VALIDATION_FIELDS).
+            Only the requested fields are sent to the model, concurrently.
         
     Returns:
-        dict: Validation results with True/False for each field and validation details
+        dict: Validation results with a {'valid', 'reason'} entry for each field
     """
     try:
         if not sample_data:
@@ -183,84 +326,12 @@ def validate_selectors(sample_data, selectors):
                 "field_validations": {}
             }
 
-        field_validations = {}
-        overall_valid = True
-
-        # Validate each field individually
-        fields_to_validate = {
-            'title': {
-                'name': 'Product Title',
-                'guidelines': 'Should be descriptive product name, 3-100 chars'
-            },
-            'url': {
-                'name': 'Product URL',
-                'guidelines': 'Should be valid product page URL'
-            },
-            'image': {
-                'name': 'Product Image',
-                'guidelines': 'Should be valid image file URL'
-            },
-            'price': {
-                'name': 'Product Price',
-                'guidelines': 'Should have currency symbol or decimal number'
-            }
-        }
-
-        for field, field_info in fields_to_validate.items():
-            # Get element info for the field from sample data
-            field_elements = [item['elements'].get(field, {}) for item in sample_data]
-            
-            # Prepare message for OpenAI with detailed element information
-            system_prompt = f"""
-            You are a web scraper validator. Your task is to check if the {field_info['name']} is correctly identified.
-            You will receive:
-            1. The CSS selector used
-            2. The HTML element found
-            3. The value extracted
-            
-            Guidelines for {field_info['name']}: {field_info['guidelines']}
-            
-            Respond with a JSON object:
-            {{
-                "valid": true/false,
-                "reason": "Brief explanation of why the element is valid or invalid"
-            }}
-            """
+        fields = list(fields or VALIDATION_FIELDS)
+        results = dict(iter_field_validations(sample_data, fields))
         
-            user_message = f"""
-            Field: {field_info['name']}
-            
-            Sample Elements:
-            {json.dumps([{
-                'selector': elem.get('selector'),
-                'html': elem.get('html'),
-                'extracted_value': elem.get('value')
-            } for elem in field_elements if elem], indent=2)}
-
-            Is this field correctly identified? Consider both the selector and the extracted content.
-            """
-
-            try:
-                response = openai.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_message}
-                    ],
-                    response_format={"type": "json_object"},
-                    max_tokens=50  # Very small token limit since we only need true/false
-                )
-
-                result = json.loads(response.choices[0].message.content)
-                field_validations[field] = result["valid"]
-                
-                if not result["valid"]:
-                    overall_valid = False
-                    
-            except Exception as api_error:
-                logger.error(f"OpenAI API error validating {field}: {str(api_error)}")
-                field_validations[field] = False
-                overall_valid = False
+        # Report fields in the order they were requested
+        field_validations = {field: results[field] for field in fields}
+        overall_valid = all(result["valid"] for result in field_validations.values())
 
         return {
             "valid": overall_valid,
@@ -397,33 +468,54 @@ def perform_basic_validation(sample_data, selectors):
         "suggestions": suggestions
     }
 
-def improve_selectors(html_content, current_selectors, validation_results, base_url):
+@traced("improve_selectors")
+def improve_selectors(html_content, current_selectors, validation_results, base_url, rejected_selectors=None):
     """
     Attempt to improve selectors one at a time based on validation results.
     
+    Selectors that were already rejected for a field are listed in the prompt, so
+    each retry is a new request rather than a cached repeat of the last one, and
+    suggestions repeating a rejected selector are ignored.
+    
     Args:
-        html_content (str): The HTML content of the webpage
+        html_content (str or ParsedDocument): The HTML content of the webpage, or
+            a document already parsed with parse_document
         current_selectors (dict): Current CSS selectors
-        validation_results (dict): Validation results with True/False for each field
+        validation_results (dict): Validation results for each field, either True/False
+            or a {'valid', 'reason'} dict as returned by validate_selectors
         base_url (str): Base URL of the webpage
+        rejected_selectors (dict): Field name to the selectors already tried and
+            rejected for it, oldest first
         
     Returns:
         dict: Improved selectors
     """
+    rejected_selectors = rejected_selectors or {}
     try:
         # If all validations passed, no need to improve
         if validation_results.get("valid", False):
             return current_selectors
 
+        # Condense the page once for all fields being improved
+        html_sample = None
+        
         improved_selectors = current_selectors.copy()
         field_validations = validation_results.get("field_validations", {})
 
         # Improve each invalid field one at a time
-        for field, is_valid in field_validations.items():
+        for field, field_validation in field_validations.items():
+            if isinstance(field_validation, dict):
+                is_valid = field_validation.get("valid", False)
+            else:
+                is_valid = field_validation
+            
             if not is_valid:
                 selector_key = f"product_{field}"
                 if selector_key not in current_selectors:
                     continue
+                rejected = [selector for selector in rejected_selectors.get(field, []) if selector]
+                if current_selectors[selector_key] and current_selectors[selector_key] not in rejected:
+                    rejected.append(current_selectors[selector_key])
 
                 system_prompt = f"""
                 You are an expert web scraper selector generator. Improve the CSS selector for the {field} field.
@@ -438,21 +530,25 @@ def improve_selectors(html_content, current_selectors, validation_results, base_
                 Respond with a JSON object: {{"selector": "improved-css-selector"}}
                 """
         
-                # Limit HTML content to avoid token limit issues
-                html_sample = html_content[:10000]  # Reduced sample size for focused analysis
+                # Send a condensed skeleton of the page to stay within the token budget
+                if html_sample is None:
+                    html_sample = condense_html(html_content, base_url, token_budget=IMPROVE_HTML_TOKEN_BUDGET)
                 
                 user_message = f"""
-                HTML Sample (truncated):
+                Condensed HTML (repeated sibling elements are shortened to a few examples):
                 ```html
                 {html_sample}
                 ```
                 
                 Suggest an improved CSS selector for the {field} field that will correctly identify the element.
                 Current selector is not working: {current_selectors[selector_key]}
+                Attempt {len(rejected)}. Selectors already tried that did not work, do not suggest them again:
+                {json.dumps(rejected)}
                 """
                 
                 try:
-                    response = openai.chat.completions.create(
+                    content = cached_chat_completion(
+                        openai,
                         model="gpt-4o",
                         messages=[
                             {"role": "system", "content": system_prompt},
@@ -462,8 +558,10 @@ def improve_selectors(html_content, current_selectors, validation_results, base_
                         max_tokens=100  # Reduced token limit since we only need one selector
                     )
                     
-                    result = json.loads(response.choices[0].message.content)
-                    if result.get("selector"):
+                    result = json.loads(content)
+                    if result.get("selector") in rejected:
+                        logger.debug(f"Ignoring already rejected {field} selector: {result['selector']}")
+                    elif result.get("selector"):
                         improved_selectors[selector_key] = result["selector"]
                         logger.debug(f"Improved {field} selector: {result['selector']}")
                         
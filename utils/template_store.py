@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+from utils.fingerprint import TEMPLATE_SIMILARITY_THRESHOLD, jaccard
+from utils.selector_validator import extract_sample_data, perform_basic_validation
+from utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Template store configuration
+TEMPLATE_STORE_ENABLED = os.environ.get("TEMPLATE_STORE_ENABLED", "true").lower() not in ("0", "false", "no")
+TEMPLATE_STORE_PATH = os.environ.get("TEMPLATE_STORE_PATH", os.path.join(".cache", "templates.sqlite3"))  # Empty keeps templates in memory
+TEMPLATE_STORE_HOST_SIZE = int(os.environ.get("TEMPLATE_STORE_HOST_SIZE", 50))  # Templates kept per host
+
+# Stored templates tried on a page before falling back to selector detection
+TEMPLATE_MAX_CANDIDATES = 3
+
+# Fields that must pass basic validation for stored selectors to be reused
+TEMPLATE_FIELDS = ['title', 'url', 'image', 'price']
+
+def _host(url):
+    return urlparse(url).netloc.lower()
+
+class MemoryTemplateStore:
+    """
+    In-process template store. Templates are lost when the process exits.
+    """
+
+    def __init__(self, max_per_host=TEMPLATE_STORE_HOST_SIZE):
+        self.max_per_host = max_per_host
+        self._hosts = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def candidates(self, host):
+        with self._lock:
+            return [dict(entry) for entry in self._hosts.get(host, {}).values()]
+
+    def add(self, host, url, fingerprint, selectors):
+        with self._lock:
+            entries = self._hosts.setdefault(host, OrderedDict())
+            entry_id = self._next_id
+            self._next_id += 1
+            entries[entry_id] = {"id": entry_id, "url": url, "fingerprint": fingerprint, "selectors": selectors, "hits": 0}
+            while len(entries) > self.max_per_host:
+                entries.popitem(last=False)
+            return entry_id
+
+    def update(self, host, entry_id, url, fingerprint, selectors):
+        with self._lock:
+            entry = self._hosts.get(host, {}).get(entry_id)
+            if entry:
+                entry.update(url=url, fingerprint=fingerprint, selectors=selectors)
+                self._hosts[host].move_to_end(entry_id)
+
+    def touch(self, host, entry_id):
+        with self._lock:
+            entry = self._hosts.get(host, {}).get(entry_id)
+            if entry:
+                entry["hits"] += 1
+                self._hosts[host].move_to_end(entry_id)
+
+class SQLiteTemplateStore:
+    """
+    Template store backed by SQLite, so learned templates survive restarts and are
+    shared by every worker process using the database file.
+    """
+
+    def __init__(self, path=TEMPLATE_STORE_PATH, max_per_host=TEMPLATE_STORE_HOST_SIZE):
+        self.path = path
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS templates ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, host TEXT NOT NULL, url TEXT NOT NULL, "
+                "fingerprint TEXT NOT NULL, selectors TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+                "used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS templates_host ON templates (host)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def candidates(self, host):
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, url, fingerprint, selectors, hits FROM templates WHERE host = ?", (host,)
+            ).fetchall()
+        return [
+            {
+                "id": entry_id,
+                "url": url,
+                "fingerprint": frozenset(json.loads(fingerprint)),
+                "selectors": json.loads(selectors),
+                "hits": hits
+            }
+            for entry_id, url, fingerprint, selectors, hits in rows
+        ]
+
+    def add(self, host, url, fingerprint, selectors):
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO templates (host, url, fingerprint, selectors, used_at) VALUES (?, ?, ?, ?, ?)",
+                (host, url, json.dumps(sorted(fingerprint)), json.dumps(selectors), time.time())
+            )
+            conn.execute(
+                "DELETE FROM templates WHERE id IN ("
+                "SELECT id FROM templates WHERE host = ? ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (host, self.max_per_host)
+            )
+            return cursor.lastrowid
+
+    def update(self, host, entry_id, url, fingerprint, selectors):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE templates SET url = ?, fingerprint = ?, selectors = ?, used_at = ? WHERE id = ? AND host = ?",
+                (url, json.dumps(sorted(fingerprint)), json.dumps(selectors), time.time(), entry_id, host)
+            )
+
+    def touch(self, host, entry_id):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE templates SET hits = hits + 1, used_at = ? WHERE id = ? AND host = ?",
+                (time.time(), entry_id, host)
+            )
+
+class TemplateStore:
+    """
+    Maps page templates, identified by DOM skeleton fingerprints, to selectors
+    that were validated on a page of that template.
+
+    Templates are kept per host and matched by Jaccard similarity. Any object with
+    candidates, add, update and touch methods can be used as the backend.
+    """
+
+    def __init__(self, backend, threshold=None):
+        self.backend = backend
+        self.threshold = TEMPLATE_SIMILARITY_THRESHOLD if threshold is None else threshold
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+
+    def find(self, url, fingerprint, limit=TEMPLATE_MAX_CANDIDATES):
+        """
+        Find stored templates similar to a page.
+
+        Args:
+            url (str): URL of the page
+            fingerprint (frozenset): Page fingerprint from dom_fingerprint
+            limit (int): Maximum number of templates returned
+
+        Returns:
+            list: Template entries (id, url, selectors, similarity), most similar first
+        """
+        matches = []
+        for entry in self.backend.candidates(_host(url)):
+            similarity = jaccard(fingerprint, entry["fingerprint"])
+            if similarity >= self.threshold:
+                entry["similarity"] = similarity
+                matches.append(entry)
+        matches.sort(key=lambda entry: entry["similarity"], reverse=True)
+        return matches[:limit]
+
+    def save(self, url, fingerprint, selectors):
+        """
+        Remember selectors for a page's template, replacing those of the most
+        similar stored template of the same host if there is one.
+
+        Args:
+            url (str): URL of the page
+            fingerprint (frozenset): Page fingerprint from dom_fingerprint
+            selectors (dict): Validated selectors
+        """
+        host = _host(url)
+        matches = self.find(url, fingerprint, limit=1)
+        if matches:
+            self.backend.update(host, matches[0]["id"], url, fingerprint, selectors)
+        else:
+            self.backend.add(host, url, fingerprint, selectors)
+        with self._lock:
+            self.saved += 1
+
+    def record(self, url, entry_id=None):
+        """Count a lookup as a hit on the given template, or as a miss."""
+        if entry_id is not None:
+            self.backend.touch(_host(url), entry_id)
+        with self._lock:
+            if entry_id is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """
+        Get template store counters.
+
+        Returns:
+            dict: Lookups that reused stored selectors, lookups that did not, and templates saved
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "saved": self.saved}
+
+def basic_field_validations(document, selectors, url):
+    """
+    Check selectors against a page with the pattern-based validator (no AI calls).
+
+    Args:
+        document (ParsedDocument): The parsed page
+        selectors (dict): Selectors to check
+        url (str): URL of the page
+
+    Returns:
+        dict: Field name to perform_basic_validation's result ('valid' and 'message')
+    """
+    sample_data = extract_sample_data(document, selectors, url)
+    validation = perform_basic_validation(sample_data, selectors)
+    return {
+        field: validation["field_validations"].get(field, {"valid": False, "message": "Not validated"})
+        for field in TEMPLATE_FIELDS
+    }
+
+@traced("match_template")
+def match_template(document, url, store=None):
+    """
+    Reuse the selectors of a known template if they still work on this page.
+
+    Args:
+        document (ParsedDocument): The parsed page
+        url (str): URL of the page
+        store (TemplateStore): Store to search (defaults to the shared store)
+
+    Returns:
+        tuple: (selectors, field validations from basic_field_validations), or
+            (None, None) if no stored template passes on the page
+    """
+    store = store or get_template_store()
+    if store is None:
+        return None, None
+    try:
+        for entry in store.find(url, document.fingerprint):
+            validations = basic_field_validations(document, entry["selectors"], url)
+            if all(validation["valid"] for validation in validations.values()):
+                logger.debug(f"Reusing selectors of {entry['url']} for {url} (similarity {entry['similarity']:.2f})")
+                store.record(url, entry["id"])
+                return entry["selectors"], validations
+        store.record(url)
+    except Exception as e:
+        logger.error(f"Error matching page template for {url}: {str(e)}")
+    return None, None
+
+def remember_template(document, url, selectors, store=None):
+    """
+    Store selectors validated on a page for the page's template.
+
+    Args:
+        document (ParsedDocument): The parsed page
+        url (str): URL of the page
+        selectors (dict): Validated selectors
+        store (TemplateStore): Store to write to (defaults to the shared store)
+    """
+    store = store or get_template_store()
+    if store is None:
+        return
+    try:
+        store.save(url, document.fingerprint, selectors)
+    except Exception as e:
+        logger.error(f"Error saving page template for {url}: {str(e)}")
+
+def create_default_store():
+    """
+    Build the template store described by the TEMPLATE_STORE_* environment variables.
+
+    Returns:
+        TemplateStore: Store backed by SQLite if TEMPLATE_STORE_PATH is set and
+            usable, in memory otherwise
+    """
+    if TEMPLATE_STORE_PATH:
+        try:
+            return TemplateStore(SQLiteTemplateStore())
+        except Exception as e:
+            logger.error(f"Error opening template store at {TEMPLATE_STORE_PATH}: {str(e)}")
+    return TemplateStore(MemoryTemplateStore())
+
+_store = create_default_store() if TEMPLATE_STORE_ENABLED else None
+
+def get_template_store():
+    """Return the active template store, or None if template reuse is disabled."""
+    return _store
+
+def set_template_store(store):
+    """
+    Replace the active template store.
+
+    Args:
+        store (TemplateStore): New store, or None to disable template reuse
+    """
+    global _store
+    _store = store
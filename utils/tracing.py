@@ -0,0 +1,240 @@
+import functools
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "selector_sage"
+
+# Upper bounds of the stage duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Trace:
+    """
+    Timings and counters collected for one request.
+
+    Spans and counters recorded while the trace is active, including from worker
+    threads that run in a copy of the request's context, are added here as well
+    as to the process-wide metrics.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, seconds):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += seconds
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """
+        Summarize the trace.
+
+        Returns:
+            dict: Total seconds, call count and seconds per stage (nested stages
+                are included in their parent's time), and counters such as tokens,
+                HTML bytes and cache hits
+        """
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self.started, 4),
+                "stages": {
+                    name: {"count": stage["count"], "seconds": round(stage["seconds"], 4)}
+                    for name, stage in self.stages.items()
+                },
+                "counters": dict(self.counters)
+            }
+
+_current_trace = ContextVar("current_trace", default=None)
+
+class _Metrics:
+    """Process-wide stage histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"count": 0, "sum": 0.0, "buckets": [0] * len(DURATION_BUCKETS)}
+            stage["count"] += 1
+            stage["sum"] += seconds
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    stage["buckets"][index] += 1
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: dict(stage, buckets=list(stage["buckets"])) for name, stage in self.stages.items()}
+            return stages, dict(self.counters)
+
+_metrics = _Metrics()
+
+@contextmanager
+def start_trace():
+    """
+    Collect the spans and counters of the current request into a new Trace.
+
+    Yields:
+        Trace: The active trace
+    """
+    trace = Trace()
+    previous = _current_trace.get()
+    _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        # Not reset(token): a streamed response may be closed from another context
+        _current_trace.set(previous)
+
+def trace_stream(events):
+    """
+    Run a streaming generator inside a trace of its own.
+
+    Args:
+        events (iterator): Generator producing the response; it can read the
+            trace with current_trace() while it runs
+    """
+    with start_trace():
+        yield from events
+
+def current_trace():
+    """Return the active Trace, or None outside of start_trace."""
+    return _current_trace.get()
+
+@contextmanager
+def span(name):
+    """
+    Time a block of code as a pipeline stage.
+
+    Args:
+        name (str): Stage name
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _metrics.observe(name, seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, seconds)
+
+def traced(name):
+    """
+    Decorator timing every call of a function as a pipeline stage.
+
+    Args:
+        name (str): Stage name
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, value=1):
+    """
+    Add to a counter, e.g. tokens used, HTML bytes processed or cache hits.
+
+    Args:
+        name (str): Counter name
+        value (int): Amount to add
+    """
+    if not value:
+        return
+    _metrics.add(name, value)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, value)
+
+def record_token_usage(usage):
+    """
+    Count the tokens of an OpenAI response.
+
+    Args:
+        usage: The response's usage object, or None if it has none
+    """
+    if usage is None:
+        return
+    count("llm_prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+    count("llm_completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+def _format_value(value):
+    """Format a sample value without losing precision: integers as is, floats via repr."""
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+def render_metrics(values=None):
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Args:
+        values (dict): Extra values collected by the caller, e.g. cache and pool
+            counters, as metric name (without prefix) to value. Names ending in
+            _total are exported as counters, the others as gauges
+
+    Returns:
+        str: Metrics text
+    """
+    stages, counters = _metrics.snapshot()
+    lines = []
+
+    metric = f"{METRIC_PREFIX}_stage_duration_seconds"
+    lines.append(f"# HELP {metric} Time spent in each pipeline stage, nested stages included.")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, stage in sorted(stages.items()):
+        for bound, observed in zip(DURATION_BUCKETS, stage["buckets"]):
+            lines.append(f'{metric}_bucket{_format_labels({"stage": name, "le": f"{bound:g}"})} {observed}')
+        lines.append(f'{metric}_bucket{_format_labels({"stage": name, "le": "+Inf"})} {stage["count"]}')
+        lines.append(f'{metric}_sum{_format_labels({"stage": name})} {stage["sum"]:.6f}')
+        lines.append(f'{metric}_count{_format_labels({"stage": name})} {stage["count"]}')
+
+    for name, value in sorted(counters.items()):
+        metric = f"{METRIC_PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {_format_value(value)}")
+
+    for name, value in sorted((values or {}).items()):
+        if value is None:
+            continue
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} {'counter' if name.endswith('_total') else 'gauge'}")
+        lines.append(f"{metric} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
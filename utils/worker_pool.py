@@ -0,0 +1,278 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; workers then run without RLIMITs
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Worker pool configuration
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", 4))  # Pre-started worker processes
+SCRAPE_TIMEOUT = float(os.environ.get("SCRAPE_TIMEOUT", 30))  # Wall-clock seconds per task before the worker is killed
+SCRAPE_CPU_SECONDS = int(os.environ.get("SCRAPE_CPU_SECONDS", 20))  # CPU seconds per task (RLIMIT_CPU)
+SCRAPE_MEMORY_LIMIT_MB = int(os.environ.get("SCRAPE_MEMORY_LIMIT_MB", 1024))  # Address space per worker (RLIMIT_AS)
+SCRAPE_MAX_TASKS_PER_WORKER = int(os.environ.get("SCRAPE_MAX_TASKS_PER_WORKER", 50))  # Tasks before a worker is recycled
+
+# Modules imported once by the fork server so new workers start warm
+PRELOAD_MODULES = ['utils.extraction_engine']
+
+class WorkerError(Exception):
+    """A task failed inside a worker process."""
+
+class WorkerTimeout(WorkerError):
+    """A task exceeded its wall-clock timeout and its worker was killed."""
+
+class WorkerCrashed(WorkerError):
+    """A worker process died while running a task, e.g. on hitting a resource limit."""
+
+def _apply_memory_limit(memory_limit_mb):
+    if resource is None or not memory_limit_mb:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _apply_cpu_limit(cpu_seconds):
+    """Allow the next task `cpu_seconds` of CPU on top of what the worker already used."""
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def _worker_main(conn, memory_limit_mb, cpu_seconds, max_tasks):
+    """
+    Worker process loop: run (function, args, kwargs) tasks received on the pipe.
+
+    Exits after max_tasks tasks so the parent can replace it with a fresh process.
+    Exceeding RLIMIT_CPU kills the process with SIGXCPU, which the parent sees as
+    a crash.
+    """
+    _apply_memory_limit(memory_limit_mb)
+    tasks = 0
+    while not max_tasks or tasks < max_tasks:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+
+        function, args, kwargs = task
+        _apply_cpu_limit(cpu_seconds)
+        try:
+            conn.send((True, function(*args, **kwargs)))
+        except MemoryError:
+            conn.send((False, "Memory limit exceeded"))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {str(e)}"))
+        tasks += 1
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks = 0
+
+class WorkerPool:
+    """
+    Pool of pre-started worker processes with hard limits per task.
+
+    Each task runs in a worker with a wall-clock timeout enforced by the parent,
+    plus CPU time and address space limits enforced by the kernel (RLIMIT_CPU and
+    RLIMIT_AS). A worker that times out or dies is replaced, and every worker is
+    recycled after max_tasks_per_worker tasks, so leaks and runaway pages cannot
+    degrade the rest of the service.
+    """
+
+    def __init__(self, size=SCRAPE_WORKERS, timeout=SCRAPE_TIMEOUT, cpu_seconds=SCRAPE_CPU_SECONDS,
+                 memory_limit_mb=SCRAPE_MEMORY_LIMIT_MB, max_tasks_per_worker=SCRAPE_MAX_TASKS_PER_WORKER):
+        self.size = size
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+
+        # Fork server: workers start from a clean, single-threaded process rather
+        # than forking the threaded web server
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._context = multiprocessing.get_context(method)
+        if method == 'forkserver':
+            self._context.set_forkserver_preload(PRELOAD_MODULES)
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_limit_mb, self.cpu_seconds, self.max_tasks_per_worker),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _discard(self, worker):
+        """Stop a worker for good, killing it if it does not exit on its own."""
+        worker.conn.close()
+        worker.process.join(timeout=1)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+
+    def _release(self, worker, replace=False):
+        if replace:
+            self._discard(worker)
+        if self._closed:
+            if not replace:
+                self._discard(worker)
+            return
+        self._idle.put(self._spawn() if replace else worker)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def run(self, function, args=(), kwargs=None, timeout=None):
+        """
+        Run a function in a worker process and return its result.
+
+        Blocks until a worker is free. The function, arguments and result must be
+        picklable, so the function has to be defined at module level.
+
+        Args:
+            function (callable): Module-level function to run
+            args (tuple): Positional arguments
+            kwargs (dict): Keyword arguments
+            timeout (float): Wall-clock limit in seconds (defaults to the pool timeout)
+
+        Returns:
+            Any: The function's return value
+
+        Raises:
+            WorkerTimeout: The task ran past the timeout; its worker was killed
+            WorkerCrashed: The worker died, e.g. on exceeding its CPU or memory limit
+            WorkerError: The function raised an exception
+        """
+        if self._closed:
+            raise WorkerError("Worker pool is shut down")
+
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._idle.get()
+        try:
+            worker.conn.send((function, args, kwargs or {}))
+            if not worker.conn.poll(timeout):
+                logger.warning(f"Killing worker {worker.process.pid} after {timeout}s running {function.__name__}")
+                worker.process.kill()
+                self._count('timeouts')
+                self._release(worker, replace=True)
+                raise WorkerTimeout(f"Timed out after {timeout:g}s")
+            ok, value = worker.conn.recv()
+        except (EOFError, OSError):
+            self._count('crashes')
+            self._release(worker, replace=True)
+            logger.warning(f"Worker {worker.process.pid} died running {function.__name__} (exit code {worker.process.exitcode})")
+            raise WorkerCrashed(f"Worker process died (exit code {worker.process.exitcode})")
+
+        worker.tasks += 1
+        if self.max_tasks_per_worker and worker.tasks >= self.max_tasks_per_worker:
+            # The worker exits on its own after its last task
+            self._count('recycled')
+            self._release(worker, replace=True)
+        else:
+            self._release(worker)
+
+        if not ok:
+            self._count('failed')
+            raise WorkerError(value)
+        self._count('completed')
+        return value
+
+    def shutdown(self):
+        """Stop all idle workers; busy workers are stopped when their task returns."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            self._discard(worker)
+
+    def stats(self):
+        """
+        Get pool counters.
+
+        Returns:
+            dict: Pool size plus completed, failed, timed out, crashed and recycled task counts
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+                "recycled": self.recycled
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_worker_pool():
+    """
+    Get the shared worker pool, starting its workers on first use.
+
+    Returns:
+        WorkerPool: Pool configured from the SCRAPE_* environment variables
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool()
+                atexit.register(_pool.shutdown)
+    return _pool
+
+def worker_pool_stats():
+    """
+    Get the shared pool's counters without starting it.
+
+    Returns:
+        dict: See WorkerPool.stats, or None if the pool has not been started
+    """
+    pool = _pool
+    return pool.stats() if pool is not None else None
+
+def set_worker_pool(pool):
+    """
+    Replace the shared worker pool.
+
+    Args:
+        pool (WorkerPool): New pool
+    """
+    global _pool
+    _pool = pool